@@ -13,6 +13,14 @@ setuptools.setup(
     author_email='stephenh@startmail.com',
     python_requires='>=3.6',
     install_requires=['requests', ],
+    extras_require={
+        'parquet': ['pyarrow', ],
+    },
+    entry_points={
+        'console_scripts': [
+            'veeam=veeam.cli:main',
+        ],
+    },
     author='surfer190',
     url='https://github.com/surfer190/veeam.git',
     classifiers=[
@@ -0,0 +1,70 @@
+from unittest import TestCase
+
+from veeam.analytics import RUNNING, SessionTable, percentile
+from veeam.synthetic import SyntheticDataset
+
+
+def session(job_name, created, ended, result, state='Stopped'):
+    return {
+        'JobName': job_name,
+        'CreationTimeUTC': created,
+        'EndTimeUTC': ended,
+        'State': state,
+        'Result': result,
+    }
+
+
+class SessionTableTestCase(TestCase):
+    '''
+    Session analytics testcase
+    '''
+
+    def setUp(self):
+        self.table = SessionTable([
+            session('web', '2019-07-01T00:00:00Z', '2019-07-01T00:10:00Z', 'Success'),
+            session('web', '2019-07-01T12:00:00Z', '2019-07-01T12:30:00Z', 'Failed'),
+            session('web', '2019-07-02T00:00:00Z', '2019-07-02T00:20:00Z', 'Warning'),
+            session('web', '2019-07-02T12:00:00Z', '1900-01-01T00:00:00Z', 'None', state='Working'),
+            session('db', '2019-07-02T01:00:00Z', '2019-07-02T02:00:00Z', 'Success'),
+        ])
+
+    def test_durations(self):
+        assert list(self.table.durations()) == [600, 1800, 1200, RUNNING, 3600]
+
+    def test_job_stats(self):
+        db, web = self.table.job_stats()
+
+        assert db['job_name'] == 'db' and db['success_rate'] == 1.0
+        assert web['sessions'] == 4
+        assert web['running'] == 1
+        assert web['success_rate'] == web['warning_rate'] == web['failure_rate'] == 0.3333
+        assert web['p50_duration'] == 1200
+        assert web['p90_duration'] == 1680
+        assert web['max_duration'] == 1800
+        assert web['mean_duration'] == 1200
+
+    def test_trend(self):
+        days = self.table.trend(window=86400)
+        web_days = self.table.trend(window=86400, job_name='web')
+
+        assert [day['sessions'] for day in days] == [2, 3]
+        assert days[0]['start'] == 1561939200
+        assert [day['sessions'] for day in web_days] == [2, 2]
+        assert web_days[1]['success_rate'] == 0.0
+
+    def test_percentile(self):
+        assert percentile([], 50) is None
+        assert percentile([10], 99) == 10
+        assert percentile([1, 2, 3, 4], 50) == 2.5
+
+    def test_many_sessions(self):
+        dataset = SyntheticDataset(jobs=200, sessions_per_job=50, failure_rate=0.1, warning_rate=0.1)
+        table = SessionTable(dataset.session(index) for index in range(dataset.sessions))
+
+        stats = table.job_stats()
+
+        assert len(table) == 10000
+        assert len(stats) == 200
+        assert sum(job['sessions'] for job in stats) == 10000
+        assert all(300 <= job['p50_duration'] <= 4 * 3600 for job in stats)
+        assert 0.7 < sum(job['success_rate'] for job in stats) / len(stats) < 0.9
@@ -0,0 +1,131 @@
+from unittest import TestCase
+
+import requests
+import responses
+
+from veeam.breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+from veeam.client import VeeamClient
+from veeam.errors import CircuitOpenError
+
+BASE_API_URL = 'http://test:3991/api'
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise requests.exceptions.ConnectTimeout('timed out')
+
+
+class CircuitBreakerTestCase(TestCase):
+    '''
+    Circuit breaker testcase
+    '''
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=self.clock)
+
+    def trip(self):
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                self.breaker.call(fail)
+
+    def test_opens_after_threshold(self):
+        '''
+        Ensure calls fail fast once the threshold of failures is reached
+        '''
+        self.trip()
+        calls = []
+
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.call(lambda: calls.append(1))
+
+        assert self.breaker.state == OPEN
+        assert calls == []
+        assert self.breaker.health_score == 0
+
+    def test_half_open_probe(self):
+        '''
+        Ensure a single probe is allowed after the reset timeout and closes the circuit
+        '''
+        self.trip()
+        self.clock.now += 10
+
+        self.breaker.before_call()
+        assert self.breaker.state == HALF_OPEN
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record_success(0.1)
+        assert self.breaker.state == CLOSED
+
+    def test_failed_probe_reopens(self):
+        self.trip()
+        self.clock.now += 10
+
+        with self.assertRaises(requests.exceptions.ConnectTimeout):
+            self.breaker.call(fail)
+
+        assert self.breaker.state == OPEN
+        assert self.breaker.opened_at == 10
+
+    def test_health_score_prefers_fast_servers(self):
+        fast = CircuitBreaker()
+        slow = CircuitBreaker()
+        for _ in range(10):
+            fast.record_success(0.05)
+            slow.record_success(5.0)
+
+        assert fast.health_score > slow.health_score
+
+    @responses.activate
+    def test_client_fails_fast_on_server_errors(self):
+        '''
+        Ensure repeated 5xx responses open the client's circuit
+        '''
+        responses.add(
+            responses.POST, f'{ BASE_API_URL }/sessionMngr/?v=v1_4',
+            json={'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+            status=201,
+            headers={'X-RestSvcSessionId': 'MMM'}
+        )
+        responses.add(responses.GET, f'{ BASE_API_URL }/jobs', json={}, status=503)
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', breaker=self.breaker, timeout=5)
+
+        client.get_jobs()
+        client.get_jobs()
+        with self.assertRaises(CircuitOpenError):
+            client.get_jobs()
+
+        assert len(responses.calls) == 3
+        assert self.breaker.rejected == 1
+
+    @responses.activate
+    def test_pool_relogin_in_half_open_circuit(self):
+        '''
+        Ensure a pooled request whose session expired while the circuit was
+        open logs in again and retries, each request being one breaker call
+        '''
+        responses.add(
+            responses.POST, f'{ BASE_API_URL }/sessionMngr/?v=v1_4',
+            json={'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+            status=201,
+            headers={'X-RestSvcSessionId': 'MMM'}
+        )
+        responses.add(responses.GET, f'{ BASE_API_URL }/jobs', status=401)
+        responses.add(responses.GET, f'{ BASE_API_URL }/jobs', json={'Refs': []}, status=200)
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', breaker=self.breaker, pool_size=1)
+        calls = self.breaker.calls
+        self.trip()
+        self.clock.now += 10
+
+        assert client.get_jobs() == {'Refs': []}
+        assert self.breaker.state == CLOSED
+        assert self.breaker.calls - calls == 2 + 3
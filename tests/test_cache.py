@@ -0,0 +1,170 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import requests
+
+from veeam.cache import DiskCache, is_immutable
+from veeam.client import VeeamClient
+from veeam.synthetic import SyntheticAdapter, SyntheticDataset
+
+
+class CountingAdapter(SyntheticAdapter):
+
+    def __init__(self, dataset):
+        super().__init__(dataset)
+        self.gets = 0
+
+    def send(self, request, **kwargs):
+        if request.method == 'GET':
+            self.gets += 1
+        return super().send(request, **kwargs)
+
+
+class DiskCacheTestCase(TestCase):
+    '''
+    Disk cache testcase
+    '''
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.path)
+
+    def test_is_immutable(self):
+        url = 'http://veeam.example/api'
+        tasks_url = '{}/backupSessions/4b9e2d0e/taskSessions?format=Entity'.format(url)
+
+        assert is_immutable(url + '/backupSessions/4b9e2d0e', {'Type': 'BackupJobSession', 'State': 'Stopped', 'Links': []})
+        assert not is_immutable(url + '/backupSessions/4b9e2d0e', {'Type': 'BackupJobSession', 'State': 'Working'})
+        assert is_immutable(url + '/vmRestorePoints/1', {'Type': 'VmRestorePoint', 'Name': 'vm01@2019-07-01 22:00:00'})
+        assert not is_immutable(url + '/jobs/1', {'Type': 'Job', 'Name': 'Backup Job 1'})
+        assert is_immutable(tasks_url, {'BackupTaskSessions': [{'State': 'Stopped'}, {'State': 'Stopped'}]})
+        assert not is_immutable(tasks_url, {'BackupTaskSessions': [{'State': 'Stopped'}, {'State': 'Working'}]})
+        assert not is_immutable(tasks_url, {'BackupTaskSessions': []})
+        assert not is_immutable(url + '/jobs/1/backupSessions?format=Entity', {'BackupJobSessions': [{'State': 'Stopped'}]})
+        assert not is_immutable(url + '/backups/1/restorePoints', {'Refs': [{'Type': 'RestorePointReference'}]})
+        assert not is_immutable(url + '/query?type=Backup', {'PagingInfo': {}, 'Entities': {}})
+
+    def test_persists_and_shares_identical_content(self):
+        cache = DiskCache(self.path)
+        cache.put('http://a', {'State': 'Stopped'})
+        cache.put('http://b', {'State': 'Stopped'})
+        cache.flush()
+
+        reopened = DiskCache(self.path)
+
+        assert reopened.get('http://a') == {'State': 'Stopped'}
+        assert reopened.get('http://b') == {'State': 'Stopped'}
+        assert reopened.get('http://c') is None
+        assert reopened.stats()['hits'] == 2
+        assert reopened.size == cache.size
+
+    def test_evicts_least_recently_used(self):
+        cache = DiskCache(self.path, max_bytes=10 ** 6)
+        for index in range(3):
+            cache.put(str(index), {'State': 'Stopped', 'Data': os.urandom(200).hex()})
+        size = cache.size
+        cache.max_bytes = size - 1
+        cache.get('0')
+
+        cache.put('3', {'State': 'Stopped', 'Data': 'x'})
+
+        assert '0' in cache and '3' in cache
+        assert '1' not in cache
+        assert cache.size <= cache.max_bytes
+        blobs = [name for _, _, names in os.walk(self.path) for name in names]
+        assert len(blobs) == len(cache)
+
+    def test_job_sessions_are_not_cached(self):
+        '''
+        Ensure the sessions of a job are refetched as new runs are added
+        '''
+        dataset = SyntheticDataset(jobs=1, sessions_per_job=1, running_rate=0.0)
+        adapter = CountingAdapter(dataset)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        client = VeeamClient('http://veeam.example/api', 'username', 'pass', session=session,
+                             cache=DiskCache(self.path))
+        job_uuid = dataset.job(0)['UID'].rsplit(':', 1)[-1]
+
+        first = client.get_backup_sessions(job_uuid)['BackupJobSessions']
+        dataset.sessions_per_job = 2
+        second = client.get_backup_sessions(job_uuid)['BackupJobSessions']
+
+        assert len(first) == 1
+        assert len(second) == 2
+        assert adapter.gets == 2
+
+    def test_warm_run_only_fetches_running_sessions(self):
+        '''
+        Ensure a second client with the same cache only refetches sessions that can change
+        '''
+        dataset = SyntheticDataset(jobs=20, sessions_per_job=3, vms_per_job=2, running_rate=0.2, seed=5)
+        uids = [dataset.session(index)['UID'] for index in range(dataset.sessions)]
+        running = sum(1 for index in range(dataset.sessions) if dataset.session(index)['State'] != 'Stopped')
+
+        def run():
+            adapter = CountingAdapter(dataset)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            with VeeamClient('http://veeam.example/api', 'username', 'pass', session=session,
+                             cache=DiskCache(self.path)) as client:
+                rows = client.get_task_sessions_bulk(uids, workers=4)
+            return adapter.gets, rows
+
+        cold_gets, cold_rows = run()
+        warm_gets, warm_rows = run()
+
+        assert running
+        assert cold_gets == len(uids)
+        assert warm_gets == running
+        assert warm_rows == cold_rows
+
+    def test_decode_options_are_cached_separately(self):
+        '''
+        Ensure clients decoding differently share a cache without seeing each other's results
+        '''
+        dataset = SyntheticDataset(jobs=2, sessions_per_job=2, running_rate=0.0)
+        uid = dataset.session(0)['UID']
+        cache = DiskCache(self.path)
+
+        def get_task_sessions(**kwargs):
+            session = requests.Session()
+            session.mount('http://', SyntheticAdapter(dataset))
+            client = VeeamClient('http://veeam.example/api', 'username', 'pass', session=session,
+                                 cache=cache, **kwargs)
+            return client.get_task_sessions(uid)['BackupTaskSessions']
+
+        plain = get_task_sessions()
+        with_epochs = get_task_sessions(epoch_fields=True)
+        interned = get_task_sessions(intern_strings=True)
+
+        assert 'CreationTimeEpoch' not in plain[0]
+        assert 'CreationTimeEpoch' in with_epochs[0]
+        assert interned == plain
+        assert interned[0]['State'] is interned[1]['State']
+        assert cache.stats()['hits'] == 1
+
+    def test_single_entities_cached(self):
+        '''
+        Ensure stopped sessions and restore points read one at a time are only downloaded once
+        '''
+        dataset = SyntheticDataset(jobs=2, sessions_per_job=2, vms_per_job=1, running_rate=1.0)
+        adapter = CountingAdapter(dataset)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        client = VeeamClient('http://veeam.example/api', 'username', 'pass', session=session,
+                             cache=DiskCache(self.path))
+        running = dataset.session(0)['UID'].rsplit(':', 1)[-1]
+        stopped = dataset.session(2)['UID'].rsplit(':', 1)[-1]
+        point = dataset.restore_point(2)['UID'].rsplit(':', 1)[-1]
+        vm_point = dataset.vm_restore_point(2)['UID'].rsplit(':', 1)[-1]
+
+        for _ in range(2):
+            assert client.get_backup_session(running)['State'] == 'Working'
+            assert client.get_backup_session(stopped)['State'] == 'Stopped'
+            assert client.get_restore_point(point)['Type'] == 'RestorePoint'
+            assert client.get_vm_restore_point(vm_point)['Type'] == 'VmRestorePoint'
+
+        assert adapter.gets == 5
@@ -0,0 +1,132 @@
+import os
+import re
+import tempfile
+from unittest import TestCase
+
+import requests
+import responses
+from freezegun import freeze_time
+
+from veeam.cassette import SCRUBBED, Cassette, RecordingAdapter, ReplayAdapter, Scrubber
+from veeam.client import VeeamClient
+
+BASE_API_URL = 'http://192.168.16.21:9399/api'
+TOKEN = 'NjNkMzVjZmMtMTg3Yi00ZjRjLWE0ZjctZTY1NmFjOTIxMjBk'
+SESSION_ID = '2fb28f4f-46bd-4855-a757-0b8c24f9826b'
+
+JOBS = {
+    'Refs': [{
+        'Name': 'Backup Job 1',
+        'Href': 'http://192.168.16.21:9399/api/jobs/9be68a1c-7893-4c92-93e9-043be7533759',
+        'Links': [{'Href': 'http://192.168.16.21:9399/api/backupServers/62f06091', 'Name': '192.168.16.21'}]
+    }]
+}
+
+
+class CassetteTestCase(TestCase):
+    '''
+    Record and replay testcase
+    '''
+
+    def record(self):
+        responses.add(
+            responses.POST, f'{ BASE_API_URL }/sessionMngr/?v=v1_4',
+            json={'UserName': 'VEEAM\\veeam.api', 'SessionId': SESSION_ID},
+            status=201,
+            headers={'X-RestSvcSessionId': TOKEN}
+        )
+        responses.add(responses.GET, f'{ BASE_API_URL }/jobs', json=JOBS, status=200)
+
+        session = requests.Session()
+        recorder = RecordingAdapter()
+        session.mount('http://', recorder)
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', session=session)
+        client.get_jobs()
+        return recorder.cassette
+
+    @responses.activate
+    def test_recording_scrubbed(self):
+        '''
+        Ensure tokens, session ids and hostnames are not recorded
+        '''
+        cassette = self.record()
+        recorded = repr(cassette.interactions)
+
+        assert len(cassette) == 2
+        assert TOKEN not in recorded
+        assert SESSION_ID not in recorded
+        assert '192.168.16.21' not in recorded
+        assert cassette.interactions[0]['headers']['X-RestSvcSessionId'] == SCRUBBED
+
+    @responses.activate
+    def test_replay(self):
+        '''
+        Ensure a saved cassette replays against any host with its timing
+        '''
+        cassette = self.record()
+
+        handle, path = tempfile.mkstemp(suffix='.cassette')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        cassette.save(path)
+
+        delays = []
+        session = requests.Session()
+        session.mount('http://', ReplayAdapter(Cassette.load(path), speed=2, sleep=delays.append))
+        client = VeeamClient('http://replay:9399/api', 'username', 'pass', session=session)
+        jobs = client.get_jobs()
+
+        assert jobs['Refs'][0]['Name'] == 'Backup Job 1'
+        assert jobs['Refs'][0]['Href'] == 'http://veeam.example/api/jobs/9be68a1c-7893-4c92-93e9-043be7533759'
+        assert client.session_token == SCRUBBED
+        assert delays == [interaction['elapsed'] * 2 for interaction in cassette.interactions]
+
+    def test_replay_unknown_request(self):
+        session = requests.Session()
+        session.mount('http://', ReplayAdapter(Cassette()))
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            session.get('http://replay/api/jobs')
+
+    def test_hosts_scrubbed_at_boundaries(self):
+        '''
+        Ensure a host named like part of a uid or another name only replaces the host
+        '''
+        scrubber = Scrubber()
+        scrubber.add_url('http://veeam:9399/api')
+
+        assert scrubber.scrub(
+            '{"UID":"urn:veeam:Job:1","Href":"http://veeam:9399/api/jobs/1","Name":"veeam","Other":"veeam.corp.local"}'
+        ) == (
+            '{"UID":"urn:veeam:Job:1","Href":"http://veeam.example/api/jobs/1","Name":"veeam.example",'
+            '"Other":"veeam.corp.local"}'
+        )
+
+    @responses.activate
+    def test_replay_time_filtered_call(self):
+        '''
+        Ensure a call filtering on the time it is made replays later
+        '''
+        sessions = {
+            'Entities': {'BackupJobSessions': {'BackupJobSessions': [{'UID': 'urn:veeam:BackupJobSession:1'}]}}
+        }
+        responses.add(
+            responses.POST, f'{ BASE_API_URL }/sessionMngr/?v=v1_4',
+            json={'UserName': 'VEEAM\\veeam.api', 'SessionId': SESSION_ID},
+            status=201,
+            headers={'X-RestSvcSessionId': TOKEN}
+        )
+        responses.add(responses.GET, re.compile(f'{ BASE_API_URL }/query.*'), json=sessions, status=200)
+
+        session = requests.Session()
+        recorder = RecordingAdapter()
+        session.mount('http://', recorder)
+        with freeze_time('2019-07-02 12:00:00'):
+            VeeamClient(BASE_API_URL, 'username', 'pass', session=session).get_jobs_1_day()
+
+        session = requests.Session()
+        session.mount('http://', ReplayAdapter(recorder.cassette, speed=0))
+        with freeze_time('2019-07-02 12:00:01'):
+            jobs = VeeamClient('http://replay:9399/api', 'username', 'pass', session=session).get_jobs_1_day()
+
+        assert [job['UID'] for job in jobs] == ['urn:veeam:BackupJobSession:1']
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from veeam.changes import SessionChangeDetector
+
+
+def session(uid, state='Working', result='None', progress=0, end='1900-01-01T00:00:00Z'):
+    return {
+        'UID': uid,
+        'JobName': 'job',
+        'State': state,
+        'Result': result,
+        'Progress': progress,
+        'EndTimeUTC': end,
+    }
+
+
+class SessionChangeDetectorTestCase(TestCase):
+    '''
+    Session change detection testcase
+    '''
+
+    def test_only_new_and_changed_emitted(self):
+        '''
+        Ensure unchanged sessions are not emitted on the next poll
+        '''
+        detector = SessionChangeDetector()
+
+        first = list(detector.changes([session('a'), session('b')]))
+        second = list(detector.changes([
+            session('a'),
+            session('b', 'Stopped', 'Success', 100, '2019-07-01T06:26:56Z'),
+            session('c'),
+        ]))
+
+        assert [event['event'] for event in first] == ['new', 'new']
+        assert [(event['event'], event['session']['UID']) for event in second] == [
+            ('changed', 'b'),
+            ('new', 'c'),
+        ]
+        assert second[0]['previous']['State'] == 'Working'
+
+    def test_seen_set_bounded(self):
+        '''
+        Ensure the least recently seen sessions are forgotten past the limit
+        '''
+        detector = SessionChangeDetector(max_size=2)
+
+        list(detector.changes([session('a'), session('b')]))
+        list(detector.changes([session('a'), session('c')]))
+
+        assert len(detector) == 2
+        assert [event['session']['UID'] for event in detector.changes([session('a'), session('b')])] == ['b']
@@ -1,3 +1,10 @@
+import asyncio
+import datetime
+import gc
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from unittest import TestCase
 from unittest.mock import patch
 
@@ -8,6 +15,7 @@ from freezegun import freeze_time
 
 from veeam.client import VeeamClient
 from veeam.errors import LoginFailError, LoginFailSessionKeyError
+from veeam.synthetic import SyntheticAdapter, SyntheticDataset
 
 REPO_SUMMARY_RESPONSE = {
     "Periods": [
@@ -1830,4 +1838,453 @@ class VeeamClientTestCase(TestCase):
         
         assert backup_sessions == EXPECTED_BACKUP_SESSION_RESPONSE
         
-# TODO: Test to ensure the paramter is a uuid, otherwise raise an error
\ No newline at end of file
+# TODO: Test to ensure the paramter is a uuid, otherwise raise an error
+
+class ThreadSessionsTestCase(TestCase):
+    '''
+    Sharing a client between threads testcase
+    '''
+
+    BASE_API_URL = 'http://test:3991/api'
+
+    def add_login(self, token='MMM'):
+        responses.add(
+            responses.POST, f'{ self.BASE_API_URL }/sessionMngr/?v=v1_4',
+                json={'UserName': 'VEEAM\\veeam.api', 'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+                status=201,
+                headers={'X-RestSvcSessionId': token}
+        )
+
+    def in_thread(self, func):
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(func).result()
+
+    @responses.activate
+    def test_other_threads_get_own_session(self):
+        '''
+        Ensure worker threads use their own session with the shared token
+        '''
+        self.add_login()
+        client = VeeamClient(self.BASE_API_URL, 'username', 'pass')
+
+        session = self.in_thread(client._http)
+
+        assert session is not client.session
+        assert session.headers['X-RestSvcSessionId'] == 'MMM'
+        assert client._http() is client.session
+
+    @responses.activate
+    def test_thread_sessions_keep_session_settings(self):
+        '''
+        Ensure worker thread sessions keep the adapter settings, hooks and params of the given session
+        '''
+        self.add_login()
+        hook = lambda response, *args, **kwargs: response
+        given = requests.Session()
+        given.mount('http://', requests.adapters.HTTPAdapter(max_retries=3, pool_maxsize=20))
+        given.hooks['response'].append(hook)
+        given.max_redirects = 5
+        client = VeeamClient(self.BASE_API_URL, 'username', 'pass', session=given)
+        given.params['tenant'] = '1'
+
+        session = self.in_thread(client._http)
+        adapter = session.get_adapter(self.BASE_API_URL)
+
+        assert adapter is not given.get_adapter(self.BASE_API_URL)
+        assert adapter.max_retries.total == 3
+        assert adapter._pool_maxsize == 20
+        assert session.hooks['response'] == [hook]
+        assert session.params == {'tenant': '1'}
+        assert session.max_redirects == 5
+
+    @responses.activate
+    def test_threads_share_login(self):
+        '''
+        Ensure requests from worker threads do not log in again
+        '''
+        self.add_login()
+        responses.add(responses.GET, f'{ self.BASE_API_URL }/jobs', json=JOBS_RESPONSE, status=200)
+        client = VeeamClient(self.BASE_API_URL, 'username', 'pass')
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: client.get_jobs(), range(8)))
+
+        assert all(result == JOBS_RESPONSE for result in results)
+        logins = [call for call in responses.calls if call.request.method == 'POST']
+        assert len(logins) == 1
+        assert all(
+            call.request.headers['X-RestSvcSessionId'] == 'MMM'
+            for call in responses.calls if call.request.method == 'GET'
+        )
+
+    @responses.activate
+    def test_relogin_updates_thread_sessions(self):
+        '''
+        Ensure a new logon token reaches sessions already created for other threads
+        '''
+        self.add_login('first')
+        client = VeeamClient(self.BASE_API_URL, 'username', 'pass')
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            session = executor.submit(client._http).result()
+            responses.replace(
+                responses.POST, f'{ self.BASE_API_URL }/sessionMngr/?v=v1_4',
+                status=201,
+                headers={'X-RestSvcSessionId': 'second'}
+            )
+            client.login()
+            assert executor.submit(client._http).result() is session
+
+        assert session.headers['X-RestSvcSessionId'] == 'second'
+        assert client.session.headers['X-RestSvcSessionId'] == 'second'
+
+    @responses.activate
+    def test_sessions_of_finished_threads_are_released(self):
+        '''
+        Ensure per call thread pools do not leave sessions open on the client
+        '''
+        self.add_login()
+        responses.add(responses.GET, f'{ self.BASE_API_URL }/jobs', json=JOBS_RESPONSE, status=200)
+        client = VeeamClient(self.BASE_API_URL, 'username', 'pass')
+
+        for _ in range(10):
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                list(executor.map(lambda _: client.get_jobs(), range(8)))
+        gc.collect()
+
+        assert len(client._thread_sessions) == 0
+
+
+class TimeShardTestCase(TestCase):
+    '''
+    Time-sharded session query testcase
+    '''
+
+    BASE_API_URL = 'http://test:3991/api'
+
+    def session(self, uid, created):
+        return {'UID': uid, 'CreationTimeUTC': created, 'JobName': 'job'}
+
+    def test_time_shards(self):
+        '''
+        Ensure a window is split into consecutive ranges by count or width
+        '''
+        start = datetime.datetime(2019, 7, 1)
+        end = datetime.datetime(2019, 7, 2, 12)
+
+        assert VeeamClient.get_time_shards(start, end, 3) == [
+            (start, datetime.datetime(2019, 7, 1, 12)),
+            (datetime.datetime(2019, 7, 1, 12), datetime.datetime(2019, 7, 2)),
+            (datetime.datetime(2019, 7, 2), end),
+        ]
+        assert VeeamClient.get_time_shards(start, end, datetime.timedelta(days=1)) == [
+            (start, datetime.datetime(2019, 7, 2)),
+            (datetime.datetime(2019, 7, 2), end),
+        ]
+
+    @responses.activate
+    def test_jobs_between_merged_and_deduplicated(self):
+        '''
+        Ensure shards are queried separately and merged in creation time order
+        '''
+        responses.add(
+            responses.POST, f'{ self.BASE_API_URL }/sessionMngr/?v=v1_4',
+                json={'UserName': 'VEEAM\\veeam.api', 'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+                status=201,
+                headers={'X-RestSvcSessionId': 'MMM'}
+        )
+        shard_sessions = {
+            'creationtime>="2019-07-01T00:00:00Z";creationtime<"2019-07-02T00:00:00Z"': [
+                self.session('b', '2019-07-01T10:00:00Z'),
+                self.session('a', '2019-07-01T01:00:00Z'),
+                self.session('boundary', '2019-07-02T00:00:00Z'),
+            ],
+            'creationtime>="2019-07-02T00:00:00Z";creationtime<"2019-07-03T00:00:00Z"': [
+                self.session('boundary', '2019-07-02T00:00:00Z'),
+                self.session('c', '2019-07-02T05:00:00Z'),
+            ],
+        }
+
+        def query(request):
+            sessions = shard_sessions[request.params['filter']]
+            return (200, {}, json.dumps({
+                'Entities': {'BackupJobSessions': {'BackupJobSessions': sessions}},
+                'PagingInfo': {'PageNum': 1, 'PagesCount': 1}
+            }))
+
+        responses.add_callback(responses.GET, re.compile(f'{ self.BASE_API_URL }/query.*'), callback=query)
+
+        client = VeeamClient(self.BASE_API_URL, 'username', 'pass')
+        sessions = client.get_jobs_between(
+            datetime.datetime(2019, 7, 1, tzinfo=datetime.timezone.utc),
+            datetime.datetime(2019, 7, 3, tzinfo=datetime.timezone.utc),
+            shards=2
+        )
+
+        assert [session['UID'] for session in sessions] == ['a', 'b', 'boundary', 'c']
+
+    @responses.activate
+    @freeze_time('2019-07-02 12:00:00')
+    def test_jobs_between_naive_start(self):
+        '''
+        Ensure a naive start is taken as UTC against the default end of now
+        '''
+        responses.add(
+            responses.POST, f'{ self.BASE_API_URL }/sessionMngr/?v=v1_4',
+                json={'UserName': 'VEEAM\\veeam.api', 'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+                status=201,
+                headers={'X-RestSvcSessionId': 'MMM'}
+        )
+        filters = []
+
+        def query(request):
+            filters.append(request.params['filter'])
+            return (200, {}, json.dumps({
+                'Entities': {'BackupJobSessions': {'BackupJobSessions': []}},
+                'PagingInfo': {'PageNum': 1, 'PagesCount': 1}
+            }))
+
+        responses.add_callback(responses.GET, re.compile(f'{ self.BASE_API_URL }/query.*'), callback=query)
+
+        client = VeeamClient(self.BASE_API_URL, 'username', 'pass')
+
+        assert client.get_jobs_between(datetime.datetime(2019, 7, 1)) == []
+        assert filters == ['creationtime>="2019-07-01T00:00:00Z";creationtime<"2019-07-02T12:00:00Z"']
+
+
+class LogoutTestCase(TestCase):
+    '''
+    Session lifecycle testcase
+    '''
+
+    BASE_API_URL = 'http://test:3991/api'
+    SESSION_ID = '2fb28f4f-46bd-4855-a757-0b8c24f9826b'
+
+    def add_login(self, json_body=None):
+        responses.add(
+            responses.POST, f'{ self.BASE_API_URL }/sessionMngr/?v=v1_4',
+                json={'UserName': 'VEEAM\\veeam.api', 'SessionId': self.SESSION_ID} if json_body is None else json_body,
+                status=201,
+                headers={'X-RestSvcSessionId': 'MMM'}
+        )
+        responses.add(
+            responses.DELETE, f'{ self.BASE_API_URL }/logonSessions/{ self.SESSION_ID }',
+            status=204
+        )
+
+    def assert_single_delete(self):
+        methods = [call.request.method for call in responses.calls]
+        assert methods == ['POST', 'DELETE']
+
+    @responses.activate
+    def test_logout_uses_login_session_id(self):
+        '''
+        Ensure logout deletes the session captured at login without listing sessions
+        '''
+        self.add_login()
+        client = VeeamClient(self.BASE_API_URL, 'username', 'pass')
+
+        assert client.session_id == self.SESSION_ID
+        client.logout()
+
+        self.assert_single_delete()
+        assert client.session_id is None
+
+    @responses.activate
+    def test_logout_is_idempotent(self):
+        '''
+        Ensure logging out again, eg. on leaving the context, never lists and deletes another session
+        '''
+        self.add_login()
+        responses.add(
+            responses.GET, f'{ self.BASE_API_URL }/logonSessions',
+            json={'LogonSessions': [{'SessionId': 'someone-else'}]},
+            status=200
+        )
+
+        with VeeamClient(self.BASE_API_URL, 'username', 'pass') as client:
+            client.logout()
+        client.logout()
+
+        self.assert_single_delete()
+
+    @responses.activate
+    def test_logout_falls_back_to_lookup(self):
+        '''
+        Ensure logout lists the logon sessions when login returned no session id
+        '''
+        self.add_login(json_body={})
+        responses.add(
+            responses.GET, f'{ self.BASE_API_URL }/logonSessions',
+            json={'LogonSessions': [{'SessionId': self.SESSION_ID}]},
+            status=200
+        )
+        client = VeeamClient(self.BASE_API_URL, 'username', 'pass')
+        client.logout()
+
+        assert [call.request.method for call in responses.calls] == ['POST', 'GET', 'DELETE']
+
+    @responses.activate
+    def test_context_manager_logs_out(self):
+        '''
+        Ensure leaving the context logs out even when an error is raised
+        '''
+        self.add_login()
+        with self.assertRaises(KeyError):
+            with VeeamClient(self.BASE_API_URL, 'username', 'pass'):
+                raise KeyError('Entities')
+
+        self.assert_single_delete()
+
+    @responses.activate
+    def test_async_context_manager_logs_out(self):
+        '''
+        Ensure the client can be used with async with
+        '''
+        self.add_login()
+
+        async def use_client():
+            async with VeeamClient(self.BASE_API_URL, 'username', 'pass') as client:
+                return client.session_id
+
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        assert loop.run_until_complete(use_client()) == self.SESSION_ID
+        self.assert_single_delete()
+
+
+class TaskSessionsTestCase(TestCase):
+    '''
+    Per VM task session testcase
+    '''
+
+    BASE_API_URL = 'http://test:3991/api'
+
+    @responses.activate
+    def test_get_task_sessions(self):
+        '''
+        Ensure a full session UID is reduced to its uuid
+        '''
+        responses.add(
+            responses.POST, f'{ self.BASE_API_URL }/sessionMngr/?v=v1_4',
+                json={'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+                status=201,
+                headers={'X-RestSvcSessionId': 'MMM'}
+        )
+        responses.add(
+            responses.GET,
+            f'{ self.BASE_API_URL }/backupSessions/4b9e2d0e-5d1e-4a58-a5e2-6c4ac1b3a2ef/taskSessions?format=Entity',
+            json={'BackupTaskSessions': [{'VmDisplayName': 'web01', 'Result': 'Failed'}]},
+            status=200
+        )
+        client = VeeamClient(self.BASE_API_URL, 'username', 'pass')
+
+        task_sessions = client.get_task_sessions('urn:veeam:BackupJobSession:4b9e2d0e-5d1e-4a58-a5e2-6c4ac1b3a2ef')
+
+        assert task_sessions['BackupTaskSessions'][0]['VmDisplayName'] == 'web01'
+
+    def test_bulk_flattens_vms_of_failed_sessions(self):
+        '''
+        Ensure every VM of every session becomes one row tagged with its job
+        '''
+        dataset = SyntheticDataset(jobs=10, sessions_per_job=5, vms_per_job=4, failure_rate=0.5, seed=3)
+        session = requests.Session()
+        session.mount('http://', SyntheticAdapter(dataset))
+        client = VeeamClient('http://veeam.example/api', 'username', 'pass', session=session)
+        failed = [dataset.session(index) for index in range(dataset.sessions)]
+        failed = [job_session for job_session in failed if job_session['Result'] == 'Failed']
+
+        rows = client.get_task_sessions_bulk(failed, workers=4)
+
+        assert failed
+        assert len(rows) == sum(len(dataset.task_sessions(dataset._index(s['UID']))) for s in failed)
+        assert {row['session_uid'] for row in rows} == {s['UID'] for s in failed}
+        assert all(row['vm'].startswith('vm-') and row['job_name'].startswith('Job_') for row in rows)
+        assert any(row['result'] == 'Failed' for row in rows)
+
+        by_uid = client.get_task_sessions_bulk([failed[0]['UID']])
+        assert by_uid[0]['job_name'] is None
+        assert by_uid[0]['session_uid'] == failed[0]['UID']
+
+
+class DashboardTestCase(TestCase):
+    '''
+    Dashboard testcase
+    '''
+
+    def get_client(self, dataset, slow=None, failing=None, delay=0.5):
+        class Adapter(SyntheticAdapter):
+
+            def send(self, request, **kwargs):
+                if slow and request.url.endswith(slow):
+                    time.sleep(delay)
+                if failing and request.url.endswith(failing):
+                    raise requests.exceptions.ConnectionError('refused')
+                return super().send(request, **kwargs)
+
+        session = requests.Session()
+        session.mount('http://', Adapter(dataset))
+        return VeeamClient('http://veeam.example/api', 'username', 'pass', session=session)
+
+    def test_all_sections(self):
+        dataset = SyntheticDataset(jobs=10)
+        client = self.get_client(dataset)
+
+        dashboard = client.get_dashboard()
+
+        assert dashboard['complete']
+        assert set(dashboard['sections']) == {
+            'repo_summary', 'vms_processed_day', 'summary_job_stats', 'summary_vms', 'summary_overview'
+        }
+        assert dashboard['sections']['summary_overview']['data'] == dataset.report('overview')
+        assert all(section['elapsed'] >= 0 for section in dashboard['sections'].values())
+
+    def test_repeated_calls_reuse_threads(self):
+        '''
+        Ensure refreshing the dashboard does not add threads or sessions
+        '''
+        client = self.get_client(SyntheticDataset(jobs=10))
+
+        for _ in range(20):
+            client.get_dashboard()
+        gc.collect()
+
+        assert len(client._thread_sessions) <= 5
+        client.close()
+        assert client._executor is None
+
+    def test_partial_results(self):
+        '''
+        Ensure slow and failing sections do not hold back the others
+        '''
+        client = self.get_client(SyntheticDataset(jobs=10), slow='/overview', failing='/vms_overview', delay=2)
+
+        started = time.monotonic()
+        dashboard = client.get_dashboard(deadline=0.5)
+        elapsed = time.monotonic() - started
+        sections = dashboard['sections']
+
+        assert elapsed < 1.5
+        assert not dashboard['complete']
+        assert sections['summary_overview']['status'] == 'timeout'
+        assert sections['summary_overview']['data'] is None
+        assert sections['summary_vms']['status'] == 'error'
+        assert 'refused' in sections['summary_vms']['error']
+        assert sections['summary_job_stats']['status'] == 'ok'
+        assert sections['repo_summary']['data']['Periods']
+
+    def test_slow_section_does_not_exhaust_threads(self):
+        '''
+        Ensure a section still running from earlier calls is not fetched again and the others keep answering
+        '''
+        client = self.get_client(SyntheticDataset(jobs=10), slow='/overview', delay=2)
+        self.addCleanup(client.close)
+
+        for _ in range(12):
+            dashboard = client.get_dashboard(deadline=0.1)
+            sections = dashboard['sections']
+            assert sections['summary_overview']['status'] == 'timeout'
+            assert all(
+                section['status'] == 'ok' for name, section in sections.items() if name != 'summary_overview'
+            )
@@ -0,0 +1,171 @@
+import io
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+import responses
+
+from veeam.client import VeeamClient
+from veeam.config import ServerConfig, load_servers
+from veeam.errors import NoConfigError
+from veeam.export import NdjsonWriter, export
+
+BASE_API_URL = 'http://test:3991/api'
+
+
+def add_login(url=BASE_API_URL):
+    responses.add(
+        responses.POST,
+        f'{ url }/sessionMngr/?v=v1_4',
+        json={'UserName': 'VEEAM\\veeam.api', 'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+        status=201,
+        headers={'X-RestSvcSessionId': 'MMM'}
+    )
+
+
+def add_logout(url=BASE_API_URL):
+    responses.add(
+        responses.DELETE,
+        f'{ url }/logonSessions/2fb28f4f-46bd-4855-a757-0b8c24f9826b',
+        status=204
+    )
+
+
+def job_page(names, page, pages_count):
+    return {
+        'Entities': {
+            'Jobs': {
+                'Jobs': [{'Name': name, 'UID': 'urn:veeam:Job:{}'.format(name)} for name in names]
+            }
+        },
+        'PagingInfo': {'PageNum': page, 'PageSize': 2, 'PagesCount': pages_count}
+    }
+
+
+class IterQueryTestCase(TestCase):
+    '''
+    Paginated query testcase
+    '''
+
+    @responses.activate
+    def test_iter_query_follows_pages(self):
+        '''
+        Ensure every page of a query is requested in turn
+        '''
+        add_login()
+        responses.add(
+            responses.GET,
+            f'{ BASE_API_URL }/query?type=Job&format=entities&pageSize=2&page=1',
+            json=job_page(['a', 'b'], 1, 2),
+            status=200
+        )
+        responses.add(
+            responses.GET,
+            f'{ BASE_API_URL }/query?type=Job&format=entities&pageSize=2&page=2',
+            json=job_page(['c'], 2, 2),
+            status=200
+        )
+        client = VeeamClient(BASE_API_URL, 'username', 'pass')
+        jobs = [job['Name'] for job in client.iter_query('Job', page_size=2)]
+
+        assert jobs == ['a', 'b', 'c']
+
+
+class ConfigTestCase(TestCase):
+    '''
+    Server config testcase
+    '''
+
+    def write_config(self, content):
+        handle, path = tempfile.mkstemp(suffix='.ini')
+        with os.fdopen(handle, 'w') as config:
+            config.write(content)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def test_load_servers(self):
+        path = self.write_config(
+            '[prod]\nurl = http://prod/api/\nusername = admin\npassword = pass\nverify = true\n'
+        )
+        servers = load_servers(path)
+
+        assert len(servers) == 1
+        assert servers[0].name == 'prod'
+        assert servers[0].url == 'http://prod/api'
+        assert servers[0].verify is True
+
+    def test_missing_config(self):
+        with self.assertRaises(NoConfigError):
+            load_servers('/does/not/exist.ini')
+
+    def test_missing_password(self):
+        path = self.write_config('[prod]\nurl = http://prod/api\nusername = admin\n')
+        with self.assertRaises(NoConfigError):
+            load_servers(path)
+
+
+class ExportTestCase(TestCase):
+    '''
+    NDJSON export testcase
+    '''
+
+    @responses.activate
+    def test_export_multiple_servers(self):
+        '''
+        Ensure records from every server are written with the server name
+        '''
+        other_url = 'http://other:3991/api'
+        for url in (BASE_API_URL, other_url):
+            add_login(url)
+            add_logout(url)
+            responses.add(
+                responses.GET,
+                f'{ url }/query?type=Job&format=entities&pageSize=100&page=1',
+                json=job_page(['a', 'b'], 1, 1),
+                status=200
+            )
+
+        servers = [
+            ServerConfig('one', BASE_API_URL, 'username', 'pass'),
+            ServerConfig('two', other_url, 'username', 'pass'),
+        ]
+        output = io.StringIO()
+        written = export(servers, NdjsonWriter(output), resources=['jobs'])
+
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+
+        assert written == 4
+        assert sorted(record['server'] for record in records) == ['one', 'one', 'two', 'two']
+        assert all(record['message_type'] == 'job' for record in records)
+
+    @responses.activate
+    def test_failed_writer_cancels_collectors(self):
+        '''
+        Ensure the export returns the writer's error rather than waiting on blocked collectors
+        '''
+        add_login()
+        add_logout()
+        responses.add(
+            responses.GET,
+            f'{ BASE_API_URL }/query?type=Job&format=entities&pageSize=100&page=1',
+            json=job_page([str(index) for index in range(50)], 1, 1),
+            status=200
+        )
+
+        class BrokenWriter(object):
+            closed = False
+
+            def write(self, record):
+                raise BrokenPipeError()
+
+            def close(self):
+                self.closed = True
+
+        writer = BrokenWriter()
+        servers = [ServerConfig('one', BASE_API_URL, 'username', 'pass')]
+
+        with self.assertRaises(BrokenPipeError):
+            export(servers, writer, resources=['jobs'], buffer_size=10)
+
+        assert writer.closed
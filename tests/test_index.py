@@ -0,0 +1,115 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock
+
+from veeam.index import RestorePointIndex, parse_vm_restore_point
+
+
+def reference(vm_name, vm_uid, created, number):
+    return {
+        'UID': 'urn:veeam:VmRestorePoint:{}-{}'.format(vm_uid, number),
+        'Name': '{} ({})@{}'.format(vm_name, vm_uid, created),
+        'Type': 'VmRestorePointReference',
+    }
+
+
+class RestorePointIndexTestCase(TestCase):
+    '''
+    VM restore point index testcase
+    '''
+
+    def test_parse_reference_name(self):
+        '''
+        Ensure the vm and creation time are read from a reference name
+        '''
+        point = {
+            'UID': 'urn:veeam:VmRestorePoint:00f5e097-f478-4a63-9a78-e1e12730362d',
+            'Name': 'AB--SQL-Server-41.193.18.74 (8c5586af-e14f-4255-ab5f-931bd01b7c05)@2019-06-17 20:45:56',
+        }
+        assert parse_vm_restore_point(point) == (
+            'AB--SQL-Server-41.193.18.74',
+            '8c5586af-e14f-4255-ab5f-931bd01b7c05',
+            '2019-06-17T20:45:56Z'
+        )
+
+    def test_latest_and_order(self):
+        '''
+        Ensure points are kept in time order whatever order they arrive in
+        '''
+        index = RestorePointIndex()
+        index.add(reference('web01', 'vm-1', '2019-06-18 20:00:00', 2))
+        index.add(reference('web01', 'vm-1', '2019-06-17 20:00:00', 1))
+        index.add(reference('web01', 'vm-1', '2019-06-19 20:00:00', 3))
+
+        assert [created for created, uid in index.restore_points('web01')] == [
+            '2019-06-17T20:00:00Z', '2019-06-18T20:00:00Z', '2019-06-19T20:00:00Z'
+        ]
+        assert index.latest('web01')[0] == '2019-06-19T20:00:00Z'
+        assert index.latest('vm-1') == index.latest('web01')
+        assert index.latest('missing') is None
+        assert not index.add(reference('web01', 'vm-1', '2019-06-19 20:00:00', 3))
+
+    def test_prefix_search(self):
+        index = RestorePointIndex()
+        for number, name in enumerate(['web02', 'db01', 'web01', 'webby', 'app']):
+            index.add(reference(name, 'vm-{}'.format(number), '2019-06-17 20:00:00', number))
+
+        assert index.search('web') == ['web01', 'web02', 'webby']
+        assert index.search('web', limit=2) == ['web01', 'web02']
+        assert index.search('x') == []
+
+    def test_refresh_incremental(self):
+        '''
+        Ensure refresh only queries points from the newest indexed
+        '''
+        client = Mock()
+        client.iter_query.return_value = [reference('web01', 'vm-1', '2019-06-17 20:00:00', 1)]
+        index = RestorePointIndex()
+
+        assert index.refresh(client) == 1
+        assert client.iter_query.call_args[0] == ('VmRestorePoint', None)
+
+        index.refresh(client)
+        assert client.iter_query.call_args[0] == ('VmRestorePoint', 'creationtime>="2019-06-17T20:00:00Z"')
+
+    def test_save_and_load(self):
+        index = RestorePointIndex()
+        index.add(reference('web01', 'vm-1', '2019-06-17 20:00:00', 1))
+        index.add(reference('web01', 'vm-1', '2019-06-18 20:00:00', 2))
+
+        handle, path = tempfile.mkstemp(suffix='.json.gz')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        index.save(path)
+
+        loaded = RestorePointIndex.load(path)
+
+        assert loaded.latest('vm-1') == index.latest('web01')
+        assert loaded.high_water_mark == '2019-06-18T20:00:00Z'
+        assert not loaded.add(reference('web01', 'vm-1', '2019-06-18 20:00:00', 2))
+
+    def test_vms_sharing_a_name(self):
+        '''
+        Ensure VMs with the same name on different hosts keep their own history, also once saved
+        '''
+        index = RestorePointIndex()
+        index.add(reference('web01', 'vm-1', '2019-06-17 20:00:00', 1))
+        index.add(reference('web01', 'vm-2', '2019-06-18 20:00:00', 1))
+        index.add(reference('web01', 'vm-1', '2019-06-16 20:00:00', 2))
+
+        handle, path = tempfile.mkstemp(suffix='.json.gz')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        index.save(path)
+        loaded = RestorePointIndex.load(path)
+
+        for restored in (index, loaded):
+            assert len(restored) == 2
+            assert restored.latest('vm-1')[0] == '2019-06-17T20:00:00Z'
+            assert restored.latest('vm-2')[0] == '2019-06-18T20:00:00Z'
+            assert restored.latest('web01') == restored.latest('vm-2')
+            assert len(restored.restore_points('vm-1')) == 2
+            assert len(restored.restore_points('web01')) == 3
+            assert restored.vm_uids('web01') == ['vm-1', 'vm-2']
+            assert restored.search('web') == ['web01']
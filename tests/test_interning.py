@@ -0,0 +1,56 @@
+import json
+from unittest import TestCase
+
+import requests
+
+from veeam.client import VeeamClient
+from veeam.interning import Interner, measure_decoded
+from veeam.projection import Projection
+from veeam.synthetic import SyntheticAdapter, SyntheticDataset
+
+
+class InternerTestCase(TestCase):
+    '''
+    String interning testcase
+    '''
+
+    def test_repeated_values_are_shared(self):
+        text = json.dumps([{'State': 'Stop' + 'ped', 'UID': 'a'}, {'State': 'Stop' + 'ped', 'UID': 'b'}])
+        plain = json.loads(text)
+        interned = json.loads(text, object_hook=Interner())
+
+        assert plain[0]['State'] is not plain[1]['State']
+        assert interned[0]['State'] is interned[1]['State']
+        assert interned[0]['UID'] == 'a'
+
+    def test_table_is_bounded(self):
+        interner = Interner(max_size=2)
+        for value in ('a', 'b', 'c'):
+            interner.intern(value)
+
+        assert len(interner) == 1
+
+    def test_memory_benchmark(self):
+        '''
+        Measure the memory held by 5000 decoded sessions with and without interning
+        '''
+        dataset = SyntheticDataset(jobs=250, sessions_per_job=20)
+        text = json.dumps({'BackupJobSessions': [dataset.session(index) for index in range(dataset.sessions)]})
+
+        plain = measure_decoded(text)
+        interned = measure_decoded(text, Interner())
+
+        assert interned < plain * 0.85, (plain, interned)
+
+    def test_client_option(self):
+        dataset = SyntheticDataset(jobs=3, sessions_per_job=4)
+        session = requests.Session()
+        session.mount('http://', SyntheticAdapter(dataset))
+        client = VeeamClient('http://veeam.example/api', 'username', 'pass', session=session,
+                             intern_strings=True, projection=Projection())
+        job_uuid = dataset.job(0)['UID'].rsplit(':', 1)[-1]
+
+        sessions = client.get_backup_sessions(job_uuid)['BackupJobSessions']
+
+        assert sessions[0]['JobName'] is sessions[1]['JobName']
+        assert 'Links' not in sessions[0]
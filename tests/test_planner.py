@@ -0,0 +1,73 @@
+from unittest import TestCase
+
+import pytest
+import requests
+from freezegun import freeze_time
+
+from veeam.client import VeeamClient
+from veeam.planner import persistently_failed_jobs, plan
+from veeam.synthetic import SyntheticAdapter, SyntheticDataset
+
+
+class CountingAdapter(SyntheticAdapter):
+
+    def __init__(self, dataset):
+        super().__init__(dataset)
+        self.urls = []
+
+    def send(self, request, **kwargs):
+        if request.method == 'GET':
+            self.urls.append(request.url)
+        return super().send(request, **kwargs)
+
+
+def session(job_name, created, result):
+    return {'JobName': job_name, 'CreationTimeUTC': created, 'Result': result}
+
+
+class PlannerTestCase(TestCase):
+    '''
+    Collection planner testcase
+    '''
+
+    def test_plan_shares_sources(self):
+        assert plan(['jobs_1_day', 'failed_jobs', 'persistently_failed_jobs', 'repos', 'repo_summary']) == [
+            'sessions_1_day', 'repo_summary'
+        ]
+        with pytest.raises(ValueError):
+            plan(['backups'])
+
+    def test_persistently_failed_jobs(self):
+        failed = persistently_failed_jobs([
+            session('web', '2019-07-01T10:00:00Z', 'Failed'),
+            session('web', '2019-07-01T12:00:00Z', 'Warning'),
+            session('db', '2019-07-01T10:00:00Z', 'Success'),
+            session('db', '2019-07-01T12:00:00Z', 'Failed'),
+            session('db', '2019-07-01T14:00:00Z', 'Failed'),
+        ])
+
+        assert [(job['JobName'], job['CreationTimeUTC']) for job in failed] == [
+            ('db', '2019-07-01T12:00:00Z'), ('db', '2019-07-01T14:00:00Z')
+        ]
+        assert all(job['message_type'] == 'job_failed' for job in failed)
+
+    @freeze_time('2019-07-02 12:00:00')
+    def test_collect_matches_individual_methods(self):
+        '''
+        Ensure the derived reports equal the client methods while making fewer requests
+        '''
+        dataset = SyntheticDataset(jobs=20, sessions_per_job=20, interval_hours=4, failure_rate=0.3, seed=2)
+        adapter = CountingAdapter(dataset)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        client = VeeamClient('http://veeam.example/api', 'username', 'pass', session=session, coalesce=False)
+        reports = ['jobs', 'jobs_1_day', 'failed_jobs', 'persistently_failed_jobs', 'repos']
+
+        collected = client.collect(reports)
+        planned_requests = len(adapter.urls)
+        expected = {report: getattr(client, 'get_{}'.format(report))() for report in reports}
+
+        assert planned_requests == 3
+        assert len(adapter.urls) - planned_requests > 2 * planned_requests
+        assert collected['persistently_failed_jobs']
+        assert collected == expected
@@ -0,0 +1,168 @@
+import threading
+from unittest import TestCase
+from unittest.mock import Mock, call
+
+import requests
+import responses
+
+from veeam.client import VeeamClient
+from veeam.errors import SessionExpiredError
+from veeam.poller import Poller
+
+BASE_API_URL = 'http://test:3991/api'
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class PollerTestCase(TestCase):
+    '''
+    Jittered poll scheduler testcase
+    '''
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.client = Mock()
+        self.poller = Poller(self.client, clock=self.clock, seed=1)
+        self.addCleanup(self.poller.stop)
+
+    def wait_idle(self, task):
+        self.poller._executor.submit(lambda: None).result()
+        while task.running:
+            pass
+
+    def test_first_run_within_jitter(self):
+        '''
+        Ensure the first run is spread across the jitter window and lag is recorded
+        '''
+        results = []
+        task = self.poller.add_task('repos', lambda: ['a'], 100, jitter=0.1, on_result=lambda t, r: results.append(r))
+
+        self.clock.now += 10
+        self.poller.run_pending()
+        self.wait_idle(task)
+
+        assert task.runs == 1
+        assert results == [['a']]
+        assert 0 <= task.last_lag <= 10
+
+    def test_skip_when_still_running(self):
+        '''
+        Ensure a cycle is skipped while the previous run is in progress
+        '''
+        release = threading.Event()
+        task = self.poller.add_task('slow', release.wait, 10, jitter=0)
+
+        self.poller.run_pending()
+        self.clock.now += 10
+        self.poller.run_pending()
+        release.set()
+        self.wait_idle(task)
+
+        assert task.runs == 1
+        assert task.skips == 1
+
+    def test_missed_cycles_coalesced(self):
+        '''
+        Ensure missed cycles run once and the next run is scheduled in the future
+        '''
+        task = self.poller.add_task('repos', lambda: [], 10, jitter=0)
+
+        self.clock.now += 55
+        wait = self.poller.run_pending()
+        self.wait_idle(task)
+
+        assert task.runs == 1
+        assert task.last_lag == 55
+        assert wait == 10
+
+    def test_relogin_after_auth_failure(self):
+        '''
+        Ensure the client deletes its logon session and logs in again before the run following an auth failure
+        '''
+        func = Mock(side_effect=[SessionExpiredError('refused'), []])
+        task = self.poller.add_task('jobs', func, 10, jitter=0)
+
+        self.poller.run_pending()
+        self.wait_idle(task)
+        assert task.failures == 1
+        self.client.login.assert_not_called()
+
+        self.clock.now += 10
+        self.poller.run_pending()
+        self.wait_idle(task)
+
+        assert self.client.mock_calls == [call.logout(), call.login()]
+        assert task.last_error is None
+
+    def test_other_failures_keep_session(self):
+        '''
+        Ensure failures that are not auth failures do not log in again
+        '''
+        response = requests.Response()
+        response.status_code = 500
+        func = Mock(side_effect=[KeyError('Entities'), requests.HTTPError(response=response), []])
+        task = self.poller.add_task('jobs', func, 10, jitter=0)
+
+        for _ in range(3):
+            self.poller.run_pending()
+            self.wait_idle(task)
+            self.clock.now += 10
+
+        assert task.failures == 2
+        assert self.client.mock_calls == []
+
+    @responses.activate
+    def test_expired_session_replaced(self):
+        '''
+        Ensure a refused client request leads to one new logon session, the refused one being deleted
+        '''
+        for number in (1, 2):
+            responses.add(
+                responses.POST, f'{ BASE_API_URL }/sessionMngr/?v=v1_4',
+                json={'SessionId': f'session-{ number }'},
+                status=201,
+                headers={'X-RestSvcSessionId': f'token-{ number }'}
+            )
+        responses.add(responses.GET, f'{ BASE_API_URL }/jobs', status=401)
+        responses.add(responses.GET, f'{ BASE_API_URL }/jobs', json={'Refs': []}, status=200)
+        responses.add(responses.DELETE, f'{ BASE_API_URL }/logonSessions/session-1', status=401)
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', thread_sessions=False)
+        poller = Poller(client, workers=1, clock=self.clock, seed=1)
+        self.addCleanup(poller.stop)
+        task = poller.add_task('jobs', client.get_jobs, 10, jitter=0)
+
+        for _ in range(2):
+            poller.run_pending()
+            poller._executor.submit(lambda: None).result()
+            self.clock.now += 10
+
+        assert task.failures == 1 and task.last_error is None
+        assert [request.method for request, _ in responses.calls] == ['POST', 'GET', 'DELETE', 'POST', 'GET']
+        assert client.session_id == 'session-2'
+
+    def test_client_created_by_first_run(self):
+        '''
+        Ensure a poller given `connect` only creates its client when a task needs it, retrying after a failure
+        '''
+        client = Mock()
+        connect = Mock(side_effect=[ConnectionError('down'), client])
+        poller = Poller(workers=1, clock=self.clock, seed=1, connect=connect)
+        self.addCleanup(poller.stop)
+        task = poller.add_task('repos', lambda: poller.get_client().get_repos(), 10, jitter=0)
+        connect.assert_not_called()
+
+        for _ in range(3):
+            poller.run_pending()
+            poller._executor.submit(lambda: None).result()
+            self.clock.now += 10
+
+        assert task.failures == 1
+        assert connect.call_count == 2
+        assert client.get_repos.call_count == 2
@@ -0,0 +1,129 @@
+import itertools
+import json
+from unittest import TestCase
+
+import responses
+
+from veeam.client import VeeamClient
+from veeam.errors import SessionExpiredError
+
+BASE_API_URL = 'http://test:3991/api'
+
+
+class LogonSessionPoolTestCase(TestCase):
+    '''
+    Logon session pool testcase
+    '''
+
+    def setUp(self):
+        self.logins = itertools.count(1)
+
+        def login(request):
+            number = next(self.logins)
+            return (
+                201,
+                {'X-RestSvcSessionId': 'token-{}'.format(number)},
+                json.dumps({'SessionId': 'session-{}'.format(number)})
+            )
+
+        responses.add_callback(responses.POST, f'{ BASE_API_URL }/sessionMngr/?v=v1_4', callback=login)
+
+    def tokens(self, method='GET'):
+        return [
+            call.request.headers['X-RestSvcSessionId']
+            for call in responses.calls if call.request.method == method
+        ]
+
+    @responses.activate
+    def test_pool_logs_in_size_sessions(self):
+        '''
+        Ensure the pool holds the login session plus enough new ones to fill it
+        '''
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', pool_size=3)
+
+        assert [logon.token for logon in client.pool.sessions] == ['token-1', 'token-2', 'token-3']
+
+    @responses.activate
+    def test_least_loaded_session_acquired(self):
+        '''
+        Ensure a borrowed session is not handed out while an idle one exists
+        '''
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', pool_size=2)
+
+        with client.pool.acquire() as first:
+            with client.pool.acquire() as second:
+                assert first is not second
+
+    @responses.activate
+    def test_expired_session_replaced(self):
+        '''
+        Ensure an unauthorised response replaces the session and retries
+        '''
+        responses.add(responses.GET, f'{ BASE_API_URL }/jobs', status=401)
+        responses.add(responses.GET, f'{ BASE_API_URL }/jobs', json={'Refs': []}, status=200)
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', pool_size=1)
+
+        assert client.get_jobs() == {'Refs': []}
+        assert self.tokens() == ['token-1', 'token-2']
+        assert client.pool.replaced == 1
+
+    @responses.activate
+    def test_health_check_replaces_missing_sessions(self):
+        '''
+        Ensure sessions the server no longer knows are replaced
+        '''
+        responses.add(responses.GET, f'{ BASE_API_URL }/logonSessions/session-1', status=404)
+        responses.add(responses.GET, f'{ BASE_API_URL }/logonSessions/session-2', json={}, status=200)
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', pool_size=2)
+
+        assert client.pool.check_health() == 1
+        assert [logon.token for logon in client.pool.sessions] == ['token-3', 'token-2']
+
+    @responses.activate
+    def test_logout_deletes_every_session(self):
+        '''
+        Ensure logging out deletes each pooled session
+        '''
+        for number in (1, 2):
+            responses.add(responses.DELETE, f'{ BASE_API_URL }/logonSessions/session-{ number }', status=204)
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', pool_size=2)
+        client.logout()
+
+        assert self.tokens('DELETE') == ['token-1', 'token-2']
+
+    @responses.activate
+    def test_login_after_logout_fills_pool(self):
+        '''
+        Ensure logging in again after a logout gives the pool new sessions
+        '''
+        for number in (1, 2):
+            responses.add(responses.DELETE, f'{ BASE_API_URL }/logonSessions/session-{ number }', status=204)
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', pool_size=2)
+        client.logout()
+        client.login()
+
+        assert [logon.token for logon in client.pool.sessions] == ['token-3', 'token-4']
+
+    @responses.activate
+    def test_request_after_logout_is_expired(self):
+        '''
+        Ensure a request on a closed pool fails as an expired session
+        '''
+        responses.add(responses.DELETE, f'{ BASE_API_URL }/logonSessions/session-1', status=204)
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', pool_size=1)
+        client.logout()
+
+        with self.assertRaises(SessionExpiredError):
+            client.get_jobs()
+
+    @responses.activate
+    def test_forbidden_is_not_expiry(self):
+        '''
+        Ensure a permission denied response does not replace the session
+        '''
+        responses.add(responses.POST, f'{ BASE_API_URL }/jobs/1?action=start', json={'Message': 'Denied'}, status=403)
+        client = VeeamClient(BASE_API_URL, 'username', 'pass', pool_size=1)
+
+        assert client.start_job('1') == {'Message': 'Denied'}
+        assert client.pool.replaced == 0
+        assert [call.request.url for call in responses.calls].count(f'{ BASE_API_URL }/jobs/1?action=start') == 1
@@ -0,0 +1,115 @@
+import json
+from unittest import TestCase
+
+import requests
+from freezegun import freeze_time
+
+from veeam.client import VeeamClient
+from veeam.projection import COMPACT, DROP, KEEP, Projection
+from veeam.storage import collect_backup_files
+from veeam.synthetic import SyntheticAdapter, SyntheticDataset
+from veeam.tracker import FailedJobTracker
+
+BACKUP = {
+    'BackupType': 'Standard',
+    'Name': 'Backup Job 1',
+    'UID': 'urn:veeam:Backup:f657bc5d-c905-4551-b923-00ab2e7d6fe7',
+    'Links': [
+        {
+            'Rel': 'Up',
+            'Href': 'http://test:9399/api/backupServers/0d7ba13d-6b15-4bad-94ea-9b8de3e8bc2e',
+            'Name': 'veeam.example',
+            'Type': 'BackupServerReference'
+        },
+    ],
+    'Href': 'http://test:9399/api/backups/f657bc5d-c905-4551-b923-00ab2e7d6fe7?format=Entity',
+    'Type': 'Backup'
+}
+
+
+def decode(payload, projection):
+    return json.loads(json.dumps(payload), object_hook=projection)
+
+
+class ProjectionTestCase(TestCase):
+    '''
+    Decode time projection testcase
+    '''
+
+    def test_drop_links(self):
+        backup = decode({'Backups': [BACKUP]}, Projection())['Backups'][0]
+
+        assert 'Links' not in backup and 'Href' not in backup
+        assert backup['Name'] == 'Backup Job 1'
+
+    def test_compact_links(self):
+        backup = decode(BACKUP, Projection(links=COMPACT))
+
+        assert backup['Href'] == 'backups/f657bc5d-c905-4551-b923-00ab2e7d6fe7?format=Entity'
+        assert backup['Links'] == [(
+            'Up', 'BackupServerReference', 'veeam.example', 'backupServers/0d7ba13d-6b15-4bad-94ea-9b8de3e8bc2e'
+        )]
+
+    def test_fields_keep_uid(self):
+        backup = decode(BACKUP, Projection(fields=['Name'], links=KEEP))
+
+        assert backup == {'Name': 'Backup Job 1', 'UID': BACKUP['UID']}
+        assert decode(BACKUP, Projection(links=KEEP)) == BACKUP
+
+    def test_invalid_links_mode(self):
+        with self.assertRaises(ValueError):
+            Projection(links='strip')
+
+    def test_client_methods(self):
+        '''
+        Ensure the client default and per call projections are applied and cached separately
+        '''
+        dataset = SyntheticDataset(jobs=5, sessions_per_job=20)
+        session = requests.Session()
+        session.mount('http://', SyntheticAdapter(dataset))
+        client = VeeamClient('http://veeam.example/api', 'username', 'pass', session=session,
+                             projection=Projection(links=DROP))
+        job_uuid = dataset.job(0)['UID'].rsplit(':', 1)[-1]
+
+        sessions = client.get_backup_sessions(job_uuid)['BackupJobSessions']
+        narrow = client.get_backup_sessions(job_uuid, projection=Projection(fields=['Result']))
+        full = client.get_backup_sessions(job_uuid, projection=Projection(links=KEEP))
+
+        assert len(sessions) == 20 and all('Links' not in job_session for job_session in sessions)
+        assert set(narrow['BackupJobSessions'][0]) == {'UID', 'Result', 'CreationTimeUTC'}
+        assert 'Links' in full['BackupJobSessions'][0]
+        assert len(json.dumps(narrow)) < len(json.dumps(sessions)) < len(json.dumps(full))
+
+
+class InternalReadersTestCase(TestCase):
+    '''
+    Ensure the client default projection does not hide what the client itself reads
+    '''
+
+    def get_client(self, projection, **kwargs):
+        dataset = SyntheticDataset(jobs=12, sessions_per_job=12, repositories=3, **kwargs)
+        session = requests.Session()
+        session.mount('http://', SyntheticAdapter(dataset))
+        return VeeamClient('http://veeam.example/api', 'username', 'pass', session=session, projection=projection)
+
+    def test_storage_keeps_repository_links(self):
+        table = collect_backup_files(self.get_client(Projection(links=DROP)), workers=4)
+
+        assert sorted(total['repository'] for total in table.aggregate('repository')) == [
+            'Repository_00', 'Repository_01', 'Repository_02'
+        ]
+
+    @freeze_time('2019-07-02 12:00:00')
+    def test_failed_jobs_with_fields(self):
+        client = self.get_client(Projection(fields=['Result']), interval_hours=4, failure_rate=0.3, seed=2)
+
+        failed = client.get_persistently_failed_jobs()
+        tracker = FailedJobTracker()
+        tracker.update(client, since='2019-07-01T12:00:00Z')
+
+        assert failed
+        assert {job['JobName'] for job in failed} == {
+            job['JobName'] for job in tracker.get_persistently_failed_jobs()
+        }
+        assert set(failed[0]) == {'UID', 'Result', 'JobName', 'CreationTimeUTC', 'message_type'}
+        assert client.collect(['persistently_failed_jobs'])['persistently_failed_jobs']
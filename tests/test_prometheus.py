@@ -0,0 +1,106 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+import requests
+
+from veeam.cli import refresh_metrics
+from veeam.client import VeeamClient
+from veeam.poller import Poller
+from veeam.prometheus import MetricsServer, PrometheusExporter, snake_case
+from veeam.synthetic import SyntheticAdapter, SyntheticDataset
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class PrometheusExporterTestCase(TestCase):
+    '''
+    Prometheus exporter testcase
+    '''
+
+    def setUp(self):
+        self.clock = Clock()
+        self.exporter = PrometheusExporter(clock=self.clock)
+        dataset = SyntheticDataset(jobs=10, repositories=2)
+        session = requests.Session()
+        session.mount('http://', SyntheticAdapter(dataset))
+        self.client = VeeamClient('http://veeam.example/api', 'username', 'pass', session=session)
+
+    def test_snake_case(self):
+        assert snake_case('RunningJobs') == 'running_jobs'
+        assert snake_case('SuccessfulVmLastestStates') == 'successful_vm_lastest_states'
+
+    def test_render_snapshot(self):
+        self.exporter.refresh('production', self.client)
+        self.clock.now += 42
+
+        text = self.exporter.render()
+
+        assert text.count('# TYPE veeam_repository_capacity_bytes gauge') == 1
+        assert 'veeam_repository_capacity_bytes{server="production",repository="Repository_01"}' in text
+        assert 'veeam_job_statistics_scheduled_jobs{server="production"} 10.0' in text
+        assert 'veeam_overview_proxy_servers{server="production"} 1.0' in text
+        assert 'veeam_exporter_refresh_success{server="production"} 1.0' in text
+        assert text.endswith('veeam_exporter_data_age_seconds{server="production"} 42.0\n')
+
+    def test_failed_refresh_keeps_aging_data(self):
+        self.exporter.refresh('production', self.client)
+        broken = Mock()
+        broken.get_repos.side_effect = requests.exceptions.ConnectionError()
+        self.clock.now += 300
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.exporter.refresh('production', broken)
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.exporter.refresh('staging', broken)
+        text = self.exporter.render()
+
+        assert 'veeam_exporter_refresh_success{server="production"} 0.0' in text
+        assert 'veeam_exporter_refresh_success{server="staging"} 0.0' in text
+        assert 'veeam_repository_free_bytes{server="production"' in text
+        assert 'veeam_exporter_data_age_seconds{server="production"} 300.0' in text
+        assert 'veeam_exporter_data_age_seconds{server="staging"} 300.0' in text
+
+    def test_server_down_at_start(self):
+        '''
+        Ensure a server that cannot be reached is exported as failing until it is back
+        '''
+        connect = Mock(side_effect=[requests.exceptions.ConnectionError(), self.client])
+        poller = Poller(connect=connect)
+        self.addCleanup(poller.stop)
+        refresh = refresh_metrics(self.exporter, 'production', poller)
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            refresh()
+        self.clock.now += 120
+        down = self.exporter.render()
+        refresh()
+        up = self.exporter.render()
+
+        assert 'veeam_exporter_refresh_success{server="production"} 0.0' in down
+        assert 'veeam_exporter_data_age_seconds{server="production"} 120.0' in down
+        assert 'veeam_exporter_data_age_seconds{server="production"} 0.0' in up
+        assert 'veeam_exporter_refresh_success{server="production"} 1.0' in up
+        assert poller.client is self.client
+        assert connect.call_count == 2
+
+    def test_scrape_does_not_call_veeam(self):
+        client = Mock(wraps=self.client)
+        self.exporter.refresh('production', client)
+        calls = len(client.mock_calls)
+
+        with MetricsServer(self.exporter) as server:
+            responses = [requests.get(server.url) for _ in range(3)]
+            missing = requests.get(server.url.replace('/metrics', '/other'))
+
+        assert all(response.status_code == 200 for response in responses)
+        assert responses[0].headers['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert 'veeam_overview_backup_servers' in responses[0].text
+        assert missing.status_code == 404
+        assert len(client.mock_calls) == calls
@@ -0,0 +1,98 @@
+from unittest import TestCase
+from unittest.mock import Mock
+
+from veeam.rpo import RpoEvaluator, to_epoch
+
+NOW = to_epoch('2019-07-02T00:00:00Z')
+
+
+class RpoEvaluatorTestCase(TestCase):
+    '''
+    RPO compliance testcase
+    '''
+
+    def test_violations_worst_first(self):
+        '''
+        Ensure only vms older than their RPO are returned, most lagged first
+        '''
+        evaluator = RpoEvaluator(default_rpo=86400)
+        evaluator.observe('ok', '2019-07-01T12:00:00Z')
+        evaluator.observe('late', '2019-06-30T12:00:00Z')
+        evaluator.observe('later', '2019-06-29T00:00:00Z')
+
+        violations = evaluator.evaluate(now=NOW)
+
+        assert [violation['vm'] for violation in violations] == ['later', 'late']
+        assert violations[1]['lag'] == 36 * 3600
+
+    def test_evaluate_defaults_to_now(self):
+        '''
+        Ensure evaluate uses the current time when none is given
+        '''
+        evaluator = RpoEvaluator(default_rpo=86400)
+        evaluator.observe('old', '2019-06-30T12:00:00Z')
+        evaluator.observe('future', '2999-01-01T00:00:00Z')
+
+        violations = evaluator.evaluate()
+
+        assert [violation['vm'] for violation in violations] == ['old']
+
+    def test_policy_and_never_backed_up(self):
+        '''
+        Ensure per vm policies apply and vms with no restore point are reported first
+        '''
+        evaluator = RpoEvaluator(default_rpo=86400)
+        evaluator.observe('hourly', '2019-07-01T22:00:00Z')
+        evaluator.set_policy('hourly', 3600)
+        evaluator.set_policy('new', 3600)
+        evaluator.observe('late', '2019-06-30T00:00:00Z')
+
+        violations = evaluator.evaluate(now=NOW)
+
+        assert [violation['vm'] for violation in violations] == ['new', 'late', 'hourly']
+        assert violations[0]['last_good'] is None
+
+    def test_last_good_only_moves_forward(self):
+        '''
+        Ensure an older restore point or a failed task does not replace a newer one
+        '''
+        evaluator = RpoEvaluator()
+        evaluator.observe_restore_point({
+            'UID': 'urn:veeam:VmRestorePoint:1',
+            'Name': 'web01 (vm-1)@2019-07-01 20:00:00',
+        })
+        evaluator.observe_restore_point({
+            'UID': 'urn:veeam:VmRestorePoint:0',
+            'Name': 'web01 (vm-1)@2019-06-30 20:00:00',
+        })
+        evaluator.observe_task_session({
+            'VmDisplayName': 'web01', 'Result': 'Failed', 'EndTimeUTC': '2019-07-01T23:00:00Z'
+        })
+
+        assert evaluator.last_good('web01') == to_epoch('2019-07-01T20:00:00Z')
+
+        evaluator.observe_task_session({
+            'VmDisplayName': 'web01', 'Result': 'Warning', 'EndTimeUTC': '2019-07-01T23:00:00Z'
+        })
+        assert evaluator.last_good('web01') == to_epoch('2019-07-01T23:00:00Z')
+
+    def test_task_sessions_do_not_skip_restore_points(self):
+        '''
+        Ensure refresh still queries restore points older than an observed task session
+        '''
+        client = Mock(projection=None)
+        client.iter_query.return_value = [{
+            'UID': 'urn:veeam:VmRestorePoint:1',
+            'Name': 'db01 (vm-2)@2019-07-01 20:00:00',
+        }]
+        evaluator = RpoEvaluator()
+        evaluator.observe_task_session({
+            'VmDisplayName': 'web01', 'Result': 'Success', 'EndTimeUTC': '2019-07-01T23:00:00Z'
+        })
+
+        evaluator.refresh(client)
+        assert client.iter_query.call_args[0] == ('VmRestorePoint', None)
+
+        evaluator.refresh(client)
+        assert client.iter_query.call_args[0] == ('VmRestorePoint', 'creationtime>="2019-07-01T20:00:00Z"')
+        assert evaluator.last_good('db01') == to_epoch('2019-07-01T20:00:00Z')
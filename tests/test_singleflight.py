@@ -0,0 +1,131 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase, mock
+
+import responses
+
+from veeam.client import VeeamClient
+from veeam.singleflight import SingleFlight
+
+BASE_API_URL = 'http://test:3991/api'
+
+
+class SingleFlightTestCase(TestCase):
+    '''
+    Single-flight deduplication testcase
+    '''
+
+    def run_concurrently(self, func, callers=5):
+        '''
+        Start callers that all block inside the leader's call, then release it
+        '''
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def blocking():
+            calls.append(1)
+            started.set()
+            release.wait()
+            return func()
+
+        flight = SingleFlight()
+        with ThreadPoolExecutor(max_workers=callers) as executor:
+            leader = executor.submit(flight.do, 'key', blocking)
+            started.wait()
+            followers = [executor.submit(flight.do, 'key', blocking) for _ in range(callers - 1)]
+            # give the followers time to join the call in flight
+            time.sleep(0.1)
+            release.set()
+            futures = [leader] + followers
+
+        return calls, futures, flight
+
+    def test_concurrent_calls_share_result(self):
+        '''
+        Ensure concurrent callers of the same key run the function once
+        '''
+        result = {'Jobs': []}
+        calls, futures, flight = self.run_concurrently(lambda: result)
+
+        assert len(calls) == 1
+        assert all(future.result() is result for future in futures)
+        assert flight.in_flight() == 0
+
+    def test_error_shared(self):
+        '''
+        Ensure followers receive the leader's exception
+        '''
+        def fail():
+            raise ValueError('boom')
+
+        calls, futures, flight = self.run_concurrently(fail)
+
+        assert len(calls) == 1
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result()
+        assert flight.in_flight() == 0
+
+    def test_sequential_calls_not_cached(self):
+        '''
+        Ensure a completed call is not reused
+        '''
+        flight = SingleFlight()
+        assert flight.do('key', lambda: 1) == 1
+        assert flight.do('key', lambda: 2) == 2
+
+    @responses.activate
+    def test_client_coalesces_identical_gets(self):
+        '''
+        Ensure concurrent identical client calls send one request
+        '''
+        responses.add(
+            responses.POST, f'{ BASE_API_URL }/sessionMngr/?v=v1_4',
+            json={'UserName': 'VEEAM\\veeam.api', 'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+            status=201,
+            headers={'X-RestSvcSessionId': 'MMM'}
+        )
+        release = threading.Event()
+
+        def overview(request):
+            release.wait()
+            return (200, {}, '{"BackupServers": 1}')
+
+        responses.add_callback(responses.GET, f'{ BASE_API_URL }/reports/summary/overview', callback=overview)
+
+        client = VeeamClient(BASE_API_URL, 'username', 'pass')
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(client.get_summary_overview) for _ in range(5)]
+            time.sleep(0.1)
+            release.set()
+
+        assert all(future.result() == {'BackupServers': 1} for future in futures)
+        # the login and a single overview request
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_annotating_does_not_change_shared_result(self):
+        '''
+        Ensure methods adding a message_type copy the entities of a possibly shared result
+        '''
+        session = {'UID': 'urn:veeam:BackupJobSession:1', 'JobName': 'Backup Job 1',
+                   'CreationTimeUTC': '2019-07-01T22:00:00Z', 'Result': 'Failed'}
+        shared = {'Entities': {'BackupJobSessions': {'BackupJobSessions': [session]}}}
+        responses.add(
+            responses.POST, f'{ BASE_API_URL }/sessionMngr/?v=v1_4',
+            json={'UserName': 'VEEAM\\veeam.api', 'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+            status=201,
+            headers={'X-RestSvcSessionId': 'MMM'}
+        )
+        client = VeeamClient(BASE_API_URL, 'username', 'pass')
+
+        with mock.patch.object(client, '_get', return_value=shared):
+            jobs = client.get_jobs_1_day()
+        with mock.patch.object(client, '_get', side_effect=[shared, {'Entities': {'BackupJobSessions': {'BackupJobSessions': []}}}]):
+            failed = client.get_persistently_failed_jobs()
+
+        assert jobs[0]['message_type'] == 'job'
+        assert failed[0]['message_type'] == 'job_failed'
+        assert 'message_type' not in session
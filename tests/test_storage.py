@@ -0,0 +1,90 @@
+from unittest import TestCase
+
+import requests
+import responses
+
+from veeam.client import VeeamClient
+from veeam.storage import BackupFileTable, collect_backup_files
+from veeam.synthetic import SyntheticAdapter, SyntheticDataset
+
+BASE_API_URL = 'http://test:3991/api'
+
+
+def backup(name, repository):
+    return {
+        'Name': name,
+        'UID': 'urn:veeam:Backup:{}'.format(name),
+        'Links': [{'Rel': 'Up', 'Name': repository, 'Type': 'RepositoryReference'}],
+    }
+
+
+def backup_file(backup_size, data_size, dedup, compress):
+    return {
+        'FilePath': 'D:\\Backups\\file.vib',
+        'BackupSize': backup_size,
+        'DataSize': data_size,
+        'DeduplicationRatio': dedup,
+        'CompressRatio': compress,
+        'FileType': 'vib',
+    }
+
+
+class BackupFileTableTestCase(TestCase):
+    '''
+    Backup file storage aggregation testcase
+    '''
+
+    def test_aggregate_by_job_and_repository(self):
+        table = BackupFileTable()
+        table.add_backup(backup('web', 'repo1'), [backup_file(100, 300, 1.0, 3.0), backup_file(50, 100, 2.0, 1.0)])
+        table.add_backup(backup('db', 'repo1'), [backup_file(400, 800, 1.0, 2.0)])
+
+        by_job = table.aggregate('job')
+        by_repository = table.aggregate('repository')
+
+        assert [total['job'] for total in by_job] == ['db', 'web']
+        assert by_job[1]['files'] == 2
+        assert by_job[1]['backup_size'] == 150
+        assert by_job[1]['dedup_ratio'] == 1.25
+        assert by_job[1]['compress_ratio'] == 2.5
+        assert by_job[1]['reduction_ratio'] == 2.67
+        assert by_repository == [{
+            'repository': 'repo1', 'files': 3, 'backup_size': 550, 'data_size': 1200,
+            'dedup_ratio': 1.08, 'compress_ratio': 2.17, 'reduction_ratio': 2.18,
+            'message_type': 'storage_repository',
+        }]
+
+    @responses.activate
+    def test_get_backup_files(self):
+        responses.add(
+            responses.POST, f'{ BASE_API_URL }/sessionMngr/?v=v1_4',
+            json={'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+            status=201,
+            headers={'X-RestSvcSessionId': 'MMM'}
+        )
+        responses.add(
+            responses.GET,
+            f'{ BASE_API_URL }/backups/f657bc5d-c905-4551-b923-00ab2e7d6fe7/backupFiles?format=Entity',
+            json={'BackupFiles': [backup_file(1, 2, 1.0, 2.0)]},
+            status=200
+        )
+        client = VeeamClient(BASE_API_URL, 'username', 'pass')
+
+        assert client.get_backup_files('f657bc5d-c905-4551-b923-00ab2e7d6fe7')['BackupFiles'][0]['DataSize'] == 2
+
+    def test_collect_every_backup(self):
+        '''
+        Ensure the files of every backup are collected
+        '''
+        dataset = SyntheticDataset(jobs=12, sessions_per_job=4, repositories=3)
+        session = requests.Session()
+        session.mount('http://', SyntheticAdapter(dataset))
+        client = VeeamClient('http://veeam.example/api', 'username', 'pass', session=session)
+
+        table = collect_backup_files(client, workers=4)
+
+        assert len(table) == 12 * 4
+        assert len(table.aggregate('job')) == 12
+        assert sorted(total['repository'] for total in table.aggregate('repository')) == [
+            'Repository_00', 'Repository_01', 'Repository_02'
+        ]
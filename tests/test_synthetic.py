@@ -0,0 +1,122 @@
+import datetime
+from unittest import TestCase
+
+import requests
+
+from veeam.cli import get_parser
+from veeam.client import VeeamClient
+from veeam.synthetic import FakeVeeamServer, SyntheticAdapter, SyntheticDataset, parse_filter
+
+
+def synthetic_client(dataset):
+    session = requests.Session()
+    session.mount('http://', SyntheticAdapter(dataset))
+    return VeeamClient('http://veeam.example:9399/api', 'username', 'pass', session=session)
+
+
+class SyntheticDatasetTestCase(TestCase):
+    '''
+    Synthetic dataset testcase
+    '''
+
+    def test_deterministic(self):
+        '''
+        Ensure the same seed gives the same entities and a different seed does not
+        '''
+        first = SyntheticDataset(jobs=50, seed=3)
+        second = SyntheticDataset(jobs=50, seed=3)
+
+        assert first.session(1234) == second.session(1234)
+        assert first.vm_restore_point(999) == second.vm_restore_point(999)
+        assert first.job_vms == second.job_vms
+        assert SyntheticDataset(jobs=50, seed=4).session(1234) != first.session(1234)
+
+    def test_skew_keeps_mean(self):
+        '''
+        Ensure skew changes the spread of vms per job but not the total much
+        '''
+        flat = SyntheticDataset(jobs=500, vms_per_job=10, skew=0)
+        skewed = SyntheticDataset(jobs=500, vms_per_job=10, skew=1)
+
+        assert set(flat.job_vms) == {10}
+        assert max(skewed.job_vms) > 20
+        assert abs(skewed.vms - flat.vms) < flat.vms * 0.1
+
+    def test_parse_filter(self):
+        assert parse_filter('jobname=="a b";(result=="Success",result=="Warning");creationtime>"2019-06-30"') == [
+            [('JobName', '==', 'a b')],
+            [('Result', '==', 'Success'), ('Result', '==', 'Warning')],
+            [('CreationTimeUTC', '>', '2019-06-30')],
+        ]
+
+    def test_client_pages_through_query(self):
+        '''
+        Ensure a paginated query returns every session exactly once
+        '''
+        dataset = SyntheticDataset(jobs=7, sessions_per_job=5)
+        client = synthetic_client(dataset)
+
+        sessions = list(client.iter_query('BackupJobSession', page_size=4))
+
+        assert len(sessions) == dataset.sessions
+        assert len({session['UID'] for session in sessions}) == dataset.sessions
+
+    def test_filtered_pages_match_once(self):
+        '''
+        Ensure the pages of a filtered query do not test every entity again
+        '''
+        dataset = SyntheticDataset(jobs=20, sessions_per_job=10, failure_rate=0.5)
+        tested = []
+        session = dataset.session
+        dataset.session = lambda index: tested.append(index) or session(index)
+        client = synthetic_client(dataset)
+
+        failed = list(client.iter_query('BackupJobSession', 'result=="Failed"', page_size=10))
+
+        assert len(failed) > 20
+        assert all(job_session['Result'] == 'Failed' for job_session in failed)
+        assert len(tested) == dataset.sessions + len(failed)
+
+    def test_fake_server_end(self):
+        '''
+        Ensure the fake server's newest sessions are created at --end, defaulting to now
+        '''
+        parser = get_parser()
+        args = parser.parse_args(['fake-server', '--end', '2019-07-02T12:00:00+02:00'])
+
+        assert args.end == datetime.datetime(2019, 7, 2, 10)
+        assert parser.parse_args(['fake-server']).end is None
+
+    def test_client_methods(self):
+        '''
+        Ensure the existing client methods work against the dataset
+        '''
+        dataset = SyntheticDataset(jobs=20, sessions_per_job=10, failure_rate=0.3, seed=2)
+        client = synthetic_client(dataset)
+
+        yesterday = '2019-06-30T22:00:00Z'
+        client.get_date_yesterday = lambda: yesterday
+        failed = client.get_failed_jobs()
+        persistently_failed = client.get_persistently_failed_jobs()
+
+        assert failed
+        assert all(job['Result'] == 'Failed' and job['CreationTimeUTC'] > yesterday for job in failed)
+        assert {job['UID'] for job in persistently_failed} <= {job['UID'] for job in failed}
+        assert len(client.get_repos()) == dataset.repositories
+
+        backup_uuid = client.get_backups()['Refs'][3]['UID'].split(':')[-1]
+        restore_points = client.get_restore_points(backup_uuid)['Refs']
+        vm_points = client.get_vm_restore_points(restore_points[0]['UID'].split(':')[-1])['Refs']
+
+        assert len(restore_points) == dataset.sessions_per_job
+        assert len(vm_points) == dataset.job_vms[3]
+
+    def test_fake_server(self):
+        '''
+        Ensure the fake server answers over http
+        '''
+        with FakeVeeamServer(SyntheticDataset(jobs=3)) as server:
+            with VeeamClient(server.url, 'username', 'pass') as client:
+                jobs = client.get_jobs()
+
+        assert len(jobs['Refs']) == 3
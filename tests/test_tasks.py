@@ -0,0 +1,150 @@
+from concurrent.futures import CancelledError
+from unittest import TestCase
+from unittest.mock import Mock
+
+import responses
+
+from veeam.client import VeeamClient
+from veeam.tasks import TaskWaiter
+
+BASE_API_URL = 'http://test:3991/api'
+
+
+def task(task_id, state='Running'):
+    return {'TaskId': task_id, 'State': state, 'Operation': 'StartJob'}
+
+
+class TaskWaiterTestCase(TestCase):
+    '''
+    Task polling testcase
+    '''
+
+    def make_waiter(self, client, **kwargs):
+        waiter = TaskWaiter(client, min_interval=0.001, max_interval=0.01, **kwargs)
+        self.addCleanup(waiter.stop)
+        return waiter
+
+    def test_finished_task_resolved_immediately(self):
+        client = Mock()
+        waiter = self.make_waiter(client)
+
+        assert waiter.add(task('task-1', 'Finished')).result(timeout=1)['TaskId'] == 'task-1'
+        client.get_task.assert_not_called()
+
+    def test_polls_until_finished(self):
+        '''
+        Ensure a task is checked until finished
+        '''
+        client = Mock()
+        client.get_task.side_effect = [task('task-1'), task('task-1'), task('task-1', 'Finished')]
+        waiter = self.make_waiter(client)
+
+        result = waiter.wait([waiter.add(task('task-1'))], timeout=1)
+
+        assert result == [task('task-1', 'Finished')]
+        assert client.get_task.call_count == 3
+
+    def test_many_tasks_checked_with_one_list(self):
+        '''
+        Ensure many due tasks are read from a single listing of all tasks
+        '''
+        client = Mock()
+        client.get_tasks.return_value = {
+            'Tasks': [task('task-{}'.format(number), 'Finished') for number in range(20)]
+        }
+        waiter = TaskWaiter(client, list_threshold=10)
+        self.addCleanup(waiter.stop)
+        due = [
+            Mock(task_id='task-{}'.format(number), state='Running', interval=1, errors=0)
+            for number in range(20)
+        ]
+
+        waiter.check(due)
+
+        assert all(tracked.future.set_result.called for tracked in due)
+        client.get_task.assert_not_called()
+        assert waiter.list_checks == 1
+        assert waiter.pending() == 0
+
+    def test_unchanged_state_backs_off(self):
+        '''
+        Ensure the check interval grows while the state is unchanged and resets on change
+        '''
+        client = Mock()
+        waiter = TaskWaiter(client, min_interval=1, max_interval=4, backoff=2)
+        tracked = Mock(task_id='task-1', state='Running', interval=1, errors=0)
+
+        client.get_task.return_value = task('task-1')
+        waiter.check([tracked])
+        waiter.check([tracked])
+        waiter.check([tracked])
+        assert tracked.interval == 4
+
+        client.get_task.return_value = task('task-1', 'Stopping')
+        waiter.check([tracked])
+        assert tracked.interval == 1
+        waiter.stop()
+
+    def test_errors_fail_future(self):
+        '''
+        Ensure a task that cannot be checked eventually fails its future
+        '''
+        client = Mock()
+        client.get_task.side_effect = ValueError('bad json')
+        waiter = self.make_waiter(client, max_errors=2)
+
+        future = waiter.add(task('task-1'))
+
+        with self.assertRaises(ValueError):
+            future.result(timeout=1)
+
+
+    def test_stop_cancels_pending_tasks(self):
+        '''
+        Ensure waiting on a task still tracked when the waiter stops does not block
+        '''
+        client = Mock()
+        client.get_task.return_value = task('task-1')
+        waiter = TaskWaiter(client, min_interval=60)
+
+        future = waiter.add(task('task-1'))
+        waiter.stop()
+
+        assert future.cancelled()
+        assert waiter.add(task('task-2')).cancelled()
+        with self.assertRaises(CancelledError):
+            future.result(timeout=1)
+
+class JobActionTestCase(TestCase):
+    '''
+    Job action testcase
+    '''
+
+    @responses.activate
+    def test_start_job(self):
+        '''
+        Ensure starting a job posts the start action and returns the task
+        '''
+        responses.add(
+            responses.POST, f'{ BASE_API_URL }/sessionMngr/?v=v1_4',
+            json={'SessionId': '2fb28f4f-46bd-4855-a757-0b8c24f9826b'},
+            status=201,
+            headers={'X-RestSvcSessionId': 'MMM'}
+        )
+        responses.add(
+            responses.POST,
+            f'{ BASE_API_URL }/jobs/9be68a1c-7893-4c92-93e9-043be7533759?action=start',
+            json=task('task-1'),
+            status=202
+        )
+        responses.add(
+            responses.GET,
+            f'{ BASE_API_URL }/tasks/task-1',
+            json=task('task-1', 'Finished'),
+            status=200
+        )
+        client = VeeamClient(BASE_API_URL, 'username', 'pass')
+        started = client.start_job('9be68a1c-7893-4c92-93e9-043be7533759')
+
+        assert started == task('task-1')
+        assert client.wait_for_tasks([started], timeout=5) == [task('task-1', 'Finished')]
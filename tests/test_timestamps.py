@@ -0,0 +1,56 @@
+import calendar
+import random
+import time
+from unittest import TestCase
+
+import requests
+
+from veeam.client import VeeamClient
+from veeam.synthetic import SyntheticAdapter, SyntheticDataset
+from veeam.timestamps import add_epoch_fields, parse_epoch
+
+
+class ParseEpochTestCase(TestCase):
+    '''
+    Veeam timestamp parsing testcase
+    '''
+
+    def test_matches_strptime(self):
+        rng = random.Random(0)
+        timestamps = ['1900-01-01T00:00:00Z', '2000-02-29T23:59:59Z', '2019-12-31T12:00:00Z']
+        timestamps += [
+            time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(rng.randint(0, 4102444800))) for _ in range(1000)
+        ]
+
+        for timestamp in timestamps:
+            assert parse_epoch(timestamp) == calendar.timegm(time.strptime(timestamp, '%Y-%m-%dT%H:%M:%SZ'))
+
+    def test_fraction_and_invalid(self):
+        assert parse_epoch('2019-07-01T22:00:00.517Z') == parse_epoch('2019-07-01T22:00:00Z') == 1562018400
+
+        for timestamp in ('2019-07-01 22:00:00Z', '2019-07-01T22:00:00', 'Jul 01 2019'):
+            with self.assertRaises(ValueError):
+                parse_epoch(timestamp)
+
+    def test_add_epoch_fields(self):
+        entity = add_epoch_fields({
+            'CreationTimeUTC': '1970-01-02T00:00:00Z', 'EndTimeUTC': 'unknown', 'Name': 'job'
+        })
+
+        assert entity == {
+            'CreationTimeUTC': '1970-01-02T00:00:00Z', 'CreationTimeEpoch': 86400,
+            'EndTimeUTC': 'unknown', 'Name': 'job'
+        }
+
+    def test_client_epoch_fields(self):
+        dataset = SyntheticDataset(jobs=2, sessions_per_job=5)
+        session = requests.Session()
+        session.mount('http://', SyntheticAdapter(dataset))
+        client = VeeamClient('http://veeam.example/api', 'username', 'pass', session=session, epoch_fields=True)
+        job_uuid = dataset.job(0)['UID'].rsplit(':', 1)[-1]
+
+        sessions = client.get_backup_sessions(job_uuid)['BackupJobSessions']
+        epochs = [job_session['CreationTimeEpoch'] for job_session in sessions]
+
+        assert epochs == sorted(epochs, reverse=True)
+        assert epochs[0] == parse_epoch(sessions[0]['CreationTimeUTC'])
@@ -0,0 +1,80 @@
+import os
+import tempfile
+from unittest import TestCase
+from unittest.mock import Mock
+
+from veeam.tracker import FailedJobTracker
+
+
+def session(uid, job_name, created, result, state='Stopped'):
+    return {
+        'UID': uid,
+        'JobName': job_name,
+        'CreationTimeUTC': created,
+        'Result': result,
+        'State': state,
+    }
+
+
+class FailedJobTrackerTestCase(TestCase):
+    '''
+    Persistently failed job tracker testcase
+    '''
+
+    def test_persistently_failed(self):
+        '''
+        Ensure a job is persistently failed until a later success
+        '''
+        tracker = FailedJobTracker()
+        tracker.observe(session('1', 'backup', '2019-07-01T01:00:00Z', 'Success'))
+        tracker.observe(session('2', 'backup', '2019-07-01T04:00:16Z', 'Failed'))
+        tracker.observe(session('3', 'fixed', '2019-07-01T04:00:00Z', 'Failed'))
+        tracker.observe(session('4', 'fixed', '2019-07-01T05:00:00Z', 'Warning'))
+
+        failed = tracker.get_persistently_failed_jobs()
+
+        assert [job['UID'] for job in failed] == ['2']
+        assert failed[0]['message_type'] == 'job_failed'
+        assert not tracker.is_persistently_failed('fixed')
+
+        tracker.observe(session('5', 'backup', '2019-07-01T06:00:00Z', 'Success'))
+        assert tracker.get_persistently_failed_jobs() == []
+
+    def test_update_resumes_from_running_sessions(self):
+        '''
+        Ensure the next update starts at the oldest session still running
+        '''
+        client = Mock()
+        client.iter_query.return_value = [
+            session('1', 'backup', '2019-07-01T01:00:00Z', 'None', state='Working'),
+            session('2', 'other', '2019-07-01T02:00:00Z', 'Failed'),
+        ]
+        tracker = FailedJobTracker()
+        tracker.update(client, since='2019-06-30T00:00:00Z')
+
+        assert client.iter_query.call_args[0][1] == 'creationtime>="2019-06-30T00:00:00Z"'
+        assert tracker.high_water_mark == '2019-07-01T02:00:00Z'
+
+        client.iter_query.return_value = [
+            session('1', 'backup', '2019-07-01T01:00:00Z', 'Failed'),
+        ]
+        tracker.update(client)
+
+        assert client.iter_query.call_args[0][1] == 'creationtime>="2019-07-01T01:00:00Z"'
+        assert tracker.is_persistently_failed('backup')
+
+    def test_save_and_load(self):
+        tracker = FailedJobTracker()
+        tracker.observe(session('2', 'backup', '2019-07-01T04:00:16Z', 'Failed'))
+        tracker.high_water_mark = '2019-07-01T04:00:16Z'
+
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        tracker.save(path)
+
+        loaded = FailedJobTracker.load(path)
+
+        assert loaded.is_persistently_failed('backup')
+        assert loaded.high_water_mark == '2019-07-01T04:00:16Z'
+        assert len(FailedJobTracker.load(path + '.missing')) == 0
@@ -0,0 +1,171 @@
+'''
+Job duration, success rate and trend statistics over many sessions
+
+Session timestamps are parsed once into integer arrays, statistics are
+then computed over whole columns instead of re-parsing ISO timestamps
+per report, which keeps 100k+ sessions cheap.
+
+    table = SessionTable(client.get_jobs_between(start, shards=7))
+    table.job_stats()
+    table.trend(window=86400)
+'''
+import array
+
+from .timestamps import parse_epoch
+
+# Result codes held in the result column
+RESULTS = ('Success', 'Warning', 'Failed', 'None')
+SUCCESS, WARNING, FAILED, NONE = range(len(RESULTS))
+RESULT_CODES = {result: code for code, result in enumerate(RESULTS)}
+
+# Ended column value of sessions still running
+RUNNING = -1
+
+DEFAULT_PERCENTILES = (50, 90, 99)
+
+
+def percentile(ordered, q):
+    '''
+    Return the q-th percentile of sorted values, interpolating linearly between ranks
+    '''
+    if not ordered:
+        return None
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class SessionTable(object):
+    '''
+    BackupJobSessions held as parallel columns
+
+    `created` and `ended` are epoch seconds (ended is RUNNING while the
+    session has not finished), `results` are codes into RESULTS and
+    `jobs` indexes into `job_names`.
+    '''
+
+    def __init__(self, sessions=None):
+        self.job_names = []
+        self._job_slots = {}
+        self.jobs = array.array('l')
+        self.created = array.array('q')
+        self.ended = array.array('q')
+        self.results = array.array('b')
+
+        if sessions is not None:
+            self.add(sessions)
+
+    def __len__(self):
+        return len(self.created)
+
+    def add(self, sessions):
+        '''
+        Parse and append BackupJobSession entities
+        '''
+        for session in sessions:
+            job = session.get('JobName')
+            slot = self._job_slots.get(job)
+            if slot is None:
+                slot = self._job_slots[job] = len(self.job_names)
+                self.job_names.append(job)
+
+            created = parse_epoch(session['CreationTimeUTC'])
+            ended = RUNNING
+            if session.get('State') == 'Stopped' and session.get('EndTimeUTC'):
+                ended = parse_epoch(session['EndTimeUTC'])
+
+            self.jobs.append(slot)
+            self.created.append(created)
+            self.ended.append(ended if ended >= created else RUNNING)
+            self.results.append(RESULT_CODES.get(session.get('Result'), NONE))
+
+    def durations(self):
+        '''
+        Return the duration in seconds of every session, RUNNING for unfinished ones
+        '''
+        return array.array('q', [
+            RUNNING if ended == RUNNING else ended - created
+            for created, ended in zip(self.created, self.ended)
+        ])
+
+    def _stats(self, indexes, durations, percentiles):
+        results = [self.results[index] for index in indexes]
+        finished = sorted(durations[index] for index in indexes if durations[index] != RUNNING)
+        completed = len(results) - results.count(NONE)
+
+        stats = {
+            'sessions': len(results),
+            'running': len(results) - len(finished),
+            'success_rate': round(results.count(SUCCESS) / completed, 4) if completed else None,
+            'warning_rate': round(results.count(WARNING) / completed, 4) if completed else None,
+            'failure_rate': round(results.count(FAILED) / completed, 4) if completed else None,
+            'mean_duration': round(sum(finished) / len(finished), 1) if finished else None,
+            'max_duration': finished[-1] if finished else None,
+        }
+        for q in percentiles:
+            stats['p{}_duration'.format(q)] = percentile(finished, q)
+        return stats
+
+    def job_stats(self, percentiles=DEFAULT_PERCENTILES):
+        '''
+        Return duration percentiles and result rates per job
+
+        Rates are over the sessions that have a result, durations over the
+        finished sessions.
+
+        Returns:
+            list -- of dicts sorted by job name
+        '''
+        durations = self.durations()
+        report = []
+
+        groups = {}
+        for index, slot in enumerate(self.jobs):
+            group = groups.get(slot)
+            if group is None:
+                group = groups[slot] = []
+            group.append(index)
+
+        for slot, indexes in groups.items():
+            stats = {'job_name': self.job_names[slot]}
+            stats.update(self._stats(indexes, durations, percentiles))
+            stats['message_type'] = 'job_stats'
+            report.append(stats)
+
+        report.sort(key=lambda stats: stats['job_name'] or '')
+        return report
+
+    def trend(self, window=86400, job_name=None, percentiles=DEFAULT_PERCENTILES):
+        '''
+        Return the statistics of consecutive windows of creation time
+
+        Arguments:
+            window {int} -- window width in seconds, windows are aligned to the epoch
+            job_name {str} -- only the sessions of one job
+
+        Returns:
+            list -- of dicts in window order, `start` being epoch seconds
+        '''
+        durations = self.durations()
+        indexes = range(len(self))
+        if job_name is not None:
+            slot = self._job_slots.get(job_name)
+            indexes = [index for index, job in enumerate(self.jobs) if job == slot]
+
+        windows = {}
+        for index in indexes:
+            created = self.created[index]
+            start = created - created % window
+            group = windows.get(start)
+            if group is None:
+                group = windows[start] = []
+            group.append(index)
+
+        report = []
+        for start, group in sorted(windows.items()):
+            stats = {'start': start, 'job_name': job_name}
+            stats.update(self._stats(group, durations, percentiles))
+            stats['message_type'] = 'job_trend'
+            report.append(stats)
+        return report
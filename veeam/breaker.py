@@ -0,0 +1,122 @@
+'''
+Circuit breaker and health score for a Veeam server
+
+When a server hangs every request waits for its timeout. After repeated
+failures the breaker opens and requests fail fast, after `reset_timeout`
+one probe request is let through (half open) and its outcome closes or
+re-opens the circuit.
+'''
+import threading
+import time
+
+from .errors import CircuitOpenError
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker(object):
+    '''
+    Fail fast after `failure_threshold` consecutive failures
+
+    Also keeps an exponentially weighted average of latency and error rate
+    so schedulers can prefer healthy servers, see `health_score`.
+    '''
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, latency_target=1.0,
+                 smoothing=0.2, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_target = latency_target
+        self.smoothing = smoothing
+        self.clock = clock
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.latency = 0.0
+        self.error_rate = 0.0
+        self.calls = 0
+        self.rejected = 0
+
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        '''
+        Raise CircuitOpenError unless a call may go ahead
+        '''
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            raise CircuitOpenError('Circuit open after {} failures'.format(self.consecutive_failures))
+
+    def _observe(self, latency, failed):
+        self.calls += 1
+        self.latency += self.smoothing * (latency - self.latency)
+        self.error_rate += self.smoothing * ((1.0 if failed else 0.0) - self.error_rate)
+
+    def record_success(self, latency):
+        with self._lock:
+            self._observe(latency, False)
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            self._probing = False
+
+    def record_failure(self, latency):
+        with self._lock:
+            self._observe(latency, True)
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = OPEN
+                self.opened_at = self.clock()
+            self._probing = False
+
+    def call(self, func, is_failure=None):
+        '''
+        Call func through the breaker
+
+        Exceptions count as failures, as do results for which `is_failure`
+        returns True (eg. 5xx responses).
+        '''
+        self.before_call()
+        started = self.clock()
+        try:
+            result = func()
+        except Exception:
+            self.record_failure(self.clock() - started)
+            raise
+
+        if is_failure is not None and is_failure(result):
+            self.record_failure(self.clock() - started)
+        else:
+            self.record_success(self.clock() - started)
+        return result
+
+    @property
+    def health_score(self):
+        '''
+        Return a score from 0 (unusable) to 1 (fast and error free)
+        '''
+        if self.state == OPEN:
+            return 0.0
+        speed = 1.0 / (1.0 + self.latency / self.latency_target)
+        return round((1.0 - self.error_rate) * speed, 4)
+
+    def snapshot(self):
+        return {
+            'state': self.state,
+            'health_score': self.health_score,
+            'latency': self.latency,
+            'error_rate': self.error_rate,
+            'consecutive_failures': self.consecutive_failures,
+            'calls': self.calls,
+            'rejected': self.rejected,
+        }
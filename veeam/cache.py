@@ -0,0 +1,226 @@
+'''
+Persistent disk cache for entities that can no longer change
+
+A finished session, a restore point or a backup file is never modified
+once written, so it only needs downloading once. The client caches them
+when read one at a time (get_backup_session, get_restore_point,
+get_vm_restore_point) and the task sessions of a finished session, the
+collections and queries they are listed by can still grow and are always
+fetched. Responses are stored
+compressed and content addressed (by the sha256 of their json), the
+index mapping urls to content is kept in least recently used order and
+the oldest entries are evicted once the cache grows past `max_bytes`.
+
+    cache = DiskCache('/var/cache/veeam')
+    client = VeeamClient(url, username, password, cache=cache)
+'''
+import collections
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+from urllib.parse import urlsplit
+
+INDEX_FILE = 'index.json'
+
+# Entities immutable once they exist
+IMMUTABLE_TYPES = ('RestorePoint', 'VmRestorePoint', 'BackupFile')
+STOPPED_STATE = 'Stopped'
+
+# Collections that cannot grow once every entity in them has stopped
+IMMUTABLE_COLLECTIONS = (
+    re.compile(r'/backupSessions/[^/]+/taskSessions$'),
+)
+
+
+def _is_finished(entity):
+    if not isinstance(entity, dict):
+        return False
+    if 'State' in entity:
+        return entity['State'] == STOPPED_STATE
+    return entity.get('Type') in IMMUTABLE_TYPES
+
+
+def is_immutable(url, result):
+    '''
+    Whether a decoded response can be cached permanently
+
+    A single finished entity is, as are the task sessions of a finished
+    session once every one of them has stopped. Any other collection, eg.
+    the sessions of a job, a query or a reference list, can still grow
+    and never is.
+    '''
+    if not isinstance(result, dict) or 'PagingInfo' in result or 'Entities' in result:
+        return False
+
+    is_collection = len(result) == 1 and isinstance(next(iter(result.values())), list)
+    if not is_collection:
+        return _is_finished(result)
+
+    path = urlsplit(url).path
+    if not any(pattern.search(path) for pattern in IMMUTABLE_COLLECTIONS):
+        return False
+    entities = next(iter(result.values()))
+    return bool(entities) and all(
+        isinstance(entity, dict) and entity.get('State') == STOPPED_STATE for entity in entities
+    )
+
+
+class DiskCache(object):
+    '''
+    Size limited, least recently used cache of decoded responses on disk
+
+    Identical responses stored under different urls share one blob. The
+    index is written on `flush`, entries added since the last flush are
+    lost if the process dies but the blobs on disk are never inconsistent.
+    '''
+
+    def __init__(self, path, max_bytes=256 * 2 ** 20):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        # url -> digest, least recently used first
+        self._index = collections.OrderedDict()
+        self._sizes = {}
+        self._refs = collections.Counter()
+        self._lock = threading.Lock()
+
+        os.makedirs(path, exist_ok=True)
+        self._load_index()
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    @property
+    def size(self):
+        '''
+        Bytes of compressed blobs in the cache
+        '''
+        return sum(self._sizes.values())
+
+    def _blob_path(self, digest):
+        return os.path.join(self.path, digest[:2], '{}.json.gz'.format(digest))
+
+    def _load_index(self):
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        with open(index_path) as index_file:
+            entries = json.load(index_file)
+        for key, digest, size in entries:
+            if os.path.exists(self._blob_path(digest)):
+                self._link(key, digest, size)
+
+    def _link(self, key, digest, size):
+        self._index[key] = digest
+        self._sizes[digest] = size
+        self._refs[digest] += 1
+
+    def _unlink(self, key):
+        digest = self._index.pop(key)
+        self._refs[digest] -= 1
+        if self._refs[digest] <= 0:
+            del self._refs[digest]
+            del self._sizes[digest]
+            try:
+                os.remove(self._blob_path(digest))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key, object_hook=None):
+        '''
+        Return the decoded value cached for a key, or None
+
+        The object_hook is passed to the json decoder, eg. an Interner.
+        '''
+        with self._lock:
+            digest = self._index.get(key)
+            if digest is None:
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+
+        try:
+            with gzip.open(self._blob_path(digest), 'rt') as blob:
+                value = json.load(blob, object_hook=object_hook)
+        except (OSError, ValueError):
+            with self._lock:
+                if self._index.get(key) == digest:
+                    self._unlink(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def put(self, key, value):
+        '''
+        Store a json serialisable value under a key, evicting old entries past max_bytes
+        '''
+        data = json.dumps(value, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+
+        with self._lock:
+            exists = digest in self._sizes
+
+        if exists:
+            size = self._sizes.get(digest, 0)
+        else:
+            compressed = gzip.compress(data)
+            size = len(compressed)
+            if size > self.max_bytes:
+                return
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            temp_path = '{}.{}.tmp'.format(blob_path, threading.get_ident())
+            with open(temp_path, 'wb') as blob:
+                blob.write(compressed)
+            os.replace(temp_path, blob_path)
+
+        with self._lock:
+            if key in self._index:
+                if self._index[key] == digest:
+                    self._index.move_to_end(key)
+                    return
+                self._unlink(key)
+            self._link(key, digest, size)
+            self._evict()
+
+    def _evict(self):
+        total = sum(self._sizes.values())
+        while total > self.max_bytes and self._index:
+            key = next(iter(self._index))
+            digest = self._index[key]
+            last_reference = self._refs[digest] == 1
+            size = self._sizes[digest]
+            self._unlink(key)
+            if last_reference:
+                total -= size
+
+    def flush(self):
+        '''
+        Write the index, replacing it atomically
+        '''
+        with self._lock:
+            entries = [[key, digest, self._sizes[digest]] for key, digest in self._index.items()]
+        index_path = os.path.join(self.path, INDEX_FILE)
+        temp_path = '{}.tmp'.format(index_path)
+        with open(temp_path, 'w') as index_file:
+            json.dump(entries, index_file, separators=(',', ':'))
+        os.replace(temp_path, index_path)
+
+    def stats(self):
+        return {
+            'entries': len(self._index),
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
@@ -0,0 +1,218 @@
+'''
+Record Veeam API traffic to cassette files and replay it offline
+
+Recording captures production shaped payloads with session tokens and
+hostnames scrubbed, replaying serves them back with their original
+timing so client changes can be benchmarked without a Veeam server.
+
+    session = requests.Session()
+    recorder = RecordingAdapter()
+    session.mount('http://', recorder)
+    session.mount('https://', recorder)
+    client = VeeamClient(url, username, password, session=session)
+    ...
+    recorder.cassette.save('jobs.cassette')
+
+    session = requests.Session()
+    session.mount('http://', ReplayAdapter(Cassette.load('jobs.cassette')))
+    client = VeeamClient('http://veeam.example/api', 'user', 'pass', session=session)
+'''
+import collections
+import gzip
+import json
+import re
+import threading
+import time
+from urllib.parse import unquote, urlsplit, urlunsplit
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+SCRUBBED_HOST = 'veeam.example'
+SCRUBBED = 'SCRUBBED'
+
+# Response headers worth keeping, everything else is dropped
+KEPT_HEADERS = ('Content-Type', 'X-RestSvcSessionId', 'Location')
+SECRET_HEADERS = ('X-RestSvcSessionId', 'Authorization')
+
+# A creation time bound of a query filter, eg. creationtime>"2019-06-30T10:08:02Z"
+CREATION_TIME_BOUND = re.compile(r'(creationtime\s*[<>=!]+\s*)"[^"]*"', re.IGNORECASE)
+
+# A host is only replaced where it is not part of a longer name or of a
+# uid like urn:veeam:Job:..., eg. in //veeam:9399/ or "Name": "veeam"
+HOST_PATTERN = r'(?<![\w.:-]){}(?![\w-]|\.\w)'
+
+
+class Cassette(object):
+    '''
+    An ordered list of recorded interactions stored as gzipped json lines
+    '''
+
+    def __init__(self, interactions=None):
+        self.interactions = list(interactions or [])
+
+    def __len__(self):
+        return len(self.interactions)
+
+    def save(self, path):
+        with gzip.open(path, 'wt') as cassette_file:
+            for interaction in self.interactions:
+                cassette_file.write(json.dumps(interaction, separators=(',', ':')))
+                cassette_file.write('\n')
+
+    @classmethod
+    def load(cls, path):
+        with gzip.open(path, 'rt') as cassette_file:
+            return cls(json.loads(line) for line in cassette_file if line.strip())
+
+
+class Scrubber(object):
+    '''
+    Replace hostnames and secrets in recorded urls, headers and bodies
+
+    Every host the client talks to is replaced with SCRUBBED_HOST along
+    with any extra `hosts` (eg. backup server names in Links). Session
+    tokens and ids seen in headers are replaced wherever they appear.
+    '''
+
+    def __init__(self, hosts=None):
+        self.hosts = set(hosts or [])
+        self.secrets = set()
+
+    def add_url(self, url):
+        parts = urlsplit(url)
+        self.hosts.add(parts.netloc)
+        if parts.hostname:
+            self.hosts.add(parts.hostname)
+
+    def add_secret(self, value):
+        if value:
+            self.secrets.add(value)
+
+    def scrub(self, text):
+        if not text:
+            return text
+        # Longest first so host:port is replaced before the bare host
+        for host in sorted(self.hosts, key=len, reverse=True):
+            text = re.sub(HOST_PATTERN.format(re.escape(host)), SCRUBBED_HOST, text)
+        for secret in self.secrets:
+            text = text.replace(secret, SCRUBBED)
+        return text
+
+
+def scrub_url(url):
+    '''
+    Replace the host of a url with SCRUBBED_HOST
+    '''
+    parts = urlsplit(url)
+    return urlunsplit((parts.scheme, SCRUBBED_HOST, parts.path, parts.query, parts.fragment))
+
+
+def match_url(url):
+    '''
+    Return a url with its host scrubbed and the times of creationtime filters
+    blanked, so calls filtering on "now - 1 day" match whenever they replay
+    '''
+    return CREATION_TIME_BOUND.sub(r'\1"*"', unquote(scrub_url(url)))
+
+
+class RecordingAdapter(HTTPAdapter):
+    '''
+    Transport adapter that sends requests as normal and records each interaction
+    '''
+
+    def __init__(self, hosts=None, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = Cassette()
+        self.scrubber = Scrubber(hosts)
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        started = time.monotonic()
+        response = super().send(request, **kwargs)
+        body = response.content.decode(response.encoding or 'utf-8', errors='replace')
+        elapsed = time.monotonic() - started
+
+        with self._lock:
+            self.scrubber.add_url(request.url)
+            for header in SECRET_HEADERS:
+                self.scrubber.add_secret(response.headers.get(header))
+                self.scrubber.add_secret(request.headers.get(header))
+            if response.headers.get('X-RestSvcSessionId'):
+                try:
+                    self.scrubber.add_secret(response.json().get('SessionId'))
+                except ValueError:
+                    pass
+
+            self.cassette.interactions.append({
+                'method': request.method,
+                'url': scrub_url(self.scrubber.scrub(request.url)),
+                'status': response.status_code,
+                'headers': {
+                    header: SCRUBBED if header in SECRET_HEADERS else self.scrubber.scrub(response.headers[header])
+                    for header in KEPT_HEADERS if header in response.headers
+                },
+                'body': self.scrubber.scrub(body),
+                'elapsed': round(elapsed, 6),
+            })
+
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    '''
+    Transport adapter serving responses from a cassette
+
+    Interactions are matched on method and url (ignoring the host) and
+    served in recorded order, the last one repeating once exhausted. A url
+    recorded with other creationtime filter values (eg. relative to the
+    time of recording) is matched when there is no exact match. Each
+    response is delayed by its recorded time multiplied by `speed`, use
+    0 to replay as fast as possible.
+    '''
+
+    def __init__(self, cassette, speed=1.0, sleep=time.sleep):
+        super().__init__()
+        self.speed = speed
+        self.sleep = sleep
+        self.served = 0
+        self._lock = threading.Lock()
+        self._interactions = collections.defaultdict(collections.deque)
+        self._similar = collections.defaultdict(collections.deque)
+        for interaction in cassette.interactions:
+            self._interactions[(interaction['method'], interaction['url'])].append(interaction)
+            self._similar[(interaction['method'], match_url(interaction['url']))].append(interaction)
+
+    def _next(self, request):
+        key = (request.method, scrub_url(request.url))
+        with self._lock:
+            interactions = self._interactions.get(key)
+            if not interactions:
+                interactions = self._similar.get((request.method, match_url(request.url)))
+            if not interactions:
+                raise requests.exceptions.ConnectionError(
+                    'No recorded interaction for {} {}'.format(*key), request=request
+                )
+            interaction = interactions.popleft() if len(interactions) > 1 else interactions[0]
+            self.served += 1
+        return interaction
+
+    def send(self, request, **kwargs):
+        interaction = self._next(request)
+
+        if self.speed:
+            self.sleep(interaction['elapsed'] * self.speed)
+
+        response = requests.Response()
+        response.status_code = interaction['status']
+        response.headers = CaseInsensitiveDict(interaction['headers'])
+        response._content = interaction['body'].encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        response.reason = 'Replayed'
+        return response
+
+    def close(self):
+        pass
@@ -0,0 +1,60 @@
+'''
+Emit only the sessions that changed since the last poll
+'''
+import collections
+
+# Fields of a session that change while it runs
+FINGERPRINT_FIELDS = ('State', 'Result', 'Progress', 'EndTimeUTC')
+
+
+def fingerprint(session):
+    '''
+    Return the fields identifying a version of a session
+    '''
+    return tuple(session.get(field) for field in FINGERPRINT_FIELDS)
+
+
+class SessionChangeDetector(object):
+    '''
+    Remember the fingerprint of the sessions seen and report new or changed ones
+
+    The seen-set is bounded to `max_size` sessions, the least recently seen
+    are forgotten first. A forgotten session that is polled again is
+    reported once more as new, so size it above the sessions per window.
+
+        detector = SessionChangeDetector()
+        for event in detector.changes(client.get_jobs_1_day()):
+            ...
+    '''
+
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self._seen = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def changes(self, sessions):
+        '''
+        Yield an event for every session that is new or has changed
+
+        Events are dicts of the `event` (new or changed), the `previous`
+        fingerprint fields for changed sessions and the `session` itself.
+        '''
+        for session in sessions:
+            uid = session['UID']
+            current = fingerprint(session)
+            previous = self._seen.pop(uid, None)
+            self._seen[uid] = current
+
+            if len(self._seen) > self.max_size:
+                self._seen.popitem(last=False)
+
+            if previous is None:
+                yield {'event': 'new', 'previous': None, 'session': session}
+            elif previous != current:
+                yield {
+                    'event': 'changed',
+                    'previous': dict(zip(FINGERPRINT_FIELDS, previous)),
+                    'session': session,
+                }
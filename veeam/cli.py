@@ -0,0 +1,297 @@
+'''
+Command line interface for the Veeam client
+
+    veeam export --config servers.ini --format ndjson --output veeam.ndjson
+    veeam poll --config servers.ini
+    veeam exporter --config servers.ini --port 9601
+'''
+import argparse
+import datetime
+import json
+import sys
+import threading
+
+from . import export as veeam_export
+from .changes import FINGERPRINT_FIELDS, SessionChangeDetector
+from .config import load_servers
+from .poller import Poller
+from .projection import requiring
+
+
+def run_export(args):
+    '''
+    Stream the requested resources of every configured server
+    '''
+    servers = load_servers(args.config)
+    resources = args.resources.split(',') if args.resources else veeam_export.RESOURCES
+
+    if args.format == 'parquet':
+        if args.output == '-':
+            raise SystemExit('Parquet export requires an --output path')
+        writer = veeam_export.ParquetWriter(args.output)
+        return veeam_export.export(
+            servers, writer, resources, args.since, args.workers, args.page_size
+        )
+
+    if args.output == '-':
+        return veeam_export.export(
+            servers, veeam_export.NdjsonWriter(sys.stdout), resources,
+            args.since, args.workers, args.page_size
+        )
+
+    with open(args.output, 'w') as output:
+        return veeam_export.export(
+            servers, veeam_export.NdjsonWriter(output), resources,
+            args.since, args.workers, args.page_size
+        )
+
+
+def changed_jobs(get_client, detector):
+    '''
+    Return a task emitting only the sessions of the last day that are new or changed
+    '''
+    def get_changed_jobs():
+        client = get_client()
+        return [
+            dict(event['session'], event=event['event'])
+            for event in detector.changes(
+                client.get_jobs_1_day(requiring(client.projection, *FINGERPRINT_FIELDS))
+            )
+        ]
+    return get_changed_jobs
+
+
+def server_metrics(poller):
+    '''
+    Return a task emitting the metrics of the poller and, once connected, the health of its server
+    '''
+    def get_server_metrics():
+        records = [dict(metric, message_type='poller_metrics') for metric in poller.metrics()]
+        if poller.client is not None:
+            records.append(dict(poller.client.breaker.snapshot(), message_type='server_health'))
+        return records
+    return get_server_metrics
+
+
+def stop_pollers(pollers):
+    '''
+    Stop the pollers and log out of the servers they connected to
+    '''
+    for poller in pollers:
+        poller.stop(wait=False)
+        if poller.client is not None:
+            poller.client.logout()
+            poller.client.close()
+
+
+def run_poll(args):
+    '''
+    Poll every configured server until interrupted, writing records as NDJSON
+
+    Each server keeps a single logon session for the life of the poller,
+    created by its first run so a server that is down does not stop the others.
+    '''
+    servers = load_servers(args.config)
+    output_lock = threading.Lock()
+
+    def write(server_name):
+        def on_result(task, records):
+            with output_lock:
+                for record in records:
+                    record['server'] = server_name
+                    sys.stdout.write(json.dumps(record, separators=(',', ':')))
+                    sys.stdout.write('\n')
+                sys.stdout.flush()
+        return on_result
+
+    pollers = []
+
+    for server in servers:
+        poller = Poller(connect=server.get_client)
+        on_result = write(server.name)
+        poller.add_task(
+            'repos', lambda poller=poller: poller.get_client().get_repos(),
+            args.repos_interval, args.jitter, on_result
+        )
+        get_jobs = lambda poller=poller: poller.get_client().get_jobs_1_day()
+        if args.changes_only:
+            get_jobs = changed_jobs(poller.get_client, SessionChangeDetector())
+        poller.add_task('jobs_1_day', get_jobs, args.jobs_interval, args.jitter, on_result)
+        poller.add_task(
+            'persistently_failed_jobs', lambda poller=poller: poller.get_client().get_persistently_failed_jobs(),
+            args.failed_interval, args.jitter, on_result
+        )
+        poller.add_task('metrics', server_metrics(poller), args.metrics_interval, args.jitter, on_result)
+        pollers.append(poller)
+
+    threads = [
+        threading.Thread(target=poller.run_forever, daemon=True)
+        for poller in pollers
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_pollers(pollers)
+
+
+def refresh_metrics(exporter, server_name, poller):
+    '''
+    Return a task refreshing the metrics of a server, connecting to it first if needed
+
+    A server that cannot be reached is exported as a failed refresh.
+    '''
+    def refresh():
+        try:
+            client = poller.get_client()
+        except Exception:
+            exporter.mark_failed(server_name)
+            raise
+        exporter.refresh(server_name, client)
+    return refresh
+
+
+def run_exporter(args):
+    '''
+    Serve Prometheus metrics refreshed in the background until interrupted
+    '''
+    from .prometheus import MetricsServer, PrometheusExporter
+
+    servers = load_servers(args.config)
+    exporter = PrometheusExporter()
+    pollers = []
+
+    for server in servers:
+        poller = Poller(connect=server.get_client)
+        poller.add_task('prometheus', refresh_metrics(exporter, server.name, poller), args.interval, args.jitter)
+        pollers.append(poller)
+
+    metrics_server = MetricsServer(exporter, args.host, args.port).start()
+    sys.stderr.write('Serving metrics of {} servers on {}\n'.format(len(servers), metrics_server.url))
+
+    threads = [
+        threading.Thread(target=poller.run_forever, daemon=True)
+        for poller in pollers
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        metrics_server.stop()
+        stop_pollers(pollers)
+
+
+def utc_datetime(value):
+    '''
+    Parse an iso date as a naive UTC datetime, dates without an offset are taken as UTC
+    '''
+    try:
+        parsed = datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('not an iso date: {}'.format(value))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def run_fake_server(args):
+    '''
+    Serve a synthetic dataset as a fake Veeam REST API until interrupted
+    '''
+    from .synthetic import FakeVeeamServer, SyntheticDataset
+
+    dataset = SyntheticDataset(
+        jobs=args.jobs,
+        sessions_per_job=args.sessions_per_job,
+        vms_per_job=args.vms_per_job,
+        repositories=args.repositories,
+        skew=args.skew,
+        end=args.end or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None, microsecond=0),
+        seed=args.seed,
+    )
+    server = FakeVeeamServer(dataset, args.host, args.port)
+    sys.stderr.write('Serving {} jobs, {} sessions and {} vm restore points on {}\n'.format(
+        dataset.jobs, dataset.sessions, dataset.vm_restore_points, server.url
+    ))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(prog='veeam', description='Veeam backup API client')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    export_parser = subparsers.add_parser('export', help='Stream entities to NDJSON or Parquet')
+    export_parser.add_argument('--config', required=True, help='ini file of servers')
+    export_parser.add_argument('--format', choices=('ndjson', 'parquet'), default='ndjson')
+    export_parser.add_argument('--output', default='-', help='output path, - for stdout')
+    export_parser.add_argument(
+        '--resources',
+        help='comma separated subset of: {}'.format(','.join(veeam_export.RESOURCES))
+    )
+    export_parser.add_argument('--since', help='only sessions created after this iso date')
+    export_parser.add_argument('--workers', type=int, default=4, help='servers collected concurrently')
+    export_parser.add_argument('--page-size', type=int, default=100)
+    export_parser.set_defaults(func=run_export)
+
+    poll_parser = subparsers.add_parser('poll', help='Poll servers on a jittered schedule')
+    poll_parser.add_argument('--config', required=True, help='ini file of servers')
+    poll_parser.add_argument('--repos-interval', type=float, default=300, help='seconds')
+    poll_parser.add_argument('--jobs-interval', type=float, default=300, help='seconds')
+    poll_parser.add_argument('--failed-interval', type=float, default=900, help='seconds')
+    poll_parser.add_argument(
+        '--changes-only', action='store_true',
+        help='only emit sessions that are new or changed since the last poll'
+    )
+    poll_parser.add_argument('--metrics-interval', type=float, default=60, help='seconds')
+    poll_parser.add_argument('--jitter', type=float, default=0.1, help='fraction of each interval')
+    poll_parser.set_defaults(func=run_poll)
+
+    exporter_parser = subparsers.add_parser('exporter', help='Serve Prometheus metrics from a background refreshed snapshot')
+    exporter_parser.add_argument('--config', required=True, help='ini file of servers')
+    exporter_parser.add_argument('--host', default='0.0.0.0')
+    exporter_parser.add_argument('--port', type=int, default=9601)
+    exporter_parser.add_argument('--interval', type=float, default=60, help='seconds between refreshes')
+    exporter_parser.add_argument('--jitter', type=float, default=0.1, help='fraction of each interval')
+    exporter_parser.set_defaults(func=run_exporter)
+
+    fake_parser = subparsers.add_parser('fake-server', help='Serve synthetic data as a fake Veeam API')
+    fake_parser.add_argument('--host', default='127.0.0.1')
+    fake_parser.add_argument('--port', type=int, default=9399)
+    fake_parser.add_argument('--jobs', type=int, default=1000)
+    fake_parser.add_argument('--sessions-per-job', type=int, default=100)
+    fake_parser.add_argument('--vms-per-job', type=int, default=10)
+    fake_parser.add_argument('--repositories', type=int, default=5)
+    fake_parser.add_argument('--skew', type=float, default=1.0)
+    fake_parser.add_argument('--seed', type=int, default=0)
+    fake_parser.add_argument(
+        '--end', type=utc_datetime,
+        help='iso creation time of the newest sessions, defaults to now'
+    )
+    fake_parser.set_defaults(func=run_fake_server)
+
+    return parser
+
+
+def main(argv=None):
+    args = get_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
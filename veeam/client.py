@@ -1,9 +1,67 @@
+import asyncio
 import datetime
+import heapq
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
 
 import requests
 from requests.auth import HTTPBasicAuth
 
-from .errors import LoginFailError, LoginFailSessionKeyError
+from .breaker import CircuitBreaker
+from .cache import is_immutable
+from .errors import LoginFailError, LoginFailSessionKeyError, SessionExpiredError
+from .interning import Interner
+from .pool import EXPIRED_STATUS_CODES, LogonSession, LogonSessionPool
+from .projection import requiring
+from .singleflight import SingleFlight
+from .timestamps import add_epoch_fields, parse_epoch
+
+
+# Seconds to wait to connect and for a response, so a hung server cannot block forever
+DEFAULT_TIMEOUT = (10, 120)
+
+# Sections of the dashboard and the methods fetching them
+DASHBOARD_SECTIONS = (
+    ('repo_summary', 'get_repo_summary'),
+    ('vms_processed_day', 'get_vms_processed_day'),
+    ('summary_job_stats', 'get_summary_job_stats'),
+    ('summary_vms', 'get_summary_vms'),
+    ('summary_overview', 'get_summary_overview'),
+)
+
+# Fields of the task sessions read by get_task_sessions_bulk
+TASK_SESSION_FIELDS = (
+    'VmDisplayName', 'State', 'Result', 'Reason', 'CreationTimeUTC', 'EndTimeUTC', 'TotalSize',
+)
+
+# Queries whose entity collection key is not simply the type name pluralised
+QUERY_ENTITY_KEYS = {
+    'Repository': 'Repositories',
+}
+
+
+def _close_thread_session(session, shared_adapters):
+    '''
+    Close the connection pools of a thread's session, leaving adapters shared with other sessions open
+    '''
+    for adapter in session.adapters.values():
+        if not any(adapter is shared for shared in shared_adapters):
+            adapter.close()
+
+
+class _ThreadSession(object):
+    '''
+    The session of one worker thread
+
+    It is only referenced from the thread's locals, so when the thread
+    exits it is freed and its connection pools are closed.
+    '''
+
+    def __init__(self, session, shared_adapters):
+        self.session = session
+        self.close = weakref.finalize(self, _close_thread_session, session, shared_adapters)
 
 
 class VeeamClient(object):
@@ -12,10 +70,41 @@ class VeeamClient(object):
     https://helpcenter.veeam.com/backup/rest/overview.html
     '''
     
-    def __init__(self, url, veeam_username, veeam_password, verify=False, session=None):
+    def __init__(self, url, veeam_username, veeam_password, verify=False, session=None, coalesce=True,
+                 thread_sessions=True, pool_size=None, timeout=DEFAULT_TIMEOUT, breaker=None, cache=None,
+                 projection=None, intern_strings=False, epoch_fields=False):
         '''
         1. Create or use the existing session
         2. Authenticate with the Veeam API
+
+        With `coalesce` identical GETs made concurrently from several threads
+        share a single request and its decoded result.
+
+        With `thread_sessions` the client is safe to share between threads:
+        the thread that created the client uses `session`, every other
+        thread gets its own session carrying the same logon token.
+
+        With a `pool_size` requests are spread over that many logon sessions,
+        the first being the one created at login.
+
+        Every request is sent with `timeout` and through a circuit breaker,
+        which fails fast with CircuitOpenError once the server has failed
+        repeatedly. `client.breaker.health_score` rates the server.
+
+        With a `cache` (eg. a DiskCache) entities that can no longer change
+        are only downloaded once: stopped sessions, restore points and VM
+        restore points read one at a time, and the task sessions of a
+        stopped session. Queries and lists are always fetched.
+
+        A `projection` (see veeam.projection) is applied to every response
+        unless a method is given its own, eg. Projection(links=DROP) to
+        drop the Links and Href of all entities.
+
+        With `intern_strings` values repeated across entities (JobName,
+        State, Result, Type...) share one string, see veeam.interning.
+
+        With `epoch_fields` entities with times also get them as epoch
+        seconds, eg. CreationTimeEpoch, for sorting and comparing windows.
         '''
         if not session:
             session = requests.Session()
@@ -24,15 +113,51 @@ class VeeamClient(object):
         self.login_url = '{}/sessionMngr/?v=v1_4'.format(url)
         self.verify = verify
         self.session = session
-
-        auth = HTTPBasicAuth(veeam_username, veeam_password)
+        self.auth = HTTPBasicAuth(veeam_username, veeam_password)
+        self.coalesce = coalesce
+        self.thread_sessions = thread_sessions
+        self.session_token = None
+        self.session_id = None
+        self.logged_out = False
+        self._in_flight = SingleFlight()
+        self._owner_thread = threading.get_ident()
+        self._local = threading.local()
+        self._login_lock = threading.Lock()
+        self._sessions_lock = threading.Lock()
+        self._thread_sessions = weakref.WeakSet()
+        self._executor = None
+        self._dashboard_fetches = {}
+        self.pool = None
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker()
+        self.cache = cache
+        self.projection = projection
+        self.interner = Interner() if intern_strings else None
+        self.epoch_fields = epoch_fields
 
         self.session.headers.update({'Accept': 'application/json'})
 
-        login = self.session.post(
+        self.login()
+
+        if pool_size:
+            self.pool = LogonSessionPool(
+                self,
+                pool_size,
+                sessions=[LogonSession(self.session_token, self.session_id)]
+            )
+
+    def _authenticate(self):
+        '''
+        Create a new logon session
+
+        Returns:
+            tuple -- the session token and the session id (None if not returned)
+        '''
+        login = self._request(
+            'POST',
             self.login_url,
-            auth=auth,
-            verify=verify
+            auth=self.auth,
+            verify=self.verify
         )
         
         if login.status_code  == 201:
@@ -43,119 +168,507 @@ class VeeamClient(object):
         else:
             raise LoginFailError('Authentication failed')
 
-        self.session.headers.update(
-            {
-                'X-RestSvcSessionId': session_token,
-                'Accept': 'application/json'
-            }
+        try:
+            session_id = login.json().get('SessionId')
+        except ValueError:
+            session_id = None
+
+        return session_token, session_id
+
+    def login(self):
+        '''
+        Authenticate with the Veeam API and set the session token header
+
+        Can be called again to replace an expired logon session, the new
+        token is picked up by the sessions of every thread. A pool emptied
+        by logout is filled again.
+        '''
+        with self._login_lock:
+            session_token, session_id = self._authenticate()
+
+            self.session.headers.update(
+                {
+                    'X-RestSvcSessionId': session_token,
+                    'Accept': 'application/json'
+                }
+            )
+            self.session.verify = self.verify
+            self.session_token = session_token
+            self.session_id = session_id
+            self.logged_out = False
+
+            if self.pool is not None and not self.pool.sessions:
+                self.pool = LogonSessionPool(
+                    self,
+                    self.pool.size,
+                    sessions=[LogonSession(session_token, session_id)]
+                )
+
+    def _new_thread_session(self):
+        '''
+        Create a session for a worker thread configured like the main session
+
+        HTTPAdapters get their own connection pool per thread with the same
+        retry and pool settings, custom adapters mounted on the main session
+        (eg. for testing) are shared and never closed with the thread's session.
+        '''
+        session = requests.Session()
+        session.headers.update(self.session.headers)
+        session.verify = self.session.verify
+        session.cert = self.session.cert
+        session.proxies.update(self.session.proxies)
+        session.auth = self.session.auth
+        session.hooks = {event: list(hooks) for event, hooks in self.session.hooks.items()}
+        session.cookies.update(self.session.cookies)
+        session.params = dict(self.session.params)
+        session.trust_env = self.session.trust_env
+        session.max_redirects = self.session.max_redirects
+
+        shared_adapters = []
+        for prefix, adapter in self.session.adapters.items():
+            if type(adapter) is requests.adapters.HTTPAdapter:
+                session.mount(prefix, requests.adapters.HTTPAdapter(
+                    pool_connections=adapter._pool_connections,
+                    pool_maxsize=adapter._pool_maxsize,
+                    max_retries=adapter.max_retries,
+                    pool_block=adapter._pool_block
+                ))
+            else:
+                session.mount(prefix, adapter)
+                shared_adapters.append(adapter)
+
+        thread_session = _ThreadSession(session, shared_adapters)
+        with self._sessions_lock:
+            self._thread_sessions.add(thread_session)
+
+        return thread_session
+
+    def _http(self):
+        '''
+        Return the session to use on the current thread
+        '''
+        if not self.thread_sessions or threading.get_ident() == self._owner_thread:
+            return self.session
+
+        thread_session = getattr(self._local, 'session', None)
+        if thread_session is None:
+            thread_session = self._local.session = self._new_thread_session()
+        session = thread_session.session
+
+        token = self.session_token
+        if token and session.headers.get('X-RestSvcSessionId') != token:
+            session.headers['X-RestSvcSessionId'] = token
+
+        return session
+
+    def close(self):
+        '''
+        Close the connection pools of the sessions created for other threads
+        and write the cache index
+
+        The session of a thread is also closed when the thread exits.
+        '''
+        if self.cache is not None:
+            self.cache.flush()
+        with self._sessions_lock:
+            executor, self._executor = self._executor, None
+            self._dashboard_fetches = {}
+            thread_sessions = list(self._thread_sessions)
+        if executor is not None:
+            executor.shutdown(wait=False)
+        for thread_session in thread_sessions:
+            thread_session.close()
+
+    def _get(self, url, projection=None):
+        '''
+        GET a url and return the decoded json
+
+        Concurrent identical requests are coalesced into one when enabled,
+        callers then share the same decoded object. Immutable results are
+        served from and stored in the cache if there is one.
+
+        The projection, or else the client's default projection, is applied
+        while decoding.
+        '''
+        if projection is None:
+            projection = self.projection
+        key = self._decoded_key(url, projection)
+
+        if self.cache is not None:
+            cached = self.cache.get(key, object_hook=self.interner)
+            if cached is not None:
+                return cached
+
+        if not self.coalesce:
+            return self._fetch(url, key, projection)
+        return self._in_flight.do(('GET', key), lambda: self._fetch(url, key, projection))
+
+    def _projection(self, projection, *fields, links=None):
+        '''
+        Return the projection, or else the client's default, widened to keep
+        the fields and links the client itself reads from the results
+        '''
+        if projection is None:
+            projection = self.projection
+        return requiring(projection, *fields, links=links)
+
+    def _decoded_key(self, url, projection):
+        '''
+        Return the coalescing and cache key of a url decoded with the projection and epoch fields
+
+        Interning is left out as it does not change the decoded values, it
+        is applied again when a result is read from the cache.
+        '''
+        options = []
+        if projection is not None:
+            options.append(str(projection.key))
+        if self.epoch_fields:
+            options.append('epoch')
+        if not options:
+            return url
+        return '{}#{}'.format(url, ';'.join(options))
+
+    def _object_hook(self, projection):
+        '''
+        Return the json object_hook applying the projection, epoch fields and interning, if any
+        '''
+        hooks = [hook for hook in (
+            projection,
+            add_epoch_fields if self.epoch_fields else None,
+            self.interner
+        ) if hook is not None]
+
+        if not hooks:
+            return None
+        if len(hooks) == 1:
+            return hooks[0]
+
+        def object_hook(entity):
+            for hook in hooks:
+                entity = hook(entity)
+            return entity
+        return object_hook
+
+    def _fetch(self, url, key, projection):
+        response = self._send('GET', url)
+        object_hook = self._object_hook(projection)
+        result = response.json() if object_hook is None else response.json(object_hook=object_hook)
+        if self.cache is not None and is_immutable(url, result):
+            self.cache.put(key, result)
+        return result
+
+    def _request(self, method, url, **kwargs):
+        '''
+        Send a request on this thread's session with the timeout, through the breaker
+        '''
+        kwargs.setdefault('timeout', self.timeout)
+        return self.breaker.call(
+            lambda: self._http().request(method, url, **kwargs),
+            is_failure=lambda response: response.status_code >= 500
         )
-        self.session.verify = verify
+
+    def _send(self, method, url):
+        '''
+        Send a request on the pooled logon sessions if there are any
+
+        Raises:
+            SessionExpiredError -- the server no longer accepts the logon session
+        '''
+        if self.pool is not None:
+            response = self.pool.request(method, url)
+        else:
+            response = self._request(method, url)
+
+        if response.status_code in EXPIRED_STATUS_CODES:
+            raise SessionExpiredError('{} {} refused with status {}'.format(method, url, response.status_code))
+        return response
+
+    def _post(self, url):
+        '''
+        POST to a url and return the decoded json, posts are never coalesced
+        '''
+        return self._send('POST', url).json()
 
     def get_repo_summary(self):
         '''
         Get the summary of repo's
         '''
-        repos = self.session.get('{}/reports/summary/repository'.format(self.url))
-        repositories = repos.json()
+        repositories = self._get('{}/reports/summary/repository'.format(self.url))
         return repositories
 
-    def get_jobs(self):
+    def get_jobs(self, projection=None):
         '''
         Get all jobs
         '''
-        jobs = self.session.get('{}/jobs'.format(self.url))
-        return jobs.json()
+        jobs = self._get('{}/jobs'.format(self.url), projection)
+        return jobs
 
-    def get_job(self, uuid):
+    def get_job(self, uuid, projection=None):
         '''
         Get a single backup job
         
         Arguments:
             uuid {[uuid}
+            projection {Projection} -- fields and links to keep, defaults to the client's
         
         Returns:
             json -- a python dict of the response
         '''
-        job = self.session.get('{url}/jobs/{uuid}?format=Entity'.format(
+        job = self._get('{url}/jobs/{uuid}?format=Entity'.format(
             url=self.url,
             uuid=uuid
+        ), projection)
+        return job
+
+    def job_action(self, uuid, action):
+        '''
+        Run an action on a job
+
+        Arguments:
+            uuid {uuid} -- the job
+            action {str} -- start, stop or retry
+
+        Returns:
+            json -- the Task entity, see wait_for_tasks
+        '''
+        return self._post('{url}/jobs/{uuid}?action={action}'.format(
+            url=self.url,
+            uuid=uuid,
+            action=action
         ))
-        return job.json()
 
-    def get_backups(self):
+    def start_job(self, uuid):
+        '''
+        Start a job, returning the Task tracking it
+        '''
+        return self.job_action(uuid, 'start')
+
+    def stop_job(self, uuid):
+        '''
+        Stop a running job, returning the Task tracking it
+        '''
+        return self.job_action(uuid, 'stop')
+
+    def retry_job(self, uuid):
+        '''
+        Retry a failed job, returning the Task tracking it
+        '''
+        return self.job_action(uuid, 'retry')
+
+    def get_task(self, task_id):
+        '''
+        Get a single task
+        '''
+        return self._get('{url}/tasks/{task_id}'.format(url=self.url, task_id=task_id))
+
+    def get_tasks(self):
+        '''
+        Get all the tasks on the server
+        '''
+        return self._get('{url}/tasks?format=Entity'.format(url=self.url))
+
+    def wait_for_tasks(self, tasks, timeout=None):
+        '''
+        Wait for tasks returned by the job actions to finish
+
+        Arguments:
+            tasks {list} -- of Task entities
+
+        Returns:
+            list -- the finished Task entities in the same order
+        '''
+        from .tasks import TaskWaiter
+
+        waiter = TaskWaiter(self)
+        try:
+            return waiter.wait([waiter.add(task) for task in tasks], timeout=timeout)
+        finally:
+            waiter.stop()
+
+    def get_backups(self, projection=None):
         '''
         Get backups created on or imported to Veeam backup servers
         '''
-        backups = self.session.get('{}/backups'.format(self.url))
-        return backups.json()
+        backups = self._get('{}/backups'.format(self.url), projection)
+        return backups
     
-    def get_backup(self, uuid):
+    def get_backup(self, uuid, projection=None):
         '''
         Get a single backup info
         
         Arguments:
             uuid {uuid}
+            projection {Projection} -- fields and links to keep, defaults to the client's
         
         Returns:
             json (python dict) -- single backup info
         '''
-        backup = self.session.get('{url}/backups/{uuid}?format=Entity'.format(
+        backup = self._get('{url}/backups/{uuid}?format=Entity'.format(
             url=self.url,
             uuid=uuid
-        ))
-        return backup.json()
+        ), projection)
+        return backup
     
-    def get_restore_points(self, backup_uuid):
-        restore_points = self.session.get('{url}/backups/{uuid}/restorePoints'.format(
+    def get_restore_points(self, backup_uuid, projection=None):
+        restore_points = self._get('{url}/backups/{uuid}/restorePoints'.format(
             url=self.url,
             uuid=backup_uuid
-        ))
-        return restore_points.json()
+        ), projection)
+        return restore_points
     
-    def get_vm_restore_points(self, restore_point_uuid):
-        vm_restore_points = self.session.get('{url}/restorePoints/{uuid}/vmRestorePoints'.format(
+    def get_backup_files(self, backup_uuid, projection=None):
+        '''
+        Get the files of a backup with their sizes and dedup/compression ratios
+        
+        Arguments:
+            backup_uuid {uuid}
+            projection {Projection} -- fields and links to keep, defaults to the client's
+        
+        Returns:
+            json -- a python dict with the BackupFiles
+        '''
+        backup_files = self._get('{url}/backups/{uuid}/backupFiles?format=Entity'.format(
+            url=self.url,
+            uuid=backup_uuid
+        ), projection)
+        return backup_files
+    
+    def get_restore_point(self, uuid, projection=None):
+        '''
+        Get a single restore point, served from the cache if there is one
+        '''
+        return self._get('{url}/restorePoints/{uuid}?format=Entity'.format(
+            url=self.url,
+            uuid=uuid
+        ), self._projection(projection, 'Type'))
+
+    def get_vm_restore_point(self, uuid, projection=None):
+        '''
+        Get a single VM restore point, served from the cache if there is one
+        '''
+        return self._get('{url}/vmRestorePoints/{uuid}?format=Entity'.format(
+            url=self.url,
+            uuid=uuid
+        ), self._projection(projection, 'Type'))
+
+    def get_vm_restore_points(self, restore_point_uuid, projection=None):
+        vm_restore_points = self._get('{url}/restorePoints/{uuid}/vmRestorePoints'.format(
             url=self.url,
             uuid=restore_point_uuid
-        ))
-        return vm_restore_points.json()
+        ), projection)
+        return vm_restore_points
 
     def get_vms_processed_day(self):
         '''
         Return the number of vms process per day
         '''
-        summary_vms = self.session.get(
+        summary_vms = self._get(
             '{url}/reports/summary/processed_vms'.format(
                 url=self.url
             )
         )
-        return summary_vms.json()
+        return summary_vms
 
     def get_summary_job_stats(self):
         '''
         Return the summary job stats
         '''
-        summary_job_stats = self.session.get(
+        summary_job_stats = self._get(
             '{url}/reports/summary/job_statistics'.format(url=self.url)
         )
-        return summary_job_stats.json()
+        return summary_job_stats
 
     def get_summary_vms(self):
         '''
         Return the summary vm stats
         '''
-        summary_vm_stats = self.session.get(
+        summary_vm_stats = self._get(
             '{url}/reports/summary/vms_overview'.format(url=self.url)
         )
-        return summary_vm_stats.json()
+        return summary_vm_stats
 
     def get_summary_overview(self):
         '''
         Return the summary overview stats
         '''
-        summary_overview_stats = self.session.get(
+        summary_overview_stats = self._get(
             '{url}/reports/summary/overview'.format(url=self.url)
         )
-        return summary_overview_stats.json()
+        return summary_overview_stats
+
+    def _dashboard_executor(self):
+        '''
+        Return the threads fetching dashboard sections, created on first use and kept until close
+        '''
+        with self._sessions_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=len(DASHBOARD_SECTIONS), thread_name_prefix='veeam-dashboard'
+                )
+            return self._executor
+
+    def _dashboard_fetch(self, executor, name, fetch):
+        '''
+        Return the future of a dashboard section, joining a fetch of it still
+        running from an earlier call rather than starting another
+        '''
+        with self._sessions_lock:
+            future = self._dashboard_fetches.get(name)
+            if future is None or future.done():
+                future = self._dashboard_fetches[name] = executor.submit(fetch)
+            return future
+
+    def get_dashboard(self, deadline=30.0):
+        '''
+        Get every summary report concurrently within a shared deadline
+
+        Sections not fetched by the deadline are returned with the status
+        timeout and no data, and a failed section with the status error,
+        the other sections are still returned. Requests still running at
+        the deadline finish in the background, a later call waits for that
+        fetch rather than starting another, so a slow report holds at most
+        one of the threads kept by the client between calls.
+
+        Arguments:
+            deadline {float} -- seconds to wait for all the sections
+
+        Returns:
+            dict -- sections by name, each with its status, data and elapsed seconds
+        '''
+        started = time.monotonic()
+
+        def fetcher(method):
+            def fetch():
+                section_started = time.monotonic()
+                try:
+                    section = {'status': 'ok', 'data': getattr(self, method)()}
+                except Exception as error:
+                    section = {'status': 'error', 'data': None, 'error': repr(error)}
+                section['elapsed'] = time.monotonic() - section_started
+                return section
+            return fetch
+
+        executor = self._dashboard_executor()
+        futures = [
+            (name, self._dashboard_fetch(executor, name, fetcher(method)))
+            for name, method in DASHBOARD_SECTIONS
+        ]
+        wait([future for name, future in futures], timeout=deadline)
+
+        sections = {}
+
+        for name, future in futures:
+            if future.done():
+                sections[name] = future.result()
+            else:
+                sections[name] = {'status': 'timeout', 'data': None, 'elapsed': time.monotonic() - started}
+
+        return {
+            'sections': sections,
+            'complete': all(section['status'] == 'ok' for section in sections.values()),
+            'elapsed': time.monotonic() - started,
+            'message_type': 'dashboard',
+        }
 
     def get_date_yesterday(self):
         '''
@@ -166,50 +679,144 @@ class VeeamClient(object):
         yesterday_rep = yesterday.isoformat(timespec='seconds').replace('+00:00', 'Z')
         return yesterday_rep
 
-    def get_jobs_1_day(self):
+    @staticmethod
+    def as_utc(value):
+        '''
+        Return a datetime as an aware UTC datetime, naive datetimes are taken as UTC
+        '''
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.astimezone(datetime.timezone.utc)
+
+    @classmethod
+    def format_time(cls, value):
+        '''
+        Format a datetime the way the query filters expect, naive datetimes are taken as UTC
+        '''
+        return cls.as_utc(value).isoformat(timespec='seconds').replace('+00:00', 'Z')
+
+    @staticmethod
+    def get_time_shards(start, end, shards):
+        '''
+        Split the window start to end into consecutive (start, end) ranges
+
+        Arguments:
+            shards {int|timedelta} -- the number of shards or the width of each shard
+        '''
+        if isinstance(shards, datetime.timedelta):
+            width = shards
+        else:
+            width = (end - start) / max(1, int(shards))
+
+        if width <= datetime.timedelta(0):
+            return [(start, end)]
+
+        ranges = []
+        shard_start = start
+        while shard_start < end:
+            shard_end = min(shard_start + width, end)
+            ranges.append((shard_start, shard_end))
+            shard_start = shard_end
+        return ranges
+
+    def get_jobs_between(self, start, end=None, shards=1, workers=4, page_size=100, projection=None):
+        '''
+        Get all backup job sessions created between start and end
+
+        The window is split into shards whose creationtime ranges are
+        queried concurrently, then merged in creation time order with any
+        session returned by two shards only kept once.
+
+        Arguments:
+            start {datetime}
+            end {datetime} -- defaults to now
+            shards {int|timedelta} -- eg. 7 or timedelta(days=1)
+            workers {int} -- shards fetched at the same time
+            projection {Projection} -- fields and links to keep, defaults to the client's
+
+        Returns:
+            list -- of BackupJobSession
+        '''
+        start = self.as_utc(start)
+        end = self.as_utc(end) if end is not None else datetime.datetime.now(tz=datetime.timezone.utc)
+        projection = self._projection(projection, 'CreationTimeUTC')
+
+        def fetch(shard):
+            shard_start, shard_end = shard
+            sessions = list(self.iter_query(
+                'BackupJobSession',
+                'creationtime>="{}";creationtime<"{}"'.format(
+                    self.format_time(shard_start), self.format_time(shard_end)
+                ),
+                page_size=page_size,
+                projection=projection
+            ))
+            sessions.sort(key=lambda session: session['CreationTimeUTC'])
+            return sessions
+
+        time_shards = self.get_time_shards(start, end, shards)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(time_shards)))) as executor:
+            shard_sessions = list(executor.map(fetch, time_shards))
+
+        seen = set()
+        all_jobs = []
+
+        for session in heapq.merge(*shard_sessions, key=lambda session: session['CreationTimeUTC']):
+            if session['UID'] in seen:
+                continue
+            seen.add(session['UID'])
+            all_jobs.append(session)
+
+        return all_jobs
+
+    def get_jobs_1_day(self, projection=None):
         '''
         Get all jobs started in the last 1 day and add a type
         '''
         yesterday_rep = self.get_date_yesterday()
-        job_stats = self.session.get(
+        job_stats = self._get(
             '{}/query?type=BackupJobSession&format=entities&filter=creationtime>"{}"'.format(
-                self.url, yesterday_rep)
+                self.url, yesterday_rep),
+            projection
         )
         
-        jobs = job_stats.json()['Entities']['BackupJobSessions']['BackupJobSessions']
+        jobs = job_stats['Entities']['BackupJobSessions']['BackupJobSessions']
         
         all_jobs = []
         
         for job in jobs:
-            job['message_type'] = 'job'
-            all_jobs.append(job)
+            # Copy, the result may be shared with a coalesced call
+            all_jobs.append(dict(job, message_type='job'))
 
         return all_jobs
     
-    def get_failed_jobs(self):
+    def get_failed_jobs(self, projection=None):
         '''
         Get backup job sessions since yesterday that are failed or warning
         '''
         yesterday_rep = self.get_date_yesterday()
-        job_stats = self.session.get(
+        job_stats = self._get(
             '{}/query?type=BackupJobSession&format=entities&filter=result=="Failed";creationtime>"{}"'.format(
-                self.url, yesterday_rep)
+                self.url, yesterday_rep),
+            projection
         )
-        jobs = job_stats.json()['Entities']['BackupJobSessions']['BackupJobSessions']
+        jobs = job_stats['Entities']['BackupJobSessions']['BackupJobSessions']
 
         return jobs
     
-    def get_successful_jobs(self, jobname, since):
+    def get_successful_jobs(self, jobname, since, projection=None):
         '''
         Get all the jobs that were successful/warning for a specific job name
         starting after a specific date a specific date
         '''
-        job_stats = self.session.get(
+        job_stats = self._get(
             '{}/query?type=BackupJobSession&format=entities&filter=jobname=="{}";(result=="Success",result=="Warning");creationtime>"{}"'.format(
-                self.url, jobname, since)
+                self.url, jobname, since),
+            projection
         )
         
-        jobs = job_stats.json()['Entities']['BackupJobSessions']['BackupJobSessions']
+        jobs = job_stats['Entities']['BackupJobSessions']['BackupJobSessions']
 
         return jobs
     
@@ -222,15 +829,17 @@ class VeeamClient(object):
         2. For each failed job - get successful jobs after the failed start time
         3. If no successful jobs exist - add to the report payload
         '''
-        failed_jobs = self.get_failed_jobs()
+        projection = self._projection(None, 'JobName', 'CreationTimeUTC')
+        failed_jobs = self.get_failed_jobs(projection)
         
         all_failed_jobs = []
         
         for failed_job in failed_jobs:
-            successful_jobs = self.get_successful_jobs(failed_job['JobName'], failed_job['CreationTimeUTC'])
+            successful_jobs = self.get_successful_jobs(
+                failed_job['JobName'], failed_job['CreationTimeUTC'], projection
+            )
             if len(successful_jobs) < 1:
-                failed_job['message_type'] = 'job_failed'
-                all_failed_jobs.append(failed_job)
+                all_failed_jobs.append(dict(failed_job, message_type='job_failed'))
         
         return all_failed_jobs
 
@@ -241,7 +850,14 @@ class VeeamClient(object):
         Add FreeSpace percentage
         '''
         repo_summary = self.get_repo_summary()
-        
+
+        return self.repos_from_summary(repo_summary)
+
+    @staticmethod
+    def repos_from_summary(repo_summary):
+        '''
+        Return the repos of a repository summary report with their FreeSpace percentage
+        '''
         periods = repo_summary['Periods']
 
         now = datetime.datetime.today().strftime('%c')
@@ -249,6 +865,7 @@ class VeeamClient(object):
         repo_list = []
 
         for period in periods:
+            period = dict(period)
             # Calculate percentage free
             perc_free = round(period['FreeSpace'] / period['Capacity'] * 100, 2)
             period['percentage_free'] = perc_free
@@ -258,28 +875,59 @@ class VeeamClient(object):
         
         return repo_list
     
-    def get_backup_sessions(self, job_uuid):
+    def collect(self, reports, workers=4):
+        '''
+        Get several reports with the fewest requests, see veeam.planner
+
+        Arguments:
+            reports {list} -- report names eg. jobs_1_day, failed_jobs, persistently_failed_jobs, repos
+            workers {int} -- requests made at the same time
+
+        Returns:
+            dict -- report name to the result of the client method of the same name
+        '''
+        from .planner import collect
+
+        return collect(self, reports, workers)
+
+    def get_backup_session(self, session_uuid, projection=None):
+        '''
+        Get a single backup job session, served from the cache once stopped if there is one
+
+        Arguments:
+            session_uuid {uuid}
+            projection {Projection} -- fields and links to keep, defaults to the client's
+        '''
+        return self._get('{url}/backupSessions/{uuid}?format=Entity'.format(
+            url=self.url,
+            uuid=session_uuid
+        ), self._projection(projection, 'State'))
+
+    def get_backup_sessions(self, job_uuid, projection=None):
         '''
         Get all the backup sessions
         Order them by creation date
         
         Arguments:
             job_uuid {uuid}
+            projection {Projection} -- fields and links to keep, defaults to the client's
         '''
-        backup_sessions = self.session.get(
+        projection = self._projection(projection, 'CreationTimeUTC')
+
+        backup_sessions_json = self._get(
             '{url}/jobs/{uuid}/backupSessions?format=Entity'.format(
                 url=self.url,
                 uuid=job_uuid
-            )
+            ),
+            projection
         )
-        backup_sessions_json = backup_sessions.json()
         
         backup_sessions = backup_sessions_json['BackupJobSessions']
         
         # order by created date
         backup_sessions = sorted(
             backup_sessions,
-            key = lambda i: i['CreationTimeUTC'],
+            key = lambda i: parse_epoch(i['CreationTimeUTC']),
             reverse=True
         )
         
@@ -287,13 +935,146 @@ class VeeamClient(object):
         
         return result
 
+    def iter_query(self, query_type, query_filter=None, page_size=100, projection=None):
+        '''
+        Iterate over the entities of a query, fetching one page at a time
+
+        Pages are requested lazily so only a single page is held in memory.
+
+        Arguments:
+            query_type {str} -- the query type eg. BackupJobSession
+            query_filter {str} -- an optional filter eg. creationtime>"2019-06-30"
+            page_size {int} -- the number of entities per page
+            projection {Projection} -- fields and links to keep, defaults to the client's
+
+        Yields:
+            dict -- a single entity
+        '''
+        key = QUERY_ENTITY_KEYS.get(query_type, '{}s'.format(query_type))
+        page = 1
+
+        while True:
+            query_url = '{url}/query?type={type}&format=entities&pageSize={size}&page={page}'.format(
+                url=self.url,
+                type=query_type,
+                size=page_size,
+                page=page
+            )
+            if query_filter:
+                query_url = '{}&filter={}'.format(query_url, query_filter)
+
+            result = self._get(query_url, projection)
+
+            entities = result.get('Entities', {}).get(key, {}).get(key, [])
+            for entity in entities:
+                yield entity
+
+            pages_count = result.get('PagingInfo', {}).get('PagesCount', 1)
+            if not entities or page >= pages_count:
+                break
+            page += 1
+
+    def get_task_sessions(self, session_uuid, projection=None):
+        '''
+        Get the per VM task sessions of a backup job session
+        
+        Arguments:
+            session_uuid {uuid} -- the backup session, a full urn UID is accepted
+            projection {Projection} -- fields and links to keep, defaults to the client's
+        
+        Returns:
+            json -- a python dict with the BackupTaskSessions
+        '''
+        task_sessions = self._get('{url}/backupSessions/{uuid}/taskSessions?format=Entity'.format(
+            url=self.url,
+            uuid=session_uuid.rsplit(':', 1)[-1]
+        ), projection)
+        return task_sessions
+
+    def get_task_sessions_bulk(self, sessions, workers=8):
+        '''
+        Get the task sessions of many backup sessions concurrently as one flat table
+
+        Arguments:
+            sessions {list} -- BackupJobSession dicts (eg. from get_failed_jobs) or their UIDs
+            workers {int} -- sessions fetched at the same time
+
+        Returns:
+            list -- a dict per VM of each session
+        '''
+        projection = self._projection(None, *TASK_SESSION_FIELDS)
+
+        def fetch(session):
+            if isinstance(session, dict):
+                session_uid, job_name = session['UID'], session.get('JobName')
+            else:
+                session_uid, job_name = session, None
+            task_sessions = self.get_task_sessions(session_uid, projection)
+            return session_uid, job_name, task_sessions.get('BackupTaskSessions', [])
+
+        rows = []
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for session_uid, job_name, task_sessions in executor.map(fetch, sessions):
+                for task_session in task_sessions:
+                    rows.append({
+                        'job_name': job_name,
+                        'session_uid': session_uid,
+                        'vm': task_session.get('VmDisplayName'),
+                        'state': task_session.get('State'),
+                        'result': task_session.get('Result'),
+                        'reason': task_session.get('Reason'),
+                        'creation_time': task_session.get('CreationTimeUTC'),
+                        'end_time': task_session.get('EndTimeUTC'),
+                        'total_size': task_session.get('TotalSize'),
+                        'message_type': 'vm_task',
+                    })
+
+        return rows
+
     def logout(self):
         '''
         Delete the session
+
+        Uses the session id captured at login so it is a single DELETE,
+        only when the login response had no id are the logon sessions listed.
+        With a pool every pooled session is deleted.
+
+        Logging out again does nothing until the next login.
         '''
-        veeam_session = self.session.get('{}/logonSessions'.format(self.url)) 
-        veeam_json = veeam_session.json()
-        session_id = veeam_json['LogonSessions'][0]['SessionId']
-        self.session.delete(
+        if self.logged_out:
+            return
+
+        if self.pool is not None:
+            self.pool.close()
+            self.session_id = None
+            self.logged_out = True
+            return
+
+        session_id = self.session_id
+        if session_id is None:
+            veeam_session = self._request('GET', '{}/logonSessions'.format(self.url))
+            veeam_json = veeam_session.json()
+            session_id = veeam_json['LogonSessions'][0]['SessionId']
+        self._request(
+            'DELETE',
             '{}/logonSessions/{}'.format(self.url, session_id)
         )
+        self.session_id = None
+        self.logged_out = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.logout()
+        finally:
+            self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, self.__exit__, exc_type, exc_value, traceback)
@@ -0,0 +1,102 @@
+'''
+Configuration of the Veeam servers to collect from
+
+Servers are defined in an ini file, one section per server:
+
+    [production]
+    url = https://veeam.example:9398/api
+    username = VEEAM\\api
+    password = pazzw0rd
+    verify = false
+    timeout = 60
+'''
+import configparser
+import os
+
+from .errors import NoConfigError
+
+
+class ServerConfig(object):
+    '''
+    Connection details of a single Veeam server
+    '''
+
+    def __init__(self, name, url, username, password, verify=False, timeout=None):
+        self.name = name
+        self.url = url
+        self.username = username
+        self.password = password
+        self.verify = verify
+        self.timeout = timeout
+
+    def __repr__(self):
+        return '<ServerConfig {} {}>'.format(self.name, self.url)
+
+    def get_client(self, **kwargs):
+        '''
+        Create an authenticated client for this server
+        '''
+        from .client import VeeamClient
+
+        if self.timeout is not None:
+            kwargs.setdefault('timeout', self.timeout)
+
+        return VeeamClient(
+            self.url,
+            self.username,
+            self.password,
+            verify=self.verify,
+            **kwargs
+        )
+
+
+def load_servers(path):
+    '''
+    Load the servers defined in an ini config file
+
+    The password may be given directly or read from an environment
+    variable named by `password_env`.
+
+    Arguments:
+        path {str} -- path to the config file
+
+    Returns:
+        list -- of ServerConfig
+    '''
+    if not path or not os.path.exists(path):
+        raise NoConfigError('Config file not found: {}'.format(path))
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(path)
+
+    servers = []
+
+    for name in parser.sections():
+        section = parser[name]
+        try:
+            url = section['url'].rstrip('/')
+            username = section['username']
+        except KeyError as error:
+            raise NoConfigError('Server {} is missing {}'.format(name, error))
+
+        password = section.get('password')
+        if password is None and section.get('password_env'):
+            password = os.environ.get(section['password_env'])
+        if password is None:
+            raise NoConfigError('Server {} has no password'.format(name))
+
+        servers.append(
+            ServerConfig(
+                name=name,
+                url=url,
+                username=username,
+                password=password,
+                verify=section.getboolean('verify', fallback=False),
+                timeout=section.getfloat('timeout', fallback=None)
+            )
+        )
+
+    if not servers:
+        raise NoConfigError('No servers defined in {}'.format(path))
+
+    return servers
@@ -35,3 +35,17 @@ class LoginFailSessionKeyError(VeeamError):
     Login faied the session key is not in the login response headers
     '''
     pass
+
+
+class SessionExpiredError(VeeamError):
+    '''
+    The server no longer accepts the logon session
+    '''
+    pass
+
+
+class CircuitOpenError(VeeamError):
+    '''
+    The server has failed repeatedly and requests are failing fast
+    '''
+    pass
@@ -0,0 +1,203 @@
+'''
+Stream Veeam entities to NDJSON or Parquet
+
+Records are written as each page arrives from the Veeam API so memory
+stays flat regardless of how many entities a server holds.
+'''
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+RESOURCES = ('jobs', 'sessions', 'backups', 'restore_points', 'repos')
+
+# Sentinel put on the queue by a producer once its server is exhausted
+_DONE = object()
+
+# Seconds a producer waits on a full queue before checking the export was cancelled
+PUT_TIMEOUT = 0.5
+
+
+class NdjsonWriter(object):
+    '''
+    Write records as newline delimited json
+    '''
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def write(self, record):
+        self.fileobj.write(json.dumps(record, separators=(',', ':')))
+        self.fileobj.write('\n')
+
+    def close(self):
+        self.fileobj.flush()
+
+
+class ParquetWriter(object):
+    '''
+    Write records to a parquet file in row groups of `batch_size`
+
+    Entities differ in shape per resource so each row keeps a few common
+    columns and the full entity as a json string.
+
+    Requires pyarrow: pip install veeam[parquet]
+    '''
+    COLUMNS = ('server', 'message_type', 'uid', 'name', 'data')
+
+    def __init__(self, path, batch_size=10000):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError('Parquet export requires pyarrow: pip install veeam[parquet]')
+
+        self._pa = pyarrow
+        self.schema = pyarrow.schema(
+            [(column, pyarrow.string()) for column in self.COLUMNS]
+        )
+        self.writer = pyarrow.parquet.ParquetWriter(path, self.schema)
+        self.batch_size = batch_size
+        self.rows = {column: [] for column in self.COLUMNS}
+
+    def write(self, record):
+        self.rows['server'].append(record.get('server'))
+        self.rows['message_type'].append(record.get('message_type'))
+        self.rows['uid'].append(record.get('UID'))
+        self.rows['name'].append(record.get('Name'))
+        self.rows['data'].append(json.dumps(record, separators=(',', ':')))
+
+        if len(self.rows['data']) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.rows['data']:
+            return
+        table = self._pa.Table.from_pydict(self.rows, schema=self.schema)
+        self.writer.write_table(table)
+        self.rows = {column: [] for column in self.COLUMNS}
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def iter_resource(client, resource, since=None, page_size=100):
+    '''
+    Iterate over the records of a single resource
+
+    Arguments:
+        client {VeeamClient}
+        resource {str} -- one of RESOURCES
+        since {str} -- iso date sessions must be created after, defaults to yesterday
+        page_size {int}
+    '''
+    if resource == 'jobs':
+        records = client.iter_query('Job', page_size=page_size)
+        message_type = 'job'
+    elif resource == 'sessions':
+        since = since or client.get_date_yesterday()
+        records = client.iter_query(
+            'BackupJobSession',
+            'creationtime>"{}"'.format(since),
+            page_size=page_size
+        )
+        message_type = 'session'
+    elif resource == 'backups':
+        records = client.iter_query('Backup', page_size=page_size)
+        message_type = 'backup'
+    elif resource == 'restore_points':
+        records = client.iter_query('RestorePoint', page_size=page_size)
+        message_type = 'restore_point'
+    elif resource == 'repos':
+        records = client.get_repos()
+        message_type = 'repo'
+    else:
+        raise ValueError('Unknown resource: {}'.format(resource))
+
+    for record in records:
+        yield dict(record, message_type=message_type)
+
+
+def _put(records, item, cancelled):
+    '''
+    Put an item on the records queue unless the export was cancelled
+
+    Returns:
+        bool -- whether the item was put
+    '''
+    while not cancelled.is_set():
+        try:
+            records.put(item, timeout=PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _collect(server, resources, records, since, page_size, cancelled):
+    '''
+    Collect every resource of a server onto the records queue, stopping if the export is cancelled
+    '''
+    try:
+        with server.get_client() as client:
+            for resource in resources:
+                for record in iter_resource(client, resource, since, page_size):
+                    record['server'] = server.name
+                    if not _put(records, record, cancelled):
+                        return
+    except Exception as error:
+        _put(records, error, cancelled)
+    finally:
+        _put(records, _DONE, cancelled)
+
+
+def export(servers, writer, resources=RESOURCES, since=None, workers=4, page_size=100, buffer_size=1000):
+    '''
+    Export resources from several servers concurrently to a writer
+
+    Each server is collected on its own thread. Records pass through a
+    bounded queue to the calling thread which does all the writing, so a
+    slow writer applies back pressure rather than growing memory. If the
+    writer fails (eg. a closed pipe) the collectors are cancelled.
+
+    The writer is closed in every case.
+
+    Arguments:
+        servers {list} -- of ServerConfig
+        writer -- an NdjsonWriter or ParquetWriter
+
+    Returns:
+        int -- the number of records written
+    '''
+    records = queue.Queue(maxsize=buffer_size)
+    cancelled = threading.Event()
+    remaining = len(servers)
+    written = 0
+    errors = []
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(servers)))) as executor:
+            for server in servers:
+                executor.submit(_collect, server, resources, records, since, page_size, cancelled)
+
+            try:
+                while remaining:
+                    record = records.get()
+                    if record is _DONE:
+                        remaining -= 1
+                    elif isinstance(record, Exception):
+                        errors.append(record)
+                    else:
+                        writer.write(record)
+                        written += 1
+            except BaseException:
+                cancelled.set()
+                raise
+    finally:
+        writer.close()
+
+    if errors:
+        raise errors[0]
+
+    return written
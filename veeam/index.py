@@ -0,0 +1,211 @@
+'''
+Index of VM restore points by VM
+
+Answers "what is the latest restore point of VM X" from memory instead of
+crawling backups, their restore points and the VM restore points of each.
+'''
+import bisect
+import gzip
+import heapq
+import json
+import re
+
+from .projection import requiring
+
+# Fields of a VmRestorePoint read by parse_vm_restore_point
+RESTORE_POINT_FIELDS = ('Name', 'VmName', 'HierarchyObjRef', 'CreationTimeUTC')
+
+# The name of a VmRestorePoint eg. 'web01 (8c5586af-e14f-4255-ab5f-931bd01b7c05)@2019-06-17 20:45:56'
+RESTORE_POINT_NAME = re.compile(
+    r'^(?P<vm_name>.*?)(?: \((?P<vm_uid>[^()]*)\))?@(?P<date>\d{4}-\d{2}-\d{2}) (?P<time>\d{2}:\d{2}:\d{2})$'
+)
+
+
+def parse_vm_restore_point(point):
+    '''
+    Return the vm name, vm uid and creation time of a VmRestorePoint entity or reference
+
+    References only carry the name, which holds the vm and the creation time.
+
+    Returns:
+        tuple -- vm name, vm uid (or None) and the UTC creation time as YYYY-MM-DDTHH:MM:SSZ
+    '''
+    match = RESTORE_POINT_NAME.match(point.get('Name', ''))
+
+    vm_name = point.get('VmName') or (match and match.group('vm_name'))
+    vm_uid = point.get('HierarchyObjRef') or (match and match.group('vm_uid')) or None
+    created = point.get('CreationTimeUTC')
+    if not created and match:
+        created = '{}T{}Z'.format(match.group('date'), match.group('time'))
+
+    if not vm_name or not created:
+        raise ValueError('Not a VM restore point: {}'.format(point.get('Name')))
+
+    return vm_name, vm_uid, created
+
+
+class RestorePointIndex(object):
+    '''
+    Map each VM to its restore points sorted by creation time
+
+    VMs are told apart by their HierarchyObjRef when the restore points
+    have one, so VMs sharing a display name (eg. on different hosts) keep
+    their own history. Looking up a shared name covers all of them.
+
+    - `latest` is a dict lookup
+    - `search` finds VM names by prefix with a binary search
+    - `refresh` only queries restore points created after the newest indexed
+    - `save` and `load` persist the index as gzipped json
+    '''
+
+    def __init__(self):
+        # vm uid, or the vm name without one -> list of (creation time, restore point uid) in time order
+        self._points = {}
+        self._uids = set()
+        # vm key -> vm name and vm name -> vm keys
+        self._vm_names = {}
+        self._vm_keys = {}
+        self._names = None
+        self.high_water_mark = None
+
+    def __len__(self):
+        return len(self._points)
+
+    def add(self, point):
+        '''
+        Add a VmRestorePoint entity or reference, returning False if already indexed
+        '''
+        uid = point['UID']
+        if uid in self._uids:
+            return False
+
+        vm_name, vm_uid, created = parse_vm_restore_point(point)
+        self._insert(vm_name, vm_uid, created, uid)
+        return True
+
+    def _insert(self, vm_name, vm_uid, created, uid):
+        vm_key = vm_uid or vm_name
+        points = self._points.get(vm_key)
+        if points is None:
+            points = self._points[vm_key] = []
+            self._add_vm(vm_key, vm_name)
+
+        entry = (created, uid)
+        if not points or points[-1] <= entry:
+            points.append(entry)
+        else:
+            bisect.insort(points, entry)
+
+        self._uids.add(uid)
+        if self.high_water_mark is None or created > self.high_water_mark:
+            self.high_water_mark = created
+
+    def _add_vm(self, vm_key, vm_name):
+        self._vm_names[vm_key] = vm_name
+        if vm_name not in self._vm_keys:
+            self._vm_keys[vm_name] = []
+            self._names = None
+        self._vm_keys[vm_name].append(vm_key)
+
+    def refresh(self, client, page_size=500):
+        '''
+        Add the restore points created since the newest one in the index
+
+        Returns:
+            int -- the number of restore points added
+        '''
+        query_filter = None
+        if self.high_water_mark:
+            query_filter = 'creationtime>="{}"'.format(self.high_water_mark)
+
+        added = 0
+        for point in client.iter_query(
+                'VmRestorePoint', query_filter, page_size=page_size,
+                projection=requiring(client.projection, *RESTORE_POINT_FIELDS)):
+            if self.add(point):
+                added += 1
+        return added
+
+    def _vm_points(self, vm):
+        '''
+        Return the point lists of the VMs with this name, or of the VM with this uid
+        '''
+        if vm in self._vm_keys:
+            return [self._points[vm_key] for vm_key in self._vm_keys[vm]]
+        if vm in self._points:
+            return [self._points[vm]]
+        return []
+
+    def vm_uids(self, vm_name):
+        '''
+        Return the uids of the VMs with this name, VMs indexed without one are left out
+        '''
+        return [
+            vm_key for vm_key in self._vm_keys.get(vm_name, [])
+            if vm_key != vm_name
+        ]
+
+    def restore_points(self, vm):
+        '''
+        Return the (creation time, uid) of every restore point of a vm, oldest first
+
+        Arguments:
+            vm {str} -- the vm name or uid
+        '''
+        vm_points = self._vm_points(vm)
+        if len(vm_points) == 1:
+            return list(vm_points[0])
+        return list(heapq.merge(*vm_points))
+
+    def latest(self, vm):
+        '''
+        Return the (creation time, uid) of the newest restore point of a vm or None
+        '''
+        latest = [points[-1] for points in self._vm_points(vm) if points]
+        return max(latest) if latest else None
+
+    def search(self, prefix, limit=None):
+        '''
+        Return the vm names starting with prefix in sorted order
+        '''
+        if self._names is None:
+            self._names = sorted(self._vm_keys)
+
+        start = bisect.bisect_left(self._names, prefix)
+        names = []
+        for name in self._names[start:]:
+            if not name.startswith(prefix) or (limit is not None and len(names) >= limit):
+                break
+            names.append(name)
+        return names
+
+    def save(self, path):
+        '''
+        Write the index to a gzipped json file
+        '''
+        data = {
+            'high_water_mark': self.high_water_mark,
+            'vms': [
+                [self._vm_names[vm_key], vm_key if vm_key != self._vm_names[vm_key] else None, points]
+                for vm_key, points in self._points.items()
+            ],
+        }
+        with gzip.open(path, 'wt') as index_file:
+            json.dump(data, index_file, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Read an index written by save
+        '''
+        with gzip.open(path, 'rt') as index_file:
+            data = json.load(index_file)
+
+        index = cls()
+        for vm_name, vm_uid, points in data['vms']:
+            vm_key = vm_uid or vm_name
+            index._points[vm_key] = [tuple(point) for point in points]
+            index._uids.update(uid for created, uid in points)
+            index._add_vm(vm_key, vm_name)
+        index.high_water_mark = data['high_water_mark']
+        return index
@@ -0,0 +1,77 @@
+'''
+Share repeated strings between decoded entities
+
+In large result sets values like JobName, State, Result, Type and the
+backup server Href repeat in every entity, yet each decoded dict holds
+its own copy. An Interner is used as a json object_hook and replaces
+those values with one shared string:
+
+    client = VeeamClient(url, username, password, intern_strings=True)
+
+`measure_decoded` shows the saving on a payload.
+'''
+import json
+import threading
+import tracemalloc
+
+# Fields whose values repeat across entities
+INTERNED_FIELDS = frozenset((
+    'JobName', 'JobType', 'JobUid', 'State', 'Result', 'Reason', 'Type', 'Rel', 'Href', 'Name',
+    'Platform', 'BackupType', 'Algorithm', 'PointType', 'FileType', 'VmDisplayName',
+))
+
+
+class Interner(object):
+    '''
+    Replace the values of INTERNED_FIELDS with a shared copy
+
+    The table is shared by every response decoded by a client so values
+    are also shared across pages. It is cleared once it holds `max_size`
+    strings, bounding the memory spent on values that turn out unique.
+    '''
+
+    def __init__(self, fields=INTERNED_FIELDS, max_size=100000):
+        self.fields = frozenset(fields)
+        self.max_size = max_size
+        self._table = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._table)
+
+    def intern(self, value):
+        interned = self._table.get(value)
+        if interned is not None:
+            return interned
+        with self._lock:
+            if len(self._table) >= self.max_size:
+                self._table = {}
+            return self._table.setdefault(value, value)
+
+    def __call__(self, entity):
+        '''
+        Intern the values of one decoded json object, used as a json object_hook
+        '''
+        for field, value in entity.items():
+            if field in self.fields and type(value) is str:
+                entity[field] = self.intern(value)
+        return entity
+
+
+def measure_decoded(text, object_hook=None):
+    '''
+    Return the bytes still allocated by the object decoded from a json text
+
+    Arguments:
+        text {str} -- the json payload
+        object_hook {callable} -- eg. an Interner
+    '''
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        decoded = json.loads(text, object_hook=object_hook)
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del decoded
+    return after - before
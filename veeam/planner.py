@@ -0,0 +1,133 @@
+'''
+Plan a collection cycle as the fewest requests covering every report
+
+Several reports are views of the same data: the failed and persistently
+failed jobs of the last day are both subsets of the sessions created in
+the last day, and the repos are derived from the repository summary. A
+cycle declares the reports it needs, each underlying source is fetched
+once, concurrently, and every report is derived from the shared results.
+
+    reports = client.collect(['jobs_1_day', 'failed_jobs', 'persistently_failed_jobs', 'repos'])
+'''
+from concurrent.futures import ThreadPoolExecutor
+
+from .projection import requiring
+from .timestamps import parse_epoch
+
+SUCCESS_RESULTS = ('Success', 'Warning')
+
+# Source name -> the client method fetching it
+SOURCES = {
+    'jobs': 'get_jobs',
+    'sessions_1_day': 'get_jobs_1_day',
+    'repo_summary': 'get_repo_summary',
+    'vms_processed_day': 'get_vms_processed_day',
+    'summary_job_stats': 'get_summary_job_stats',
+    'summary_vms': 'get_summary_vms',
+    'summary_overview': 'get_summary_overview',
+}
+
+# Fields the reports derived from a source read from its entities
+SOURCE_FIELDS = {
+    'sessions_1_day': ('JobName', 'Result', 'CreationTimeUTC'),
+}
+
+
+def _fetch(client, source):
+    method = getattr(client, SOURCES[source])
+    if source in SOURCE_FIELDS:
+        return method(requiring(client.projection, *SOURCE_FIELDS[source]))
+    return method()
+
+
+def _session(session, message_type=None):
+    '''
+    Copy a session of the shared result with its own message_type
+    '''
+    session = {field: value for field, value in session.items() if field != 'message_type'}
+    if message_type is not None:
+        session['message_type'] = message_type
+    return session
+
+
+def failed_jobs(sessions):
+    return [_session(session) for session in sessions if session.get('Result') == 'Failed']
+
+
+def persistently_failed_jobs(sessions):
+    '''
+    Return the failed sessions with no successful or warning session of their job created after them
+
+    Every session created after a failure of the last day was itself created
+    in the last day, so the sessions of the day answer this without a query
+    per failed job.
+    '''
+    last_success = {}
+    for session in sessions:
+        if session.get('Result') in SUCCESS_RESULTS:
+            created = parse_epoch(session['CreationTimeUTC'])
+            if created > last_success.get(session['JobName'], float('-inf')):
+                last_success[session['JobName']] = created
+
+    return [
+        _session(session, 'job_failed')
+        for session in sessions
+        if session.get('Result') == 'Failed'
+        and last_success.get(session['JobName'], float('-inf')) <= parse_epoch(session['CreationTimeUTC'])
+    ]
+
+
+# Report name -> (the sources it needs, how it is derived from them)
+REPORTS = {
+    'jobs': (('jobs',), lambda client, jobs: jobs),
+    'jobs_1_day': (
+        ('sessions_1_day',), lambda client, sessions: [_session(session, 'job') for session in sessions]
+    ),
+    'failed_jobs': (('sessions_1_day',), lambda client, sessions: failed_jobs(sessions)),
+    'persistently_failed_jobs': (
+        ('sessions_1_day',), lambda client, sessions: persistently_failed_jobs(sessions)
+    ),
+    'repo_summary': (('repo_summary',), lambda client, summary: summary),
+    'repos': (('repo_summary',), lambda client, summary: client.repos_from_summary(summary)),
+    'vms_processed_day': (('vms_processed_day',), lambda client, summary: summary),
+    'summary_job_stats': (('summary_job_stats',), lambda client, summary: summary),
+    'summary_vms': (('summary_vms',), lambda client, summary: summary),
+    'summary_overview': (('summary_overview',), lambda client, summary: summary),
+}
+
+
+def plan(reports):
+    '''
+    Return the sources needed by the reports, each once
+
+    Raises:
+        ValueError -- for an unknown report
+    '''
+    sources = []
+    for report in reports:
+        if report not in REPORTS:
+            raise ValueError('Unknown report {}, expected one of {}'.format(report, ', '.join(sorted(REPORTS))))
+        for source in REPORTS[report][0]:
+            if source not in sources:
+                sources.append(source)
+    return sources
+
+
+def collect(client, reports, workers=4):
+    '''
+    Fetch the sources of the reports concurrently and derive every report
+
+    Returns:
+        dict -- report name to its result, as returned by the client method of the same name
+    '''
+    sources = plan(reports)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(sources)))) as executor:
+        futures = {source: executor.submit(_fetch, client, source) for source in sources}
+        results = {source: future.result() for source, future in futures.items()}
+
+    collected = {}
+    for report in reports:
+        source_names, derive = REPORTS[report]
+        collected[report] = derive(client, *(results[source] for source in source_names))
+    return collected
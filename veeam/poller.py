@@ -0,0 +1,204 @@
+'''
+Resident poller that keeps one authenticated session per server
+and runs each collection on its own jittered schedule
+'''
+import heapq
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from .errors import SessionExpiredError
+from .pool import EXPIRED_STATUS_CODES
+
+logger = logging.getLogger(__name__)
+
+
+def is_auth_failure(error):
+    '''
+    Return whether a task failed because the server refused the logon session
+    '''
+    if isinstance(error, SessionExpiredError):
+        return True
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code in EXPIRED_STATUS_CODES
+    return False
+
+
+class PollTask(object):
+    '''
+    A collection run every `interval` seconds
+
+    Each run is offset by up to `jitter` (a fraction of the interval) so
+    tasks on many pollers do not line up into synchronised load spikes.
+    '''
+
+    def __init__(self, name, func, interval, jitter=0.1, on_result=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.on_result = on_result
+
+        self.running = False
+        self.runs = 0
+        self.skips = 0
+        self.failures = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.last_duration = 0.0
+        self.last_error = None
+
+    def __repr__(self):
+        return '<PollTask {} every {}s>'.format(self.name, self.interval)
+
+    def metrics(self):
+        '''
+        Return the run counters and lag of the task in seconds
+        '''
+        return {
+            'task': self.name,
+            'interval': self.interval,
+            'running': self.running,
+            'runs': self.runs,
+            'skips': self.skips,
+            'failures': self.failures,
+            'last_lag': self.last_lag,
+            'max_lag': self.max_lag,
+            'last_duration': self.last_duration,
+            'last_error': self.last_error,
+        }
+
+
+class Poller(object):
+    '''
+    Schedule poll tasks against a single long lived client
+
+    - A task whose previous run is still in progress is skipped for the cycle
+    - Missed cycles are coalesced into one run rather than replayed
+    - When the server refuses the logon session the client deletes it and
+      logs in again before the next run, other failures keep the session
+    - With `connect` the client is created by the first task calling
+      get_client, a server down at start only fails runs until it is back
+    '''
+
+    def __init__(self, client=None, workers=4, clock=time.monotonic, seed=None, connect=None):
+        self.client = client
+        self.connect = connect
+        self.clock = clock
+        self.tasks = []
+        self._queue = []
+        self._random = random.Random(seed)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._relogin = False
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def get_client(self):
+        '''
+        Return the client, creating it with `connect` if there is none yet
+        '''
+        if self.client is None:
+            with self._lock:
+                if self.client is None:
+                    self.client = self.connect()
+        return self.client
+
+    def add_task(self, name, func, interval, jitter=0.1, on_result=None):
+        '''
+        Add a task, the first run is spread randomly across its first interval
+        '''
+        task = PollTask(name, func, interval, jitter, on_result)
+        self.tasks.append(task)
+        first_run = self.clock() + self._random.uniform(0, interval * jitter)
+        heapq.heappush(self._queue, (first_run, len(self.tasks), task))
+        return task
+
+    def _next_run(self, scheduled, task, now):
+        '''
+        Schedule the next run an interval after the last slot, coalescing
+        any slots that have already passed
+        '''
+        offset = task.interval * task.jitter
+        next_run = scheduled + task.interval
+        if next_run <= now:
+            next_run = now + task.interval
+        return next_run + self._random.uniform(-offset, offset)
+
+    def _run(self, task):
+        started = self.clock()
+        try:
+            if self._relogin and self.client is not None:
+                with self._lock:
+                    if self._relogin:
+                        self._login_again()
+                        self._relogin = False
+            result = task.func()
+            if task.on_result:
+                task.on_result(task, result)
+            task.last_error = None
+        except Exception as error:
+            logger.exception('Poll task %s failed', task.name)
+            task.failures += 1
+            task.last_error = str(error)
+            if is_auth_failure(error):
+                self._relogin = True
+        finally:
+            task.last_duration = self.clock() - started
+            task.running = False
+
+    def _login_again(self):
+        '''
+        Delete the refused logon session, so the server does not keep it
+        until it times out, and log in again
+        '''
+        try:
+            self.client.logout()
+        except Exception:
+            logger.warning('Could not delete the previous logon session', exc_info=True)
+        self.client.login()
+
+    def run_pending(self):
+        '''
+        Start every task that is due and return the seconds until the next one
+        '''
+        now = self.clock()
+
+        while self._queue and self._queue[0][0] <= now:
+            scheduled, order, task = heapq.heappop(self._queue)
+
+            if task.running:
+                task.skips += 1
+            else:
+                task.running = True
+                task.runs += 1
+                task.last_lag = max(0.0, now - scheduled)
+                task.max_lag = max(task.max_lag, task.last_lag)
+                self._executor.submit(self._run, task)
+
+            heapq.heappush(self._queue, (self._next_run(scheduled, task, now), order, task))
+
+        if not self._queue:
+            return None
+        return max(0.0, self._queue[0][0] - self.clock())
+
+    def run_forever(self):
+        '''
+        Run the scheduler until stop is called
+        '''
+        while not self._stop.is_set():
+            wait = self.run_pending()
+            self._stop.wait(1.0 if wait is None else wait)
+
+    def stop(self, wait=True):
+        self._stop.set()
+        self._executor.shutdown(wait=wait)
+
+    def metrics(self):
+        '''
+        Return the metrics of every task
+        '''
+        return [task.metrics() for task in self.tasks]
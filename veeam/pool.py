@@ -0,0 +1,161 @@
+'''
+Pool of authenticated logon sessions
+
+The Veeam REST service serialises some work per logon session, spreading
+requests over several sessions raises the throughput of a single client.
+'''
+import contextlib
+import threading
+import time
+
+from .errors import SessionExpiredError
+
+# Status codes meaning the logon session is no longer valid, a 403 is a
+# permission denied to the account and is left to the caller
+EXPIRED_STATUS_CODES = (401,)
+
+
+class LogonSession(object):
+    '''
+    A single logon session in the pool
+    '''
+
+    def __init__(self, token, session_id):
+        self.token = token
+        self.session_id = session_id
+        self.in_flight = 0
+        self.requests = 0
+        self.created = time.monotonic()
+
+    def __repr__(self):
+        return '<LogonSession {} in flight {}>'.format(self.session_id, self.in_flight)
+
+
+class LogonSessionPool(object):
+    '''
+    Keep `size` logon sessions and hand out the least loaded one
+
+    Sessions rejected by the server are replaced with a fresh login, either
+    when a request comes back unauthorised or during a health check.
+    '''
+
+    def __init__(self, client, size, sessions=None):
+        self.client = client
+        self.size = size
+        self.replaced = 0
+        self._lock = threading.Lock()
+        self._sessions = list(sessions or [])[:size]
+        while len(self._sessions) < size:
+            self._sessions.append(self._login())
+
+    def _login(self):
+        token, session_id = self.client._authenticate()
+        return LogonSession(token, session_id)
+
+    @property
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions)
+
+    @contextlib.contextmanager
+    def acquire(self):
+        '''
+        Borrow the logon session with the fewest requests in flight
+
+        Raises:
+            SessionExpiredError -- the pool was closed by a logout
+        '''
+        with self._lock:
+            if not self._sessions:
+                raise SessionExpiredError('The logon sessions of the pool were closed')
+            logon = min(self._sessions, key=lambda session: session.in_flight)
+            logon.in_flight += 1
+            logon.requests += 1
+        try:
+            yield logon
+        finally:
+            with self._lock:
+                logon.in_flight -= 1
+
+    def replace(self, logon):
+        '''
+        Replace an expired logon session, returning its replacement
+
+        When several threads find the same session expired only the first
+        logs in again, the others get the session that replaced it.
+        '''
+        with self._lock:
+            if not self._sessions:
+                raise SessionExpiredError('The logon sessions of the pool were closed')
+            if logon not in self._sessions:
+                return min(self._sessions, key=lambda session: session.in_flight)
+
+        replacement = self._login()
+
+        with self._lock:
+            if logon in self._sessions:
+                self._sessions[self._sessions.index(logon)] = replacement
+                self.replaced += 1
+        return replacement
+
+    def request(self, method, url, **kwargs):
+        '''
+        Send a request on the least loaded session, retrying once on a
+        fresh session if the server no longer accepts the token
+
+        Each attempt and the login in between go through the client's
+        circuit breaker as calls of their own.
+        '''
+        with self.acquire() as logon:
+            response = self.client._request(method, url, headers={'X-RestSvcSessionId': logon.token}, **kwargs)
+
+        if response.status_code in EXPIRED_STATUS_CODES:
+            self.replace(logon)
+            with self.acquire() as logon:
+                response = self.client._request(
+                    method, url, headers={'X-RestSvcSessionId': logon.token}, **kwargs
+                )
+
+        return response
+
+    def check_health(self):
+        '''
+        Check every logon session is still valid and replace those that are not
+
+        Returns:
+            int -- the number of sessions replaced
+        '''
+        http = self.client._http()
+        replaced = 0
+
+        for logon in self.sessions:
+            if logon.session_id is None:
+                continue
+            response = http.get(
+                '{}/logonSessions/{}'.format(self.client.url, logon.session_id),
+                headers={'X-RestSvcSessionId': logon.token},
+                timeout=self.client.timeout
+            )
+            if response.status_code in EXPIRED_STATUS_CODES or response.status_code == 404:
+                self.replace(logon)
+                replaced += 1
+
+        return replaced
+
+    def close(self):
+        '''
+        Log out of every pooled session
+        '''
+        http = self.client._http()
+
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+
+        for logon in sessions:
+            if logon.session_id is None:
+                continue
+            http.delete(
+                '{}/logonSessions/{}'.format(self.client.url, logon.session_id),
+                headers={'X-RestSvcSessionId': logon.token},
+                timeout=self.client.timeout
+            )
@@ -0,0 +1,104 @@
+'''
+Projections applied while decoding responses to shrink large result sets
+
+Most of the size of a decoded entity is its `Links` and `Href` full urls,
+which callers rarely use. A projection is applied by the json decoder to
+each entity as it is built, so dropped values are never held in memory:
+
+    projection = Projection(fields=['JobName', 'Result', 'CreationTimeUTC'], links=DROP)
+    client.get_jobs_1_day(projection=projection)
+'''
+
+KEEP = 'keep'
+DROP = 'drop'
+COMPACT = 'compact'
+LINK_MODES = (KEEP, DROP, COMPACT)
+
+# Marks the part of an Href that is kept in compact mode
+API_PATH = '/api/'
+
+
+def compact_href(href):
+    '''
+    Return the part of an Href after the api root, eg. jobs/{uuid}?format=Entity
+    '''
+    if not isinstance(href, str):
+        return href
+    _, separator, path = href.partition(API_PATH)
+    return path if separator else href
+
+
+def requiring(projection, *fields, links=None):
+    '''
+    Widen a projection to what an internal reader of the results needs
+
+    Code reading fields of entities fetched with the client's default
+    projection passes this as the projection of its own calls, eg.
+    requiring(client.projection, 'JobName', 'Links', links=KEEP).
+    None, meaning the whole entity, is returned unchanged.
+    '''
+    if projection is None:
+        return None
+    return projection.including(*fields, links=links)
+
+
+class Projection(object):
+    '''
+    Keep only some fields of entities and drop or compact their links
+
+    Entities are the decoded objects with a UID, the UID is always kept.
+    With `fields` None every field is kept. Links are kept as they are
+    (KEEP), removed along with Href (DROP) or reduced to
+    (Rel, Type, Name, path) tuples with Href a path relative to the api
+    root (COMPACT).
+    '''
+
+    def __init__(self, fields=None, links=DROP):
+        if links not in LINK_MODES:
+            raise ValueError('links must be one of {}'.format(', '.join(LINK_MODES)))
+        self.fields = frozenset(fields) | {'UID'} if fields is not None else None
+        self.links = links
+
+    def __repr__(self):
+        return '<Projection fields={} links={}>'.format(
+            sorted(self.fields) if self.fields is not None else None, self.links
+        )
+
+    @property
+    def key(self):
+        '''
+        A hashable key identifying the projection, eg. for caching
+        '''
+        return (tuple(sorted(self.fields)) if self.fields is not None else None, self.links)
+
+    def including(self, *fields, links=None):
+        '''
+        Return a projection that also keeps the given fields, and with links in the given mode if any
+        '''
+        links = self.links if links is None else links
+        if self.fields is None and links == self.links:
+            return self
+        return Projection(self.fields.union(fields) if self.fields is not None else None, links)
+
+    def __call__(self, entity):
+        '''
+        Project one decoded json object, used as a json object_hook
+        '''
+        if 'UID' not in entity:
+            return entity
+
+        if self.fields is not None:
+            entity = {field: value for field, value in entity.items() if field in self.fields}
+
+        if self.links == DROP:
+            entity.pop('Links', None)
+            entity.pop('Href', None)
+        elif self.links == COMPACT:
+            if 'Href' in entity:
+                entity['Href'] = compact_href(entity['Href'])
+            if 'Links' in entity:
+                entity['Links'] = [
+                    (link.get('Rel'), link.get('Type'), link.get('Name'), compact_href(link.get('Href')))
+                    for link in entity['Links']
+                ]
+        return entity
@@ -0,0 +1,235 @@
+'''
+Prometheus exporter serving Veeam metrics from an in-memory snapshot
+
+Scrapes never reach the Veeam server: the repository, job statistics and
+overview reports are refreshed in the background on their own schedule
+(see `veeam exporter`) and every scrape is answered from the last
+snapshot. How old the data is, is exported as veeam_exporter_data_age_seconds.
+
+    exporter = PrometheusExporter()
+    exporter.refresh('production', client)
+    with MetricsServer(exporter, port=9601):
+        ...
+'''
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REPOSITORY_METRICS = (
+    ('veeam_repository_capacity_bytes', 'Capacity', 'Capacity of the repository'),
+    ('veeam_repository_free_bytes', 'FreeSpace', 'Free space of the repository'),
+    ('veeam_repository_backup_bytes', 'BackupSize', 'Size of the backups on the repository'),
+    ('veeam_repository_free_percent', 'percentage_free', 'Free space of the repository in percent'),
+)
+
+EXPORTER_HELP = {
+    'veeam_exporter_refresh_success': 'Whether the last refresh of the server succeeded',
+    'veeam_exporter_refresh_duration_seconds': 'Duration of the last refresh of the server',
+    'veeam_exporter_last_success_timestamp_seconds': 'Time of the last successful refresh',
+    'veeam_exporter_data_age_seconds': (
+        'Seconds since the exported data of the server was refreshed, or since the exporter started'
+    ),
+}
+
+
+def snake_case(name):
+    '''
+    Convert a CamelCase report field to snake_case, eg. RunningJobs to running_jobs
+    '''
+    return re.sub(r'(?<=[a-z0-9])(?=[A-Z])', '_', name).lower()
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_sample(name, labels, value):
+    label_text = ','.join('{}="{}"'.format(key, escape(label)) for key, label in labels)
+    return '{}{{{}}} {}'.format(name, label_text, repr(float(value)))
+
+
+def collect(client):
+    '''
+    Fetch the reports of a server and return its samples
+
+    Returns:
+        list -- of (metric name, help, labels, value)
+    '''
+    samples = []
+
+    for repo in client.get_repos():
+        labels = (('repository', repo['Name']),)
+        for name, field, help_text in REPOSITORY_METRICS:
+            if repo.get(field) is not None:
+                samples.append((name, help_text, labels, repo[field]))
+
+    for prefix, report in (
+            ('veeam_job_statistics', client.get_summary_job_stats()),
+            ('veeam_overview', client.get_summary_overview())):
+        for field, value in report.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                samples.append((
+                    '{}_{}'.format(prefix, snake_case(field)),
+                    '{} from the {} report'.format(field, prefix[len('veeam_'):]),
+                    (),
+                    value
+                ))
+
+    return samples
+
+
+class PrometheusExporter(object):
+    '''
+    Snapshot of the metrics of many servers in the Prometheus text format
+
+    The text of the collected metrics is rendered once per refresh, a
+    scrape only adds the data age so it costs microseconds whatever the
+    latency of the Veeam servers.
+    '''
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.started = clock()
+        self._samples = {}
+        self._status = {}
+        self._body = ''
+        self._lock = threading.Lock()
+
+    def refresh(self, server, client):
+        '''
+        Collect the metrics of a server and replace its part of the snapshot
+
+        On failure the previous samples of the server are kept, so they age,
+        and the error is raised again (eg. for the poller to log in again).
+        '''
+        started = self.clock()
+        try:
+            samples = collect(client)
+        except Exception:
+            self.mark_failed(server, self.clock() - started)
+            raise
+
+        with self._lock:
+            self._samples[server] = samples
+            status = self._status.setdefault(server, {'last_success': None})
+            status.update(success=True, duration=self.clock() - started, last_success=self.clock())
+            self._render()
+
+    def mark_failed(self, server, duration=0.0):
+        '''
+        Record a failed refresh of a server, eg. when no client could be created
+        '''
+        with self._lock:
+            status = self._status.setdefault(server, {'last_success': None})
+            status.update(success=False, duration=duration)
+            self._render()
+
+    def _render(self):
+        families = {}
+
+        for server, samples in sorted(self._samples.items()):
+            for name, help_text, labels, value in samples:
+                family = families.setdefault(name, (help_text, []))
+                family[1].append(format_sample(name, (('server', server),) + labels, value))
+
+        for server, status in sorted(self._status.items()):
+            labels = (('server', server),)
+            exporter_samples = [
+                ('veeam_exporter_refresh_success', 1 if status['success'] else 0),
+                ('veeam_exporter_refresh_duration_seconds', status['duration']),
+            ]
+            if status['last_success'] is not None:
+                exporter_samples.append(('veeam_exporter_last_success_timestamp_seconds', status['last_success']))
+            for name, value in exporter_samples:
+                family = families.setdefault(name, (EXPORTER_HELP[name], []))
+                family[1].append(format_sample(name, labels, value))
+
+        lines = []
+        for name, (help_text, samples) in families.items():
+            lines.append('# HELP {} {}'.format(name, help_text))
+            lines.append('# TYPE {} gauge'.format(name))
+            lines.extend(samples)
+
+        self._body = '\n'.join(lines) + '\n' if lines else ''
+
+    def render(self):
+        '''
+        Return the snapshot in the Prometheus text format with the current data age
+
+        A server never refreshed successfully ages from the start of the
+        exporter, so alerts on the age also catch a server down since then.
+        '''
+        now = self.clock()
+        with self._lock:
+            body = self._body
+            ages = [
+                (server, now - (status['last_success'] if status['last_success'] is not None else self.started))
+                for server, status in sorted(self._status.items())
+            ]
+
+        if not ages:
+            return body
+
+        name = 'veeam_exporter_data_age_seconds'
+        lines = ['# HELP {} {}'.format(name, EXPORTER_HELP[name]), '# TYPE {} gauge'.format(name)]
+        lines.extend(format_sample(name, (('server', server),), age) for server, age in ages)
+        return body + '\n'.join(lines) + '\n'
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.exporter.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class MetricsServer(object):
+    '''
+    A local HTTP server answering /metrics from a PrometheusExporter
+    '''
+
+    def __init__(self, exporter, host='127.0.0.1', port=0):
+        self.httpd = _ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.exporter = exporter
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}/metrics'.format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
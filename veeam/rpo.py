@@ -0,0 +1,137 @@
+'''
+Recovery point objective (RPO) compliance across protected VMs
+'''
+import array
+import time
+
+from .index import RESTORE_POINT_FIELDS, parse_vm_restore_point
+from .projection import requiring
+from .timestamps import parse_epoch
+
+# Results of a task session that produce a usable restore point
+GOOD_RESULTS = ('Success', 'Warning')
+
+
+def to_epoch(timestamp):
+    '''
+    Convert a Veeam YYYY-MM-DDTHH:MM:SSZ timestamp to epoch seconds
+    '''
+    return parse_epoch(timestamp)
+
+
+class RpoEvaluator(object):
+    '''
+    Keep the last good restore point time of every VM and report RPO violations
+
+    Last good times are updated incrementally as restore points and task
+    sessions are observed. Times and RPOs are held in parallel arrays
+    indexed by VM so `evaluate` is a single pass over flat arrays of
+    numbers rather than a walk over restore point entities.
+    '''
+
+    def __init__(self, default_rpo=86400):
+        self.default_rpo = default_rpo
+        self.high_water_mark = None
+        self._slots = {}
+        self._vms = []
+        self._last_good = array.array('d')
+        self._rpo = array.array('d')
+
+    def __len__(self):
+        return len(self._vms)
+
+    def _slot(self, vm):
+        slot = self._slots.get(vm)
+        if slot is None:
+            slot = self._slots[vm] = len(self._vms)
+            self._vms.append(vm)
+            self._last_good.append(0.0)
+            self._rpo.append(self.default_rpo)
+        return slot
+
+    def set_policy(self, vm, rpo):
+        '''
+        Set the RPO of a vm in seconds
+        '''
+        self._rpo[self._slot(vm)] = rpo
+
+    def observe(self, vm, timestamp):
+        '''
+        Record a good restore point of a vm at a YYYY-MM-DDTHH:MM:SSZ time
+        '''
+        slot = self._slot(vm)
+        epoch = to_epoch(timestamp)
+        if epoch > self._last_good[slot]:
+            self._last_good[slot] = epoch
+
+    def observe_restore_point(self, point):
+        '''
+        Record a VmRestorePoint entity or reference
+
+        Only restore points move the high water mark refresh queries from,
+        task sessions end after restore points not yet fetched were created.
+        '''
+        vm_name, vm_uid, created = parse_vm_restore_point(point)
+        self.observe(vm_name, created)
+        if self.high_water_mark is None or created > self.high_water_mark:
+            self.high_water_mark = created
+
+    def observe_task_session(self, task_session):
+        '''
+        Record a BackupTaskSession if it produced a restore point
+        '''
+        if task_session.get('Result') in GOOD_RESULTS:
+            self.observe(task_session['VmDisplayName'], task_session['EndTimeUTC'])
+
+    def refresh(self, client, page_size=500):
+        '''
+        Record the restore points created since the newest one observed
+        '''
+        query_filter = None
+        if self.high_water_mark:
+            query_filter = 'creationtime>="{}"'.format(self.high_water_mark)
+
+        for point in client.iter_query(
+                'VmRestorePoint', query_filter, page_size=page_size,
+                projection=requiring(client.projection, *RESTORE_POINT_FIELDS)):
+            self.observe_restore_point(point)
+
+    def last_good(self, vm):
+        '''
+        Return the epoch of the last good restore point of a vm or None
+        '''
+        slot = self._slots.get(vm)
+        if slot is None or not self._last_good[slot]:
+            return None
+        return self._last_good[slot]
+
+    def evaluate(self, now=None):
+        '''
+        Return every vm whose last good restore point is older than its RPO
+
+        Returns:
+            list -- of dicts of vm, last_good (epoch or None), rpo and lag in
+            seconds, worst first
+        '''
+        if now is None:
+            now = time.time()
+
+        violations = [
+            slot
+            for slot, (last_good, rpo) in enumerate(zip(self._last_good, self._rpo))
+            if now - last_good > rpo
+        ]
+
+        result = []
+        for slot in violations:
+            last_good = self._last_good[slot] or None
+            result.append({
+                'vm': self._vms[slot],
+                'last_good': last_good,
+                'rpo': self._rpo[slot],
+                'lag': now - last_good if last_good else None,
+                'message_type': 'rpo_violation',
+            })
+
+        result.sort(key=lambda violation: (violation['lag'] is not None, -(violation['lag'] or 0)))
+        return result
@@ -0,0 +1,61 @@
+'''
+Single-flight deduplication of identical concurrent calls
+'''
+import threading
+
+
+class _Call(object):
+    '''
+    A call in flight that followers wait on
+    '''
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    '''
+    Share one execution of a function between concurrent callers of the same key
+
+    The first caller of a key runs the function, callers arriving while it
+    is in flight wait and receive the same result (or exception). Once the
+    call completes the key is forgotten, so nothing is cached.
+    '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def in_flight(self):
+        '''
+        Return the number of keys currently being fetched
+        '''
+        with self._lock:
+            return len(self._calls)
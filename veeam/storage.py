@@ -0,0 +1,136 @@
+'''
+Backup file inventory and storage totals per job and repository
+'''
+from concurrent.futures import ThreadPoolExecutor
+
+from .projection import KEEP, requiring
+
+# Fields of the BackupFile entities read into the table
+BACKUP_FILE_FIELDS = (
+    'FilePath', 'FileType', 'BackupSize', 'DataSize', 'DeduplicationRatio', 'CompressRatio', 'CreationTimeUtc',
+)
+
+# Columns of the backup file table
+COLUMNS = (
+    'backup', 'job', 'repository', 'file_path', 'file_type',
+    'backup_size', 'data_size', 'dedup_ratio', 'compress_ratio', 'created',
+)
+
+
+def _uuid(uid):
+    return uid.rsplit(':', 1)[-1]
+
+
+def _repository(backup):
+    for link in backup.get('Links', []):
+        if link.get('Type') == 'RepositoryReference':
+            return link.get('Name')
+    return None
+
+
+class BackupFileTable(object):
+    '''
+    Backup files held column-wise, one list per column
+
+    Aggregations run over whole columns at once rather than over a list of
+    nested file entities, which keeps them fast for hundreds of thousands
+    of files.
+    '''
+
+    def __init__(self):
+        self.columns = {column: [] for column in COLUMNS}
+
+    def __len__(self):
+        return len(self.columns['file_path'])
+
+    def add_backup(self, backup, backup_files):
+        '''
+        Add the BackupFile entities of a backup
+        '''
+        job = backup.get('Name')
+        repository = _repository(backup)
+        uid = backup.get('UID')
+
+        for backup_file in backup_files:
+            self.columns['backup'].append(uid)
+            self.columns['job'].append(job)
+            self.columns['repository'].append(repository)
+            self.columns['file_path'].append(backup_file.get('FilePath'))
+            self.columns['file_type'].append(backup_file.get('FileType'))
+            self.columns['backup_size'].append(backup_file.get('BackupSize') or 0)
+            self.columns['data_size'].append(backup_file.get('DataSize') or 0)
+            self.columns['dedup_ratio'].append(backup_file.get('DeduplicationRatio') or 1.0)
+            self.columns['compress_ratio'].append(backup_file.get('CompressRatio') or 1.0)
+            self.columns['created'].append(backup_file.get('CreationTimeUtc'))
+
+    def rows(self):
+        '''
+        Iterate over the files as dicts
+        '''
+        for values in zip(*(self.columns[column] for column in COLUMNS)):
+            yield dict(zip(COLUMNS, values))
+
+    def aggregate(self, by='job'):
+        '''
+        Total the files grouped by a column, eg. job or repository
+
+        Dedup and compression ratios are averaged weighted by data size,
+        the overall ratio is data size over size on disk.
+
+        Returns:
+            list -- of dicts sorted by backup_size, largest first
+        '''
+        totals = {}
+
+        for key, backup_size, data_size, dedup, compress in zip(
+                self.columns[by], self.columns['backup_size'], self.columns['data_size'],
+                self.columns['dedup_ratio'], self.columns['compress_ratio']):
+            total = totals.get(key)
+            if total is None:
+                total = totals[key] = [0, 0, 0, 0.0, 0.0]
+            total[0] += 1
+            total[1] += backup_size
+            total[2] += data_size
+            total[3] += dedup * data_size
+            total[4] += compress * data_size
+
+        report = []
+        for key, (files, backup_size, data_size, dedup, compress) in totals.items():
+            report.append({
+                by: key,
+                'files': files,
+                'backup_size': backup_size,
+                'data_size': data_size,
+                'dedup_ratio': round(dedup / data_size, 2) if data_size else None,
+                'compress_ratio': round(compress / data_size, 2) if data_size else None,
+                'reduction_ratio': round(data_size / backup_size, 2) if backup_size else None,
+                'message_type': 'storage_{}'.format(by),
+            })
+
+        report.sort(key=lambda total: total['backup_size'], reverse=True)
+        return report
+
+
+def collect_backup_files(client, backups=None, workers=8):
+    '''
+    Fetch the files of many backups concurrently into a BackupFileTable
+
+    Arguments:
+        client {VeeamClient}
+        backups {iterable} -- Backup entities, defaults to every backup on the server
+        workers {int} -- backups fetched at the same time
+    '''
+    if backups is None:
+        backups = client.iter_query('Backup', projection=requiring(client.projection, 'Name', 'Links', links=KEEP))
+    projection = requiring(client.projection, *BACKUP_FILE_FIELDS)
+
+    def fetch(backup):
+        return backup, client.get_backup_files(_uuid(backup['UID']), projection).get('BackupFiles', [])
+
+    table = BackupFileTable()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for backup, backup_files in executor.map(fetch, backups):
+            table.add_backup(backup, backup_files)
+
+    return table
@@ -0,0 +1,728 @@
+'''
+Deterministic synthetic Veeam data for scale testing
+
+SyntheticDataset describes thousands of jobs, hundreds of thousands of
+sessions and millions of VM restore points without holding them in
+memory: every entity is generated from its index when requested, so the
+same seed always gives the same data.
+
+The dataset answers Veeam REST requests itself, either through
+SyntheticAdapter mounted on a requests session (for tests) or through
+FakeVeeamServer listening on a local port.
+
+    dataset = SyntheticDataset(jobs=2000, sessions_per_job=50, seed=1)
+    with FakeVeeamServer(dataset) as server:
+        client = VeeamClient(server.url, 'user', 'pass')
+'''
+import bisect
+import collections
+import datetime
+import json
+import random
+import re
+import socketserver
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import unquote_plus, urlsplit
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+BASE_HREF = 'http://veeam.example:9399/api'
+BACKUP_SERVER_UID = '62f06091-56a7-4aa3-bf4a-f2df501b8fd9'
+TIME_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# Filtered queries whose matching entities are kept, so paging through one is linear
+QUERY_CACHE_SIZE = 32
+
+# Codes for the kind of entity in the first field of a synthetic uuid
+KINDS = {
+    'Job': 1,
+    'Backup': 2,
+    'BackupJobSession': 3,
+    'RestorePoint': 4,
+    'VmRestorePoint': 5,
+    'Vm': 6,
+    'Repository': 7,
+    'BackupFile': 8,
+}
+
+# Query filter field names and the entity field they compare
+FILTER_FIELDS = {
+    'creationtime': 'CreationTimeUTC',
+    'endtime': 'EndTimeUTC',
+    'result': 'Result',
+    'state': 'State',
+    'jobname': 'JobName',
+    'name': 'Name',
+    'uid': 'UID',
+}
+
+FILTER_TERM = re.compile(r'^\s*(?P<field>\w+)\s*(?P<op>==|!=|>=|<=|>|<)\s*"?(?P<value>[^"]*)"?\s*$')
+
+OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '>=': lambda a, b: a >= b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '<': lambda a, b: a < b,
+}
+
+
+def parse_filter(query_filter):
+    '''
+    Parse a query filter into a list of OR groups that must all match
+
+    Terms are joined with ; (and), a parenthesised group joins terms with , (or):
+    result=="Failed";(jobname=="a",jobname=="b");creationtime>"2019-06-30"
+
+    Returns:
+        list -- of lists of (entity field, operator, value)
+    '''
+    groups = []
+    if not query_filter:
+        return groups
+
+    for part in re.findall(r'\([^)]*\)|[^;]+', query_filter):
+        part = part.strip().strip('()')
+        group = []
+        for term in part.split(','):
+            match = FILTER_TERM.match(term)
+            if not match:
+                raise ValueError('Unsupported filter term: {}'.format(term))
+            field = FILTER_FIELDS.get(match.group('field').lower(), match.group('field'))
+            group.append((field, match.group('op'), match.group('value')))
+        groups.append(group)
+    return groups
+
+
+def matches(entity, groups):
+    for group in groups:
+        if not any(
+            entity.get(field) is not None and OPERATORS[op](str(entity.get(field)), value)
+            for field, op, value in group
+        ):
+            return False
+    return True
+
+
+def lower_time_bound(groups):
+    '''
+    Return the lowest creation time a filter allows, or None if unbounded
+    '''
+    bounds = [
+        group[0][2] for group in groups
+        if len(group) == 1 and group[0][0] == 'CreationTimeUTC' and group[0][1] in ('>', '>=')
+    ]
+    return max(bounds) if bounds else None
+
+
+class SyntheticDataset(object):
+    '''
+    Consistent synthetic jobs, backups, sessions, restore points and repositories
+
+    - Every job has one backup and runs every `interval_hours`
+    - Session k of a job is its k-th most recent run, restore point k of a
+      backup is created when session k ends
+    - VMs per job are skewed by `skew`: 0 gives every job `vms_per_job`
+      VMs, larger values give a long tail of big jobs with the same mean
+
+    Arguments:
+        jobs {int}
+        sessions_per_job {int} -- also the restore points per backup
+        vms_per_job {int} -- mean VMs per job
+        repositories {int}
+        failure_rate, warning_rate {float} -- fraction of sessions with that result
+        running_rate {float} -- fraction of jobs whose latest session is still running
+        end {datetime} -- creation time of the newest sessions
+    '''
+
+    def __init__(self, jobs=100, sessions_per_job=30, vms_per_job=10, repositories=5,
+                 failure_rate=0.05, warning_rate=0.05, running_rate=0.02, skew=1.0,
+                 interval_hours=24, end=datetime.datetime(2019, 7, 1, 22, 0, 0), seed=0):
+        self.jobs = jobs
+        self.sessions_per_job = sessions_per_job
+        self.vms_per_job = vms_per_job
+        self.repositories = repositories
+        self.failure_rate = failure_rate
+        self.warning_rate = warning_rate
+        self.running_rate = running_rate
+        self.interval = datetime.timedelta(hours=interval_hours)
+        self.end = end
+        self.seed = seed
+
+        rng = random.Random('{}:vms'.format(seed))
+        weights = [(1 - min(skew, 1)) + min(skew, 1) * rng.paretovariate(2.0) / 2.0 for _ in range(jobs)]
+        scale = vms_per_job * jobs / (sum(weights) or 1)
+        self.job_vms = [max(1, int(round(weight * scale))) for weight in weights]
+        # Index of the first vm of every job in a layer of vm restore points
+        self._vm_offsets = []
+        total = 0
+        for count in self.job_vms:
+            self._vm_offsets.append(total)
+            total += count
+        self.vms = total
+        self._matching = collections.OrderedDict()
+        self._matching_lock = threading.Lock()
+
+    # Identity
+
+    def _uuid(self, kind, index):
+        return str(uuid.UUID('{:08x}-{:04x}-4000-8000-{:012x}'.format(KINDS[kind], self.seed & 0xffff, index)))
+
+    @staticmethod
+    def _index(entity_uuid):
+        return int(entity_uuid.rsplit(':', 1)[-1][-12:], 16)
+
+    def _rng(self, kind, index):
+        return random.Random('{}:{}:{}'.format(self.seed, kind, index))
+
+    def _time(self, value):
+        return value.strftime(TIME_FORMAT)
+
+    def _link(self, rel, path, name, link_type):
+        link = {'Rel': rel, 'Href': '{}/{}'.format(BASE_HREF, path), 'Type': link_type}
+        if name is not None:
+            link['Name'] = name
+        return link
+
+    def _server_link(self):
+        return self._link('Up', 'backupServers/{}'.format(BACKUP_SERVER_UID), 'veeam.example', 'BackupServerReference')
+
+    # Sizes
+
+    @property
+    def sessions(self):
+        return self.jobs * self.sessions_per_job
+
+    @property
+    def restore_points(self):
+        return self.jobs * self.sessions_per_job
+
+    @property
+    def vm_restore_points(self):
+        return self.vms * self.sessions_per_job
+
+    # Entities
+
+    def job_name(self, job):
+        return 'Job_{:05d}'.format(job)
+
+    def vm_name(self, job, vm):
+        return 'vm-{:05d}-{:03d}'.format(job, vm)
+
+    def repository_name(self, job):
+        return 'Repository_{:02d}'.format(job % max(1, self.repositories))
+
+    def job(self, job):
+        job_uuid = self._uuid('Job', job)
+        return {
+            'JobType': 'Backup',
+            'Platform': 'VMware',
+            'Description': 'Synthetic job {}'.format(job),
+            'ScheduleConfigured': True,
+            'ScheduleEnabled': True,
+            'Name': self.job_name(job),
+            'UID': 'urn:veeam:Job:{}'.format(job_uuid),
+            'Links': [
+                self._server_link(),
+                self._link('Alternate', 'jobs/{}'.format(job_uuid), self.job_name(job), 'JobReference'),
+                self._link('Down', 'jobs/{}/backupSessions'.format(job_uuid), None, 'BackupJobSessionReferenceList'),
+            ],
+            'Href': '{}/jobs/{}?format=Entity'.format(BASE_HREF, job_uuid),
+            'Type': 'Job',
+        }
+
+    def _run(self, job, run):
+        '''
+        Return the creation time, end time, state and result of the run-th most recent run of a job
+        '''
+        rng = self._rng('BackupJobSession', run * self.jobs + job)
+        offset = datetime.timedelta(seconds=(job * 137) % int(self.interval.total_seconds() or 1))
+        created = self.end - run * self.interval - offset
+        duration = datetime.timedelta(seconds=rng.randint(300, 4 * 3600))
+
+        if run == 0 and self._rng('running', job).random() < self.running_rate:
+            return created, None, 'Working', 'None', rng.randint(0, 99)
+
+        roll = rng.random()
+        if roll < self.failure_rate:
+            result = 'Failed'
+        elif roll < self.failure_rate + self.warning_rate:
+            result = 'Warning'
+        else:
+            result = 'Success'
+        return created, created + duration, 'Stopped', result, 100
+
+    def session(self, index):
+        job, run = index % self.jobs, index // self.jobs
+        created, ended, state, result, progress = self._run(job, run)
+        session_uuid = self._uuid('BackupJobSession', index)
+        name = self.job_name(job)
+        return {
+            'IsRetry': False,
+            'JobUid': 'urn:veeam:Job:{}'.format(self._uuid('Job', job)),
+            'JobName': name,
+            'JobType': 'Backup',
+            'CreationTimeUTC': self._time(created),
+            'EndTimeUTC': self._time(ended) if ended else '1900-01-01T00:00:00Z',
+            'State': state,
+            'Result': result,
+            'Progress': progress,
+            'Name': '{}@{}'.format(name, created.strftime('%Y-%m-%d %H:%M:%S')),
+            'UID': 'urn:veeam:BackupJobSession:{}'.format(session_uuid),
+            'Links': [self._server_link()],
+            'Href': '{}/backupSessions/{}?format=Entity'.format(BASE_HREF, session_uuid),
+            'Type': 'BackupJobSession',
+        }
+
+    def backup(self, backup):
+        backup_uuid = self._uuid('Backup', backup)
+        name = self.job_name(backup)
+        return {
+            'Platform': 'VMware',
+            'BackupType': 'Standard',
+            'Name': name,
+            'UID': 'urn:veeam:Backup:{}'.format(backup_uuid),
+            'Links': [
+                self._link(
+                    'Up', 'repositories/{}'.format(self._uuid('Repository', backup % max(1, self.repositories))),
+                    self.repository_name(backup), 'RepositoryReference'
+                ),
+                self._server_link(),
+                self._link('Alternate', 'backups/{}'.format(backup_uuid), name, 'BackupReference'),
+                self._link('Down', 'backups/{}/restorePoints'.format(backup_uuid), None, 'RestorePointReferenceList'),
+                self._link('Down', 'backups/{}/backupFiles'.format(backup_uuid), None, 'BackupFileReferenceList'),
+            ],
+            'Href': '{}/backups/{}?format=Entity'.format(BASE_HREF, backup_uuid),
+            'Type': 'Backup',
+        }
+
+    def restore_point(self, index):
+        backup, run = index % self.jobs, index // self.jobs
+        created, ended, state, result, progress = self._run(backup, run)
+        point_time = ended or created
+        point_uuid = self._uuid('RestorePoint', index)
+        return {
+            'CreationTimeUTC': self._time(point_time),
+            'Algorithm': 'Full' if run % 7 == 6 else 'Increment',
+            'PointType': 'Full' if run % 7 == 6 else 'Increment',
+            'Name': point_time.strftime('%b %d %Y %I:%M%p'),
+            'UID': 'urn:veeam:RestorePoint:{}'.format(point_uuid),
+            'Links': [
+                self._server_link(),
+                self._link('Up', 'backups/{}'.format(self._uuid('Backup', backup)), self.job_name(backup), 'BackupReference'),
+                self._link('Down', 'restorePoints/{}/vmRestorePoints'.format(point_uuid), None, 'VmRestorePointReferenceList'),
+            ],
+            'Href': '{}/restorePoints/{}?format=Entity'.format(BASE_HREF, point_uuid),
+            'Type': 'RestorePoint',
+        }
+
+    def task_sessions(self, index):
+        '''
+        Return the per VM task sessions of a session, a failed session fails some of its VMs
+        '''
+        job, run = index % self.jobs, index // self.jobs
+        created, ended, state, result, progress = self._run(job, run)
+        rng = self._rng('BackupTaskSession', index)
+        session_uuid = self._uuid('BackupJobSession', index)
+        task_sessions = []
+
+        for vm in range(self.job_vms[job]):
+            vm_result = result
+            if result == 'Failed' and vm and rng.random() < 0.5:
+                vm_result = 'Success'
+            task_sessions.append({
+                'JobSessionUid': 'urn:veeam:BackupJobSession:{}'.format(session_uuid),
+                'CreationTimeUTC': self._time(created),
+                'EndTimeUTC': self._time(ended) if ended else '1900-01-01T00:00:00Z',
+                'State': state,
+                'Result': vm_result,
+                'Reason': 'Error: Failed to create snapshot' if vm_result == 'Failed' else '',
+                'TotalSize': rng.randint(20, 200) * 2 ** 30,
+                'VmDisplayName': self.vm_name(job, vm),
+                'Name': self.vm_name(job, vm),
+                'UID': 'urn:veeam:BackupTaskSession:{}-{:03d}'.format(session_uuid, vm),
+                'Links': [self._server_link()],
+                'Type': 'BackupTaskSession',
+            })
+        return task_sessions
+
+    def backup_file(self, backup, run):
+        created, ended, state, result, progress = self._run(backup, run)
+        rng = self._rng('BackupFile', run * self.jobs + backup)
+        full = run % 7 == 6
+        data_size = self.job_vms[backup] * rng.randint(20, 200) * 2 ** 30 // (1 if full else 10)
+        dedup = round(rng.uniform(1.0, 3.0), 1)
+        compress = round(rng.uniform(1.2, 2.5), 1)
+        point_time = (ended or created).strftime('%Y-%m-%dT%H%M%S')
+        return {
+            'FilePath': 'D:\\Backups\\{}\\{}D{}.{}'.format(
+                self.job_name(backup), self.job_name(backup), point_time, 'vbk' if full else 'vib'
+            ),
+            'BackupSize': int(data_size / dedup / compress),
+            'DataSize': data_size,
+            'DeduplicationRatio': dedup,
+            'CompressRatio': compress,
+            'CreationTimeUtc': self._time(ended or created),
+            'FileType': 'vbk' if full else 'vib',
+            'Name': '{}D{}'.format(self.job_name(backup), point_time),
+            'UID': 'urn:veeam:BackupFile:{}'.format(self._uuid('BackupFile', run * self.jobs + backup)),
+            'Type': 'BackupFile',
+        }
+
+    def vm_restore_point(self, index):
+        run, position = divmod(index, self.vms)
+        job = bisect.bisect_right(self._vm_offsets, position) - 1
+        vm = position - self._vm_offsets[job]
+        created, ended, state, result, progress = self._run(job, run)
+        point_time = ended or created
+        point_uuid = self._uuid('VmRestorePoint', index)
+        vm_uuid = self._uuid('Vm', self._vm_offsets[job] + vm)
+        vm_name = self.vm_name(job, vm)
+        name = '{} ({})@{}'.format(vm_name, vm_uuid, point_time.strftime('%Y-%m-%d %H:%M:%S'))
+        return {
+            'CreationTimeUTC': self._time(point_time),
+            'VmName': vm_name,
+            'Algorithm': 'Full' if run % 7 == 6 else 'Increment',
+            'PointType': 'Full' if run % 7 == 6 else 'Increment',
+            'HierarchyObjRef': 'urn:VMware:Vm:{}'.format(vm_uuid),
+            'Name': name,
+            'UID': 'urn:veeam:VmRestorePoint:{}'.format(point_uuid),
+            'Links': [
+                self._server_link(),
+                self._link(
+                    'Up', 'restorePoints/{}'.format(self._uuid('RestorePoint', run * self.jobs + job)),
+                    point_time.strftime('%b %d %Y %I:%M%p'), 'RestorePointReference'
+                ),
+            ],
+            'Href': '{}/vmRestorePoints/{}?format=Entity'.format(BASE_HREF, point_uuid),
+            'Type': 'VmRestorePoint',
+        }
+
+    def repository_summary(self):
+        rng = self._rng('Repository', 0)
+        periods = []
+        for repository in range(max(1, self.repositories)):
+            capacity = rng.randint(10, 400) * 2 ** 40
+            backup_size = int(capacity * rng.uniform(0.2, 0.95))
+            periods.append({
+                'Name': 'Repository_{:02d}'.format(repository),
+                'Capacity': capacity,
+                'FreeSpace': capacity - backup_size,
+                'BackupSize': backup_size,
+            })
+        return {'Periods': periods}
+
+    @staticmethod
+    def reference(entity):
+        '''
+        Return the reference form of an entity
+        '''
+        return {
+            'UID': entity['UID'],
+            'Name': entity.get('Name'),
+            'Href': entity['Href'].replace('?format=Entity', ''),
+            'Type': '{}Reference'.format(entity['Type']),
+            'Links': entity.get('Links', []),
+        }
+
+    # Collections
+
+    def collection(self, query_type):
+        '''
+        Return the size, entity getter and layer size of a queryable collection
+
+        Entities are ordered newest layer first, where a layer is one run of every job.
+        '''
+        if query_type == 'Job':
+            return self.jobs, self.job, None
+        if query_type == 'Backup':
+            return self.jobs, self.backup, None
+        if query_type == 'BackupJobSession':
+            return self.sessions, self.session, self.jobs
+        if query_type == 'RestorePoint':
+            return self.restore_points, self.restore_point, self.jobs
+        if query_type == 'VmRestorePoint':
+            return self.vm_restore_points, self.vm_restore_point, self.vms
+        raise KeyError(query_type)
+
+    def _layer_newest(self, layer):
+        return self._time(self.end - layer * self.interval + datetime.timedelta(hours=4))
+
+    def _matching_indexes(self, query_type, query_filter, groups):
+        '''
+        Return the indexes of the entities matching a filter, computed once
+        for the pages of a query rather than for every page
+        '''
+        size, getter, layer_size = self.collection(query_type)
+        key = (query_type, query_filter, size, self.end)
+
+        with self._matching_lock:
+            if key in self._matching:
+                self._matching.move_to_end(key)
+                return self._matching[key]
+
+        bound = lower_time_bound(groups) if layer_size else None
+        selected = []
+        for index in range(size):
+            if bound and index % layer_size == 0 and self._layer_newest(index // layer_size) < bound:
+                break
+            if matches(getter(index), groups):
+                selected.append(index)
+
+        with self._matching_lock:
+            self._matching[key] = selected
+            while len(self._matching) > QUERY_CACHE_SIZE:
+                self._matching.popitem(last=False)
+        return selected
+
+    def query(self, query_type, query_filter=None, page=1, page_size=100):
+        '''
+        Return one page of a query in the Veeam entities format with PagingInfo
+        '''
+        size, getter, layer_size = self.collection(query_type)
+        groups = parse_filter(query_filter)
+
+        if groups:
+            selected = self._matching_indexes(query_type, query_filter, groups)
+            total = len(selected)
+            indexes = selected[(page - 1) * page_size:page * page_size]
+        else:
+            total = size
+            indexes = range((page - 1) * page_size, min(page * page_size, size))
+
+        entities = [getter(index) for index in indexes]
+        key = '{}s'.format(query_type)
+        pages_count = max(1, -(-total // page_size))
+
+        return {
+            'Entities': {key: {key: entities}},
+            'PagingInfo': {
+                'Links': [],
+                'PageNum': page,
+                'PageSize': page_size,
+                'PagesCount': pages_count,
+            },
+        }
+
+    # Requests
+
+    def handle(self, method, url):
+        '''
+        Answer a Veeam REST request
+
+        Returns:
+            tuple -- status code, headers and the json body (or None)
+        '''
+        parts = urlsplit(url)
+        path = parts.path.split('/api', 1)[-1].rstrip('/')
+        # Split on & only, filters use ; which older parse_qs also splits on
+        params = {}
+        for pair in parts.query.split('&'):
+            key, _, value = pair.partition('=')
+            if key:
+                params[unquote_plus(key)] = unquote_plus(value)
+
+        if method == 'POST' and path == '/sessionMngr':
+            token = str(uuid.uuid4())
+            return 201, {'X-RestSvcSessionId': token}, {'UserName': 'synthetic', 'SessionId': token}
+        if method == 'DELETE' and path.startswith('/logonSessions/'):
+            return 204, {}, None
+        if method == 'POST' and path.startswith('/jobs/'):
+            return 202, {}, {
+                'TaskId': 'task-{}'.format(self._index(path.split('/')[2])),
+                'State': 'Finished',
+                'Operation': params.get('action', 'start').capitalize() + 'Job',
+                'Result': {'Success': 'true', 'Message': ''},
+            }
+        if method != 'GET':
+            return 405, {}, {'Message': 'Method not allowed'}
+
+        segments = path.strip('/').split('/')
+        entity_format = params.get('format', '').lower() == 'entity'
+
+        try:
+            if segments == ['query']:
+                return 200, {}, self.query(
+                    params['type'],
+                    params.get('filter'),
+                    int(params.get('page', 1)),
+                    int(params.get('pageSize', 100)),
+                )
+            if segments[0] == 'reports':
+                return 200, {}, self.report(segments[-1])
+            if segments == ['logonSessions']:
+                return 200, {}, {'LogonSessions': [{'SessionId': 'synthetic'}]}
+            if segments == ['jobs']:
+                return 200, {}, {'Refs': [self.reference(self.job(job)) for job in range(self.jobs)]}
+            if segments == ['backups']:
+                return 200, {}, {'Refs': [self.reference(self.backup(backup)) for backup in range(self.jobs)]}
+            if len(segments) == 2 and segments[0] in ('jobs', 'backups'):
+                index = self._index(segments[1])
+                entity = self.job(index) if segments[0] == 'jobs' else self.backup(index)
+                return 200, {}, entity if entity_format else self.reference(entity)
+            if len(segments) == 2 and segments[0] == 'backupSessions':
+                return 200, {}, self.session(self._index(segments[1]))
+            if len(segments) == 2 and segments[0] == 'restorePoints':
+                return 200, {}, self.restore_point(self._index(segments[1]))
+            if len(segments) == 2 and segments[0] == 'vmRestorePoints':
+                return 200, {}, self.vm_restore_point(self._index(segments[1]))
+            if len(segments) == 3 and segments[0] == 'jobs' and segments[2] == 'backupSessions':
+                job = self._index(segments[1])
+                sessions = [self.session(run * self.jobs + job) for run in range(self.sessions_per_job)]
+                return 200, {}, {'BackupJobSessions': sessions}
+            if len(segments) == 3 and segments[0] == 'backups' and segments[2] == 'restorePoints':
+                backup = self._index(segments[1])
+                return 200, {}, {'Refs': [
+                    self.reference(self.restore_point(run * self.jobs + backup))
+                    for run in range(self.sessions_per_job)
+                ]}
+            if len(segments) == 3 and segments[0] == 'backupSessions' and segments[2] == 'taskSessions':
+                return 200, {}, {'BackupTaskSessions': self.task_sessions(self._index(segments[1]))}
+            if len(segments) == 3 and segments[0] == 'backups' and segments[2] == 'backupFiles':
+                backup = self._index(segments[1])
+                return 200, {}, {'BackupFiles': [
+                    self.backup_file(backup, run) for run in range(self.sessions_per_job)
+                ]}
+            if len(segments) == 3 and segments[0] == 'restorePoints' and segments[2] == 'vmRestorePoints':
+                run, job = divmod(self._index(segments[1]), self.jobs)
+                first = run * self.vms + self._vm_offsets[job]
+                return 200, {}, {'Refs': [
+                    self.reference(self.vm_restore_point(first + vm))
+                    for vm in range(self.job_vms[job])
+                ]}
+        except (KeyError, ValueError, IndexError) as error:
+            return 400, {}, {'Message': 'Bad request: {}'.format(error)}
+
+        return 404, {}, {'Message': 'Not found: {}'.format(path)}
+
+    def report(self, name):
+        if name == 'repository':
+            return self.repository_summary()
+        if name == 'overview':
+            return {
+                'BackupServers': 1,
+                'ProxyServers': max(1, self.jobs // 50),
+                'RepositoryServers': max(1, self.repositories),
+                'RunningJobs': 0,
+                'ScheduledJobs': self.jobs,
+                'SuccessfulVmLastestStates': self.vms,
+                'WarningVmLastestStates': 0,
+                'FailedVmLastestStates': 0,
+            }
+        if name == 'job_statistics':
+            return {
+                'RunningJobs': 0,
+                'ScheduledJobs': self.jobs,
+                'ScheduledBackupJobs': self.jobs,
+                'ScheduledReplicaJobs': 0,
+                'TotalJobRuns': self.jobs,
+                'SuccessfulJobRuns': self.jobs,
+                'WarningsJobRuns': 0,
+                'FailedJobRuns': 0,
+            }
+        if name == 'vms_overview':
+            return {
+                'ProtectedVms': self.vms,
+                'BackedUpVms': self.vms,
+                'ReplicatedVms': 0,
+                'RestorePoints': self.vm_restore_points,
+            }
+        if name == 'processed_vms':
+            return {'Days': [
+                {
+                    'Timestamp': self._time(self.end - day * datetime.timedelta(days=1)),
+                    'ReplicatedVms': 0,
+                    'BackupedVms': self.vms,
+                }
+                for day in range(7)
+            ]}
+        raise KeyError(name)
+
+
+class SyntheticAdapter(BaseAdapter):
+    '''
+    Transport adapter answering requests from a SyntheticDataset without a socket
+    '''
+
+    def __init__(self, dataset):
+        super().__init__()
+        self.dataset = dataset
+
+    def send(self, request, **kwargs):
+        status, headers, body = self.dataset.handle(request.method, request.url)
+
+        response = requests.Response()
+        response.status_code = status
+        response.headers = CaseInsensitiveDict(headers)
+        if body is not None:
+            response.headers['Content-Type'] = 'application/json'
+            response._content = json.dumps(body).encode('utf-8')
+        else:
+            response._content = b''
+        response.encoding = 'utf-8'
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def _respond(self):
+        status, headers, body = self.server.dataset.handle(self.command, self.path)
+        content = json.dumps(body).encode('utf-8') if body is not None else b''
+
+        self.send_response(status)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_DELETE = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ThreadingHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class FakeVeeamServer(object):
+    '''
+    A local HTTP server answering Veeam REST requests from a SyntheticDataset
+    '''
+
+    def __init__(self, dataset, host='127.0.0.1', port=0):
+        self.httpd = _ThreadingHTTPServer((host, port), _Handler)
+        self.httpd.dataset = dataset
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return 'http://{}:{}/api'.format(host, port)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
@@ -0,0 +1,193 @@
+'''
+Wait for many Veeam tasks to finish from a single polling thread
+'''
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATE = 'Finished'
+
+
+class _TrackedTask(object):
+
+    def __init__(self, task_id, future, interval):
+        self.task_id = task_id
+        self.future = future
+        self.interval = interval
+        self.state = None
+        self.errors = 0
+
+
+class TaskWaiter(object):
+    '''
+    Track outstanding tasks and resolve a future for each once finished
+
+    - One scheduler thread polls every task, there is no thread per task
+    - Each task backs off from `min_interval` to `max_interval` while its
+      state is unchanged, so long running tasks are checked less often
+    - When `list_threshold` or more tasks are due at once their state is
+      read from a single GET of all tasks rather than one GET each
+    '''
+
+    def __init__(self, client, min_interval=1.0, max_interval=30.0, backoff=1.5,
+                 list_threshold=10, workers=4, max_errors=5, clock=time.monotonic):
+        self.client = client
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.list_threshold = list_threshold
+        self.max_errors = max_errors
+        self.clock = clock
+        self.checks = 0
+        self.list_checks = 0
+
+        self._due = []
+        self._order = itertools.count()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def add(self, task):
+        '''
+        Track a Task entity, returning a future of the finished Task
+        '''
+        future = Future()
+
+        if task.get('State') == FINISHED_STATE:
+            future.set_result(task)
+            return future
+
+        tracked = _TrackedTask(task['TaskId'], future, self.min_interval)
+        tracked.state = task.get('State')
+
+        with self._condition:
+            if self._stopped:
+                future.cancel()
+                return future
+            heapq.heappush(self._due, (self.clock() + tracked.interval, next(self._order), tracked))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+        return future
+
+    def pending(self):
+        with self._condition:
+            return len(self._due)
+
+    def wait(self, futures, timeout=None):
+        '''
+        Wait for all the futures, returning the finished Tasks in order
+        '''
+        done, not_done = concurrent.futures.wait(futures, timeout=timeout)
+        if not_done:
+            raise concurrent.futures.TimeoutError(
+                '{} tasks still running'.format(len(not_done))
+            )
+        return [future.result() for future in futures]
+
+    def stop(self):
+        '''
+        Stop polling, the futures of tasks still tracked are cancelled
+        '''
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+
+        with self._condition:
+            due, self._due = self._due, []
+        for _, _, tracked in due:
+            tracked.future.cancel()
+
+    def _take_due(self):
+        '''
+        Block until tasks are due and pop them all
+        '''
+        with self._condition:
+            while not self._stopped:
+                if self._due:
+                    wait = self._due[0][0] - self.clock()
+                    if wait <= 0:
+                        break
+                    self._condition.wait(wait)
+                else:
+                    self._condition.wait()
+
+            if self._stopped:
+                return None
+
+            now = self.clock()
+            due = []
+            while self._due and self._due[0][0] <= now:
+                due.append(heapq.heappop(self._due)[2])
+            return due
+
+    def _run(self):
+        while True:
+            due = self._take_due()
+            if due is None:
+                return
+            self.check(due)
+
+    def _fetch_all(self):
+        self.list_checks += 1
+        tasks = self.client.get_tasks().get('Tasks', [])
+        return {task['TaskId']: task for task in tasks}
+
+    def check(self, due):
+        '''
+        Check the state of the due tasks and reschedule the unfinished ones
+        '''
+        states = {}
+        if len(due) >= self.list_threshold:
+            try:
+                states = self._fetch_all()
+            except Exception:
+                logger.exception('Listing tasks failed, checking individually')
+
+        missing = [tracked for tracked in due if tracked.task_id not in states]
+        fetched = self._executor.map(self._fetch_one, missing)
+        for tracked, result in zip(missing, fetched):
+            states[tracked.task_id] = result
+
+        self.checks += len(due)
+
+        for tracked in due:
+            result = states[tracked.task_id]
+
+            if isinstance(result, Exception):
+                tracked.errors += 1
+                if tracked.errors >= self.max_errors:
+                    tracked.future.set_exception(result)
+                    continue
+                tracked.interval = min(tracked.interval * self.backoff, self.max_interval)
+            elif result.get('State') == FINISHED_STATE:
+                tracked.future.set_result(result)
+                continue
+            elif result.get('State') == tracked.state:
+                tracked.errors = 0
+                tracked.interval = min(tracked.interval * self.backoff, self.max_interval)
+            else:
+                tracked.errors = 0
+                tracked.state = result.get('State')
+                tracked.interval = self.min_interval
+
+            with self._condition:
+                heapq.heappush(self._due, (self.clock() + tracked.interval, next(self._order), tracked))
+
+    def _fetch_one(self, tracked):
+        try:
+            return self.client.get_task(tracked.task_id)
+        except Exception as error:
+            return error
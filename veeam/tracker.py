@@ -0,0 +1,157 @@
+'''
+Track persistently failed jobs from incrementally fetched sessions
+'''
+import json
+import os
+
+from .projection import requiring
+
+SUCCESS_RESULTS = ('Success', 'Warning')
+FAILED_RESULT = 'Failed'
+STOPPED_STATE = 'Stopped'
+
+
+class FailedJobTracker(object):
+    '''
+    Keep the last result, last failure and last success of every job
+
+    A job is persistently failed when its latest failed session has no
+    successful (or warning) session created after it, the same rule as
+    VeeamClient.get_persistently_failed_jobs, answered from the tracked
+    state instead of querying successes for every failure.
+
+    `update` only fetches sessions created since the last update, going
+    back far enough to pick up sessions that were still running. The
+    state can be saved between runs so a restart does not need a backfill.
+    '''
+
+    def __init__(self):
+        self.jobs = {}
+        # Where the next update starts: the newest session seen or the oldest still running
+        self.high_water_mark = None
+        self._running = {}
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def observe(self, session):
+        '''
+        Update the state of a job from one of its BackupJobSessions
+        '''
+        name = session['JobName']
+        created = session['CreationTimeUTC']
+        result = session.get('Result')
+
+        job = self.jobs.get(name)
+        if job is None:
+            job = self.jobs[name] = {
+                'last_result': None,
+                'last_result_time': None,
+                'last_success_time': None,
+                'last_failure': None,
+            }
+
+        if session.get('State') != STOPPED_STATE:
+            self._running[session['UID']] = created
+            return
+        self._running.pop(session['UID'], None)
+
+        if job['last_result_time'] is None or created >= job['last_result_time']:
+            job['last_result'] = result
+            job['last_result_time'] = created
+
+        if result in SUCCESS_RESULTS:
+            if job['last_success_time'] is None or created > job['last_success_time']:
+                job['last_success_time'] = created
+        elif result == FAILED_RESULT:
+            last_failure = job['last_failure']
+            if last_failure is None or created > last_failure['CreationTimeUTC']:
+                job['last_failure'] = session
+
+    def update(self, client, since=None, page_size=500):
+        '''
+        Fetch and observe the sessions created since the last update
+
+        Arguments:
+            since {str} -- where the first update starts, defaults to yesterday
+
+        Returns:
+            int -- the number of sessions observed
+        '''
+        start = self.high_water_mark or since or client.get_date_yesterday()
+        if self._running:
+            start = min(start, min(self._running.values()))
+
+        newest = self.high_water_mark
+        observed = 0
+
+        projection = requiring(client.projection, 'JobName', 'CreationTimeUTC', 'Result', 'State')
+
+        for session in client.iter_query(
+                'BackupJobSession', 'creationtime>="{}"'.format(start), page_size=page_size,
+                projection=projection):
+            self.observe(session)
+            observed += 1
+            if newest is None or session['CreationTimeUTC'] > newest:
+                newest = session['CreationTimeUTC']
+
+        self.high_water_mark = newest or start
+        return observed
+
+    def is_persistently_failed(self, job_name):
+        job = self.jobs.get(job_name)
+        if job is None or job['last_failure'] is None:
+            return False
+        success = job['last_success_time']
+        return success is None or success <= job['last_failure']['CreationTimeUTC']
+
+    def get_persistently_failed_jobs(self, since=None):
+        '''
+        Return the latest failed session of every persistently failed job
+
+        Arguments:
+            since {str} -- ignore failures created before this time
+        '''
+        all_failed_jobs = []
+
+        for job_name, job in self.jobs.items():
+            if not self.is_persistently_failed(job_name):
+                continue
+            failed_job = dict(job['last_failure'])
+            if since and failed_job['CreationTimeUTC'] <= since:
+                continue
+            failed_job['message_type'] = 'job_failed'
+            all_failed_jobs.append(failed_job)
+
+        return all_failed_jobs
+
+    def save(self, path):
+        '''
+        Write the tracked state to a json file, replacing it atomically
+        '''
+        data = {
+            'high_water_mark': self.high_water_mark,
+            'running': self._running,
+            'jobs': self.jobs,
+        }
+        temp_path = '{}.tmp'.format(path)
+        with open(temp_path, 'w') as state_file:
+            json.dump(data, state_file, separators=(',', ':'))
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        '''
+        Read the state written by save, a missing file gives an empty tracker
+        '''
+        tracker = cls()
+        if not os.path.exists(path):
+            return tracker
+
+        with open(path) as state_file:
+            data = json.load(state_file)
+
+        tracker.high_water_mark = data['high_water_mark']
+        tracker._running = data['running']
+        tracker.jobs = data['jobs']
+        return tracker